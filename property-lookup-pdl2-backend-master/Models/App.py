@@ -1,17 +1,37 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from dotenv import load_dotenv
 import os
 import requests
 import json
-import xmltodict
 from flask_cors import CORS, cross_origin
 import jwt
 import datetime
 from werkzeug.security import generate_password_hash, check_password_hash  
-from models import db, User, Property, Agency, Connector, Pipeline, Site, ImportActivity
+from models import db, User, Property, Agency, AgencySourceStats, Connector, Pipeline, Site, ImportActivity
+from feed_cache import acquaint_index
+from singleflight import upstream_flight
+from delta import compute_delta, field_deltas, iter_delta
+from fast_rows import iter_property_dicts, property_list_json
+import http_cache
+import metrics
+import query_stats
+import profiling
+import read_replica
+import refresh_jobs
+import ingest
+import export
+import image_proxy
+import page_scraper
+import wordpress_crawler
+from schema import ensure_schema
+import geo
+from search import SORTS as SEARCH_SORTS, search_properties
+from http_cache import conditional
+from matcher import LiveItemIndex, address_text, normalize_prop as _normalize_prop, normalize_value
 from collections import defaultdict
-from sqlalchemy import text, or_  # Add this import for using text queries
-from urllib.parse import unquote, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import text, or_, select, func  # Add this import for using text queries
+from urllib.parse import unquote
 from html import unescape
 
 
@@ -41,12 +61,14 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 
 # Initialize the database
+read_replica.configure(app)  # optional SQLALCHEMY_READ_URI replica for GET routes
 db.init_app(app)  # Ensure this is called after app is created
 with app.app_context():
     try:
         ImportActivity.__table__.create(db.engine, checkfirst=True)
     except Exception:
         pass
+    ensure_schema(db.engine)
 
 CORS(app, resources={r"/api/*": {"origins": [
     origin for origin in {
@@ -57,10 +79,16 @@ CORS(app, resources={r"/api/*": {"origins": [
         'http://localhost:5173'
     } if origin
 ]}})  # Allow the frontend tunnel, board domain, and local dev client
+http_cache.init_app(app)  # gzip/brotli for large JSON bodies, per-route bytes and 304 counters
+query_stats.init_app(app)  # per-request statement count/time, slow-query log
+metrics.init_app(app)  # per-route request count/latency and DB queries for /metrics
+profiling.init_app(app, lambda: _authenticated_user() is not None)  # X-Profile: 1 / ?profile=1
+read_replica.init_app(app, db, add_headers=query_stats.DB_QUERY_HEADERS)
 
 
 @app.route('/', methods=['GET'])
 @app.route('/health', methods=['GET'])
+@read_replica.primary_db
 def health():
     return jsonify({"status": "ok"}), 200
 
@@ -180,6 +208,22 @@ def verify_token():
     except jwt.InvalidTokenError:
         return jsonify({'message': 'Invalid token'}), 401  # Return error if token is invalid
 
+
+def _authenticated_user():
+    """User of the `Authorization: Bearer <token>` header, or None (same checks as verify_token)."""
+    header = request.headers.get("Authorization") or ""
+    if not header.lower().startswith("bearer "):
+        return None
+    token = header[7:].strip()
+    try:
+        decoded_token = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    # a token issued by /api/login a moment ago may not be on the replica yet
+    with read_replica.use_primary():
+        user = db.session.get(User, decoded_token.get('id'))
+    return user if user and user.token == token else None
+
    
 # Update User Data Route
 @app.route('/api/users/<int:id>', methods=['PUT'])
@@ -276,7 +320,27 @@ def delete_property(id):
 IMPORT_INTERVAL_SEC = int(os.getenv("IMPORT_INTERVAL_SEC", "600"))
 
 
+def _activity_version():
+    return str(db.session.execute(select(func.max(ImportActivity.id))).scalar())
+
+
+def _properties_version(agency_name=None):
+    """
+    Cheap data version for property listings: row count, newest row id, latest updated_at
+    (in-place edits: PUT, ingest updates, cluster assignment) and last import id.
+    """
+    props = select(func.count(Property.id), func.max(Property.id), func.max(Property.updated_at))
+    activity = select(func.max(ImportActivity.id))
+    if agency_name is not None:
+        props = props.where(Property.agency_name == agency_name)
+        activity = activity.where(ImportActivity.agency_name == agency_name)
+    count, max_id, updated = db.session.execute(props).one()
+    updated = updated.isoformat() if updated else None
+    return f"{count}:{max_id}:{updated}:{db.session.execute(activity).scalar()}"
+
+
 @app.route('/api/activity', methods=['GET'])
+@conditional(_activity_version)
 def get_activity():
     limit = request.args.get("limit", default=50, type=int)
     rows = (
@@ -287,6 +351,62 @@ def get_activity():
     return jsonify([r.to_dict() for r in rows]), 200
 
 
+def _stats_version():
+    count, updated = db.session.execute(
+        select(func.count(), func.max(AgencySourceStats.updated_at)).select_from(AgencySourceStats)
+    ).one()
+    return f"{count}:{updated}"
+
+
+@app.route('/api/stats', methods=['GET'])
+@cross_origin()
+@conditional(_stats_version)
+def get_stats():
+    """
+    Listing statistics per agency and source, maintained by the importers (agency_stats.py).
+    Query params:
+      - key=<agency key> (optional; only that agency)
+      - source=<source> (optional)
+    """
+    query = AgencySourceStats.query
+    api_key_raw = request.args.get("key")
+    if api_key_raw:
+        agency = _resolve_agency_by_key(unquote(api_key_raw))
+        if not agency:
+            return jsonify({'message': 'Unknown agency key'}), 404
+        query = query.filter(AgencySourceStats.agency_name == agency.name)
+    source = (request.args.get("source") or "").strip().lower()
+    if source:
+        query = query.filter(AgencySourceStats.source == source)
+
+    agencies = {}
+    for row in query.order_by(AgencySourceStats.agency_name, AgencySourceStats.source).all():
+        entry = agencies.get(row.agency_name)
+        if entry is None:
+            entry = agencies[row.agency_name] = {
+                "agency_name": row.agency_name,
+                "total_count": 0,
+                "live_count": 0,
+                "agreed_count": 0,
+                "sold_count": 0,
+                "min_price": None,
+                "max_price": None,
+                "last_import_at": None,
+                "sources": [],
+            }
+        item = row.to_dict()
+        for field in ("total_count", "live_count", "agreed_count", "sold_count"):
+            entry[field] += item[field]
+        if item["min_price"] is not None and (entry["min_price"] is None or item["min_price"] < entry["min_price"]):
+            entry["min_price"] = item["min_price"]
+        if item["max_price"] is not None and (entry["max_price"] is None or item["max_price"] > entry["max_price"]):
+            entry["max_price"] = item["max_price"]
+        if item["last_import_at"] and (entry["last_import_at"] is None or item["last_import_at"] > entry["last_import_at"]):
+            entry["last_import_at"] = item["last_import_at"]
+        entry["sources"].append(item)
+    return jsonify(list(agencies.values())), 200
+
+
 @app.route('/api/countdown', methods=['GET'])
 def get_countdown():
     last = (
@@ -310,6 +430,90 @@ def get_countdown():
 
 
 # ---------------- Live combined properties (no DB) ----------------
+LIVE_STREAM_MODES = ("ndjson", "chunks")
+
+
+def _live_source_jobs(agency: Agency, source_filter=None, include_wordpress=True):
+    """
+    Build the list of live feeds configured for an agency as (source, fetch_fn) pairs.
+    Each fetch_fn takes no arguments and returns (items, errors), so callers can run
+    them sequentially or concurrently. Agency attributes are read up-front so the
+    functions are safe to call outside of the request/app context.
+    """
+    from myhome_import import fetch_myhome_search, load_acquaint
+    from daft_import import fetch_daft_api
+
+    sf = None
+    if source_filter:
+        sf = {s.strip().lower() for s in source_filter if s}
+
+    def wants(name):
+        return not sf or name in sf
+
+    def guarded(name, fetch):
+        def run():
+            try:
+                rows = fetch() or []
+                _tag_source(rows, name)
+                return rows, []
+            except Exception as exc:
+                return [], [{"source": name, "error": str(exc)}]
+        return run
+
+    jobs = []
+
+    myhome_key = agency.myhome_api_key
+    if myhome_key and wants("myhome"):
+        jobs.append(("myhome", guarded("myhome", lambda: fetch_myhome_search(myhome_key))))
+
+    prefix = (agency.site_prefix or agency.acquaint_site_prefix or "").strip()
+    if prefix and wants("acquaint"):
+        jobs.append(("acquaint", guarded("acquaint", lambda: load_acquaint(prefix))))
+
+    daft_key = (agency.daft_api_key or agency.unique_key or "").strip()
+    if daft_key and wants("daft"):
+        jobs.append(("daft", guarded("daft", lambda: fetch_daft_api(daft_key))))
+
+    if include_wordpress and wants("wordpress"):
+        wp_endpoint = _guess_wordpress_endpoint(agency)
+        if wp_endpoint:
+            jobs.append(("wordpress", lambda: _fetch_wordpress(wp_endpoint)))
+
+    return jobs
+
+
+def _stream_live_items(agency_name, jobs, mode):
+    """
+    Yield NDJSON lines for a live fetch: a header, then either one line per item
+    (mode='ndjson') or one line per source (mode='chunks') as each source finishes,
+    and finally a trailer carrying the collected errors.
+    """
+    yield json.dumps({
+        "type": "header",
+        "agency": agency_name,
+        "sources": [name for name, _ in jobs],
+        "mode": mode,
+    }) + "\n"
+
+    errors = []
+    count = 0
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {pool.submit(fetch): name for name, fetch in jobs}
+            for future in as_completed(futures):
+                name = futures[future]
+                rows, errs = future.result()
+                errors.extend(errs)
+                count += len(rows)
+                if mode == "chunks":
+                    yield json.dumps({"type": "source", "source": name, "count": len(rows), "items": rows}) + "\n"
+                else:
+                    for row in rows:
+                        yield json.dumps({"type": "item", "source": name, "item": row}) + "\n"
+
+    yield json.dumps({"type": "trailer", "count": count, "errors": errors}) + "\n"
+
+
 @app.route("/api/properties/live", methods=["GET"])
 @cross_origin()
 def get_properties_live():
@@ -317,27 +521,18 @@ def get_properties_live():
     Fetches fresh properties directly from sources for a given agency key (no DB storage).
     Params:
       - key=<agency_api_key/site_prefix/myhome_api_key/daft_api_key>
-      - sources=comma,separated (optional filter: myhome,acquaint,daft)
+      - sources=comma,separated (optional filter: myhome,acquaint,daft,wordpress)
+      - stream=ndjson|chunks (optional) stream application/x-ndjson instead of one JSON
+        document: a header line, then one line per item (ndjson) or per source (chunks)
+        as each source finishes, then a trailer line with the errors list
     """
-    # Lazy imports to avoid circular dependency
-    from myhome_import import fetch_myhome_search, fetch_acquaint, parse_acquaint
-    from daft_import import fetch_daft_api
-
     api_key_raw = request.args.get("key")
     if not api_key_raw:
         return jsonify({"message": "API key is required"}), 400
     api_key = unquote(api_key_raw)
 
     # Find agency by any known key
-    agency = Agency.query.filter(
-        or_(
-            Agency.unique_key == api_key,
-            Agency.myhome_api_key == api_key,
-            Agency.daft_api_key == api_key,
-            Agency.site_prefix == api_key,
-            Agency.acquaint_site_prefix == api_key
-        )
-    ).first()
+    agency = _resolve_agency_by_key(api_key)
     if not agency:
         return jsonify({"message": "Unknown agency key"}), 404
 
@@ -346,54 +541,29 @@ def get_properties_live():
     if source_filter_raw:
         source_filter = {s.strip().lower() for s in source_filter_raw.split(",") if s.strip()}
 
-    results = []
-    errors = []
+    stream_mode = (request.args.get("stream") or "").strip().lower()
+    if stream_mode in ["1", "true", "yes"]:
+        stream_mode = "ndjson"
+    if stream_mode and stream_mode not in LIVE_STREAM_MODES:
+        return jsonify({"message": f"stream must be one of: {', '.join(LIVE_STREAM_MODES)}"}), 400
 
-    # MyHome
-    if agency.myhome_api_key and (not source_filter or "myhome" in source_filter):
-        try:
-            rows = fetch_myhome_search(agency.myhome_api_key) or []
-            _tag_source(rows, "myhome")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "myhome", "error": str(exc)})
+    jobs = _live_source_jobs(agency, source_filter)
 
-    # Acquaint
-    prefix = (agency.site_prefix or agency.acquaint_site_prefix or "").strip()
-    if prefix and (not source_filter or "acquaint" in source_filter):
-        try:
-            xml_text = fetch_acquaint(prefix)
-            rows = parse_acquaint(xml_text) or []
-            _tag_source(rows, "acquaint")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "acquaint", "error": str(exc)})
-
-    # Daft
-    daft_key = (agency.daft_api_key or agency.unique_key or "").strip()
-    if daft_key and (not source_filter or "daft" in source_filter):
-        try:
-            rows = fetch_daft_api(daft_key) or []
-            _tag_source(rows, "daft")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "daft", "error": str(exc)})
-
-    # WordPress
-    wp_endpoint = _guess_wordpress_endpoint(agency)
-    if wp_endpoint and (not source_filter or "wordpress" in source_filter):
-        wp_items, wp_err = _fetch_wordpress(wp_endpoint)
-        results.extend(wp_items)
-        errors.extend(wp_err)
-
-    return jsonify({"items": results, "errors": errors, "agency": agency.name}), 200
+    if stream_mode:
+        return Response(
+            stream_with_context(_stream_live_items(agency.name, jobs, stream_mode)),
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+        )
 
+    results = []
+    errors = []
+    for _, fetch in jobs:
+        rows, errs = fetch()
+        results.extend(rows)
+        errors.extend(errs)
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-WORDPRESS_ENDPOINTS_FILE = os.getenv(
-    "WORDPRESS_ENDPOINTS_FILE",
-    os.path.join(BASE_DIR, "mobile", "assets", "wordpress_endpoints.txt")
-)
+    return jsonify({"items": results, "errors": errors, "agency": agency.name}), 200
 
 
 def _resolve_agency_by_key(api_key: str):
@@ -409,66 +579,15 @@ def _resolve_agency_by_key(api_key: str):
 
 
 def _fetch_live_items_for_agency(agency: Agency, source_filter=None):
-    from myhome_import import fetch_myhome_search, fetch_acquaint, parse_acquaint
-    from daft_import import fetch_daft_api
-
     results = []
     errors = []
-
-    sf = None
-    if source_filter:
-        sf = {s.strip().lower() for s in source_filter if s}
-
-    if agency.myhome_api_key and (not sf or "myhome" in sf):
-        try:
-            rows = fetch_myhome_search(agency.myhome_api_key) or []
-            _tag_source(rows, "myhome")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "myhome", "error": str(exc)})
-
-    prefix = (agency.site_prefix or agency.acquaint_site_prefix or "").strip()
-    if prefix and (not sf or "acquaint" in sf):
-        try:
-            xml_text = fetch_acquaint(prefix)
-            rows = parse_acquaint(xml_text) or []
-            _tag_source(rows, "acquaint")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "acquaint", "error": str(exc)})
-
-    daft_key = (agency.daft_api_key or agency.unique_key or "").strip()
-    if daft_key and (not sf or "daft" in sf):
-        try:
-            rows = fetch_daft_api(daft_key) or []
-            _tag_source(rows, "daft")
-            results.extend(rows)
-        except Exception as exc:
-            errors.append({"source": "daft", "error": str(exc)})
-
+    for _, fetch in _live_source_jobs(agency, source_filter, include_wordpress=False):
+        rows, errs = fetch()
+        results.extend(rows)
+        errors.extend(errs)
     return results, errors
 
 
-def _normalize_value(val):
-    if val is None:
-        return ''
-    try:
-        return str(val).strip()
-    except Exception:
-        return ''
-
-
-def _normalize_prop(obj):
-    if not obj:
-        return {}
-    return {
-        "id": _normalize_value(obj.get("id") if isinstance(obj, dict) else getattr(obj, "id", None)) or _normalize_value(obj.get("uniquereferencenumber") if isinstance(obj, dict) else getattr(obj, "uniquereferencenumber", None)),
-        "price": _normalize_value(obj.get("priceText") if isinstance(obj, dict) else getattr(obj, "price", None) or getattr(obj, "priceText", None) or getattr(obj, "house_price", None)),
-        "status": _normalize_value(obj.get("statusText") if isinstance(obj, dict) else getattr(obj, "status", None) or getattr(obj, "statusText", None) or getattr(obj, "house_extra_info_3", None)),
-        "address": _normalize_value(obj.get("addressText") if isinstance(obj, dict) else getattr(obj, "addressText", None) or getattr(obj, "displayaddress", None) or getattr(obj, "house_location", None)),
-    }
-
-
 @app.route("/api/ai/compare", methods=["POST"])
 @cross_origin()
 def ai_compare():
@@ -483,6 +602,10 @@ def ai_compare():
     wordpress_url = data.get("wordpress_url")
     if not api_key_raw or not prop_id:
         return jsonify({"message": "key and property_id are required"}), 400
+    if wordpress_url:
+        rejected = _unknown_wordpress_endpoint(wordpress_url)
+        if rejected:
+            return rejected
 
     api_key = unquote(str(api_key_raw))
     agency = _resolve_agency_by_key(api_key)
@@ -504,29 +627,14 @@ def ai_compare():
         sf_set = {s.strip().lower() for s in source_filter if isinstance(s, str)}
 
     live_items, errors = _fetch_live_items_for_agency(agency, sf_set)
-    live_match = None
-    for item in live_items:
-        norm = _normalize_prop(item)
-        if norm.get("id") and norm.get("id") == str(prop_id):
-            live_match = item
-            break
-        # fallback by address partial match
-        if norm.get("address") and local_norm.get("address") and norm.get("address").lower() in local_norm.get("address").lower():
-            live_match = item
-            break
+    local_address = local_norm.get("address") or (local_prop.house_location if local_prop else None)
+    live_match, match_info = LiveItemIndex(live_items).match(str(prop_id), local_address)
 
     # Fallback: fetch WordPress endpoint if provided
     if not live_match and wordpress_url:
         wp_items, wp_err = _fetch_wordpress(wordpress_url)
         errors.extend(wp_err)
-        for item in wp_items:
-            norm = _normalize_prop(item)
-            if norm.get("id") and norm.get("id") == str(prop_id):
-                live_match = item
-                break
-            if norm.get("address") and local_norm.get("address") and norm.get("address").lower() in local_norm.get("address").lower():
-                live_match = item
-                break
+        live_match, match_info = LiveItemIndex(wp_items).match(str(prop_id), local_address)
 
     live_norm = _normalize_prop(live_match)
 
@@ -543,31 +651,268 @@ def ai_compare():
         "local": local_norm,
         "live": live_norm,
         "deltas": deltas,
+        "match": {
+            "by": match_info["by"],
+            "score": match_info["score"],
+            "candidates": [
+                {"score": c["score"], "id": normalize_value(c["item"].get("id")), "address": address_text(c["item"]), "source": c["item"].get("source")}
+                for c in match_info["candidates"]
+            ],
+        },
         "errors": errors,
         "message": "Delta computed" if deltas else "No delta detected" if live_match else "Property not found in live feed"
     }), 200
 
 
-# ---------------- WordPress fetch ----------------
-def _domain_from_url(url):
+def _live_row(source, raw, agency_name):
+    """Map a live feed item with the importer mappers into the shape stored in the DB."""
+    from myhome_import import map_property_myhome, map_property_acquaint
+    from daft_import import map_property_4pm
+    from wordpress_import import map_property_wordpress
+
+    mapper = {
+        "myhome": map_property_myhome,
+        "acquaint": map_property_acquaint,
+        "daft": map_property_4pm,
+        "wordpress": map_property_wordpress,
+    }.get(source)
+    if not mapper:
+        return None
+    prop = mapper(raw, agency_name)
+    row = {
+        "source": source,
+        "house_location": prop.house_location,
+        "house_price": prop.house_price,
+        "status": prop.house_extra_info_2,
+        "house_bedrooms": prop.house_bedrooms,
+        "house_bathrooms": prop.house_bathrooms,
+    }
+    if source == "wordpress":
+        row["link"] = raw.get("link")
+    return row
+
+
+@app.route("/api/ai/compare/batch", methods=["POST"])
+@cross_origin()
+def ai_compare_batch():
+    """
+    Whole-agency delta: fetch every live feed once and join it against all stored rows.
+    Body: { key: <agency_key>, sources?: "daft,myhome", wordpress_url?: "<endpoint>",
+            offset?: 0, limit?: 500, stream?: "ndjson" }
+    Returns added / removed / changed listings with field-level deltas for price, status
+    and address. The live feeds are fetched concurrently. With stream=ndjson each change is
+    sent as one JSON line as soon as it is found, between a header line and a trailer line
+    carrying the total, the summary and errors.
+    """
+    data = request.get_json(force=True) or {}
+    api_key_raw = data.get("key")
+    if not api_key_raw:
+        return jsonify({"message": "key is required"}), 400
     try:
-        return urlparse(url).hostname or ''
-    except Exception:
-        return ''
+        offset = int(data.get("offset") or 0)
+        limit = int(data["limit"]) if data.get("limit") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"message": "offset and limit must be integers"}), 400
+    if offset < 0 or (limit is not None and limit < 1):
+        return jsonify({"message": "offset must be >= 0 and limit >= 1"}), 400
+    agency = _resolve_agency_by_key(unquote(str(api_key_raw)))
+    if not agency:
+        return jsonify({"message": "Unknown agency key"}), 404
 
+    source_filter = data.get("sources")
+    if isinstance(source_filter, str):
+        source_filter = [s for s in source_filter.split(",") if s.strip()]
+    wordpress_url = data.get("wordpress_url")
+    if wordpress_url:
+        rejected = _unknown_wordpress_endpoint(wordpress_url)
+        if rejected:
+            return rejected
+
+    jobs = _live_source_jobs(agency, source_filter, include_wordpress=not wordpress_url)
+    if wordpress_url:
+        jobs.append(("wordpress", lambda: _fetch_wordpress(wordpress_url)))
+    results = {}
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {pool.submit(fetch): source for source, fetch in jobs}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+    errors = []
+    live_rows = []
+    fetched = set()
+    for source, _ in jobs:  # job order, so the result does not depend on which feed answered first
+        rows, errs = results[source]
+        errors.extend(errs)
+        if not errs:
+            fetched.add(source)
+        for raw in rows:
+            try:
+                row = _live_row(source, raw, agency.name)
+            except Exception as exc:
+                errors.append({"source": source, "error": f"mapping failed: {exc}"})
+                continue
+            if row:
+                live_rows.append(row)
+
+    db_rows = [
+        {"id": r.id, "source": r.source, "house_location": r.house_location, "house_price": r.house_price, "status": r.house_extra_info_2}
+        for r in db.session.query(
+            Property.id, Property.source, Property.house_location, Property.house_price, Property.house_extra_info_2
+        ).filter(Property.agency_name == agency.name)
+        # Only compare sources that were fetched successfully, otherwise every row of a
+        # skipped or failing feed would be reported as removed
+        if (r.source or "").lower() in fetched
+    ]
 
+    if (data.get("stream") or "").lower() == "ndjson":
+        agency_name = agency.name
+
+        def generate():
+            yield json.dumps({"type": "header", "agency": agency_name}) + "\n"
+            summary = {}
+            total = 0
+            for change in iter_delta(db_rows, live_rows, summary):
+                total += 1
+                yield json.dumps({"type": "change", **change}) + "\n"
+            yield json.dumps({"type": "trailer", "total": total, "summary": summary, "errors": errors}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    changes, summary = compute_delta(db_rows, live_rows)
+    page = changes[offset:offset + limit] if limit else changes[offset:]
+    return jsonify({
+        "agency": agency.name,
+        "summary": summary,
+        "total": len(changes),
+        "offset": offset,
+        "limit": limit,
+        "changes": page,
+        "errors": errors,
+    }), 200
+
+
+def _page_batch(data):
+    """(jobs, concurrency) of a page scrape request body; raises ValueError."""
+    jobs = page_scraper.build_jobs(data.get("pages"), data.get("selectors"))
+    concurrency = data.get("concurrency")
+    if concurrency is not None and (not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1):
+        raise ValueError("concurrency must be a positive integer")
+    return jobs, concurrency
+
+
+def _ndjson_response(lines):
+    return Response(
+        stream_with_context(lines),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+    )
+
+
+@app.route("/api/scrape/pages", methods=["POST"])
+@cross_origin()
+def scrape_pages():
+    """
+    Scrape listing pages with the shared browser pool (see page_scraper.py).
+    Body: { pages: ["<url>" | {url, selectors?, id?}, ...], selectors?: {field: css}, concurrency?: 4 }
+    Requires `Authorization: Bearer <token>`. Streams application/x-ndjson: a header line,
+    one result line per page as it finishes (the scrape.js output), then a trailer line.
+    """
+    if _authenticated_user() is None:
+        return jsonify({'message': 'Authentication required'}), 401
+    data = request.get_json(silent=True) or {}
+    try:
+        jobs, concurrency = _page_batch(data)
+    except ValueError as exc:
+        return jsonify({'message': str(exc)}), 400
+
+    def generate():
+        yield json.dumps({"type": "header", "total": len(jobs)}) + "\n"
+        failed = 0
+        for result in page_scraper.scraper.scrape(jobs, concurrency):
+            failed += "error" in result
+            yield json.dumps({"type": "result", **result}) + "\n"
+        yield json.dumps({"type": "trailer", "count": len(jobs), "failed": failed}) + "\n"
+
+    return _ndjson_response(generate())
+
+
+@app.route("/api/ai/compare/pages", methods=["POST"])
+@cross_origin()
+def ai_compare_pages():
+    """
+    Delta of stored properties against their live listing pages, scraped with the browser pool.
+    Body: { key: <agency_key>, pages: [{property_id, url, selectors?}, ...],
+            selectors?: {price, status, address}, concurrency?: 4 }
+    Requires `Authorization: Bearer <token>`. Streams application/x-ndjson: a header line, one
+    line per page as it is scraped with its price/status/address deltas, then a trailer with
+    the summary.
+    """
+    if _authenticated_user() is None:
+        return jsonify({'message': 'Authentication required'}), 401
+    data = request.get_json(silent=True) or {}
+    api_key_raw = data.get("key")
+    if not api_key_raw:
+        return jsonify({"message": "key is required"}), 400
+    agency = _resolve_agency_by_key(unquote(str(api_key_raw)))
+    if not agency:
+        return jsonify({"message": "Unknown agency key"}), 404
+    pages = data.get("pages")
+    if isinstance(pages, list):
+        pages = [
+            {**p, "id": int(p["property_id"]) if str(p.get("property_id", "")).strip().isdigit() else p.get("property_id")}
+            if isinstance(p, dict) else p
+            for p in pages
+        ]
+    try:
+        jobs, concurrency = _page_batch({**data, "pages": pages})
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+
+    ids = [job["id"] for job in jobs if isinstance(job.get("id"), int)]
+    stored = {
+        r.id: {"house_location": r.house_location, "house_price": r.house_price, "status": r.house_extra_info_2}
+        for r in db.session.query(
+            Property.id, Property.house_location, Property.house_price, Property.house_extra_info_2
+        ).filter(Property.agency_name == agency.name, Property.id.in_(ids))
+    } if ids else {}
+    agency_name = agency.name
+
+    def generate():
+        yield json.dumps({"type": "header", "agency": agency_name, "total": len(jobs)}) + "\n"
+        summary = {"changed": 0, "unchanged": 0, "missing": 0, "failed": 0}
+        for result in page_scraper.scraper.scrape(jobs, concurrency):
+            line = {"type": "page", "property_id": result.get("id"), "url": result["url"]}
+            local = stored.get(result.get("id"))
+            if "error" in result:
+                summary["failed"] += 1
+                line["error"] = result["error"]
+            elif local is None:
+                summary["missing"] += 1
+                line["error"] = "Property not found for this agency"
+            else:
+                scraped = result["data"]
+                live = {"house_location": scraped.get("address"), "house_price": scraped.get("price"), "status": scraped.get("status")}
+                line["deltas"] = field_deltas(local, live)
+                line["scrapedAt"] = result["scrapedAt"]
+                summary["changed" if line["deltas"] else "unchanged"] += 1
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"type": "trailer", "summary": summary}) + "\n"
+
+    return _ndjson_response(generate())
+
+
+# ---------------- WordPress fetch ----------------
 def _fetch_wordpress(endpoint: str):
-    """Fetch WP property CPT, normalize minimal fields."""
+    """Fetch WP property CPT (every page), normalize minimal fields."""
     items = []
     errors = []
     try:
-        resp = requests.get(endpoint, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        if isinstance(data, dict):
-            data = data.get("items") or data.get("results") or data.get("properties") or data.get("value") or []
-        if not isinstance(data, list):
-            return [], [{"source": "wordpress", "error": "Unexpected response shape"}]
+        try:
+            data = upstream_flight.do(endpoint, lambda: _wp_crawler.fetch_posts(endpoint)[0])
+        except wordpress_crawler.CrawlTruncated as exc:
+            data = exc.posts  # serve the pages that were read, report the rest
+            errors.append({"source": "wordpress", "error": str(exc)})
         for row in data:
             try:
                 title = unescape(row.get("title", {}).get("rendered", "")) if isinstance(row.get("title"), dict) else unescape(str(row.get("title", "")))
@@ -598,60 +943,182 @@ def _fetch_wordpress(endpoint: str):
     return items, errors
 
 
-def _load_wordpress_endpoints():
-    endpoints = []
-    try:
-        with open(WORDPRESS_ENDPOINTS_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                url = line.strip()
-                if not url:
-                    continue
-                endpoints.append(url)
-    except Exception:
-        pass
-    return endpoints
-
-
-WORDPRESS_ENDPOINTS = _load_wordpress_endpoints()
+WORDPRESS_ENDPOINTS = wordpress_crawler.load_endpoints()
+_wp_crawler = wordpress_crawler.Crawler()
 
 
 def _guess_wordpress_endpoint(agency: Agency):
     """Try to match agency site/domain to a known WP endpoint from the list."""
-    if not WORDPRESS_ENDPOINTS:
-        return None
-    candidates = [agency.site_name or "", agency.site_prefix or "", agency.logo or "", agency.address1 or "", agency.address2 or ""]
-    candidates = [c.lower() for c in candidates if c]
-    for ep in WORDPRESS_ENDPOINTS:
-        domain = _domain_from_url(ep).lower()
-        if not domain:
-            continue
-        for c in candidates:
-            if domain in c:
-                return ep
+    return wordpress_crawler.guess_endpoint(agency, WORDPRESS_ENDPOINTS)
+
+
+def _unknown_wordpress_endpoint(url):
+    """400 response unless url is listed in wordpress_endpoints.txt (callers never pick the host)."""
+    if url not in WORDPRESS_ENDPOINTS:
+        return jsonify({"message": "url is not a known WordPress endpoint"}), 400
     return None
 
 
 @app.route("/api/wordpress", methods=["GET"])
 @cross_origin()
 def get_properties_wordpress():
+    """Properties of one endpoint from wordpress_endpoints.txt (?url=<endpoint>)."""
     url = request.args.get("url")
     if not url:
         return jsonify({"message": "url is required"}), 400
+    rejected = _unknown_wordpress_endpoint(url)
+    if rejected:
+        return rejected
     items, errors = _fetch_wordpress(url)
     return jsonify({"items": items, "errors": errors}), 200
 
 
+@app.route("/api/upstream/stats", methods=["GET"])
+def get_upstream_stats():
+    """Counters for upstream fetch coalescing and the parsed Acquaint feed index."""
+    return jsonify({
+        "singleflight": upstream_flight.stats(),
+        "acquaint_index": acquaint_index.stats(),
+        "images": image_proxy.stats(),
+    }), 200
+
+
+# Stored image URLs already looked up; a photo removed from its listing may still be served
+# until the process restarts
+_listing_image_urls = set()
+_LISTING_IMAGE_URLS_MAX = 50_000
+
+
+def _is_listing_image(url):
+    """True when url is a stored agency_image_url or one of a listing's images_url_house."""
+    if url in _listing_image_urls:
+        return True
+    # images_url_house holds the JSON list the importers write (or a single URL)
+    quoted = json.dumps(url).replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    found = db.session.execute(
+        select(Property.id).where(or_(
+            Property.agency_image_url == url,
+            Property.images_url_house == url,
+            Property.images_url_house.like(f"%{quoted}%", escape="!"),
+        )).limit(1)
+    ).first()
+    if found is None:
+        return False
+    if len(_listing_image_urls) >= _LISTING_IMAGE_URLS_MAX:
+        _listing_image_urls.clear()
+    _listing_image_urls.add(url)
+    return True
+
+
+@app.route("/api/images", methods=["GET"])
+@cross_origin()
+def get_image():
+    """
+    Property photo through the local image cache.
+    Params:
+      - url=<upstream image URL>, which must be a stored agency_image_url or one of
+        images_url_house (other URLs get 403, so the proxy cannot be used for arbitrary images)
+      - w=<width in px> (optional) thumbnail width, rounded up to one of IMAGE_WIDTHS;
+        the original image when omitted
+    Responses carry a content-hash ETag (If-None-Match gives 304) and a long Cache-Control.
+    """
+    url = (request.args.get("url") or "").strip()
+    if not url:
+        return jsonify({"message": "url is required"}), 400
+    if not _is_listing_image(url):
+        return jsonify({"message": "url is not a listing image"}), 403
+    try:
+        width = int(request.args.get("w") or 0)
+    except ValueError:
+        return jsonify({"message": "w must be an integer"}), 400
+    try:
+        f, entry = image_proxy.open_image(url, width)
+    except image_proxy.ImageError as exc:
+        return jsonify({"message": str(exc)}), exc.status
+    response = send_file(
+        f,
+        mimetype=entry["content_type"],
+        etag=entry["etag"],
+        conditional=True,
+        max_age=image_proxy.IMAGE_MAX_AGE_SEC,
+    )
+    response.cache_control.public = True
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus scrape endpoint (all worker and importer processes when METRICS_DIR is set)."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    """Stored request/import profiles, newest first, with their top cumulative functions."""
+    if _authenticated_user() is None:
+        return jsonify({'message': 'Authentication required'}), 401
+    limit = max(1, min(request.args.get("limit", default=50, type=int), 500))
+    return jsonify(profiling.list_profiles(limit)), 200
+
+
+@app.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """One stored profile; ?download=1 returns the raw .prof file for snakeviz/pstats."""
+    if _authenticated_user() is None:
+        return jsonify({'message': 'Authentication required'}), 401
+    paths = profiling.profile_paths(profile_id)
+    if paths is None:
+        return jsonify({'message': 'Profile not found'}), 404
+    json_path, prof_path = paths
+    if request.args.get("download", "").lower() in ["1", "true", "yes"]:
+        return send_file(prof_path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    with open(json_path, "r", encoding="utf-8") as f:
+        return Response(f.read(), mimetype="application/json")
+
+
+@app.route("/api/db/replica", methods=["GET"])
+@read_replica.primary_db
+def get_replica_status():
+    """Read replica routing: health, measured lag and how many requests were served/fell back."""
+    return jsonify(read_replica.status()), 200
+
+
+@app.route("/api/http/stats", methods=["GET"])
+def get_http_stats():
+    """Per-route responses, bytes sent (after compression) and 304 ratio."""
+    return jsonify(http_cache.stats()), 200
+
+
 # ---------------- Grouped properties with variants (for dedup/diffs) ----------------
 
 def _normalize_location(val: str) -> str:
     return (val or "").strip().lower()
 
 
+def _grouped_version():
+    api_key_raw = request.args.get("key")
+    agency = None
+    if api_key_raw:
+        agency = _resolve_agency_by_key(unquote(api_key_raw))
+        if not agency:
+            return None
+    # entity resolution assigns cluster ids after the import commit, so they are part of the version
+    clusters = select(func.count(Property.cluster_id), func.max(Property.cluster_id))
+    if agency:
+        clusters = clusters.where(Property.agency_name == agency.name)
+    resolved, max_cluster = db.session.execute(clusters).one()
+    return f"{_properties_version(agency.name if agency else None)}:{resolved}:{max_cluster}"
+
+
 @app.route("/api/properties/grouped", methods=["GET"])
 @cross_origin()
+@conditional(_grouped_version)
 def get_properties_grouped():
     """
-    Returns properties grouped by normalized house_location.
+    Returns properties grouped by entity-resolution cluster (see entity_resolution.py);
+    rows not resolved yet are grouped by normalized house_location.
     Query params:
       - key=<agency_api_key|site_prefix|myhome_key|daft_api_key> (optional; if provided, filter to that agency)
       - only_dupes=1 (return only groups with count > 1)
@@ -683,20 +1150,23 @@ def get_properties_grouped():
         ).first()
         if not agency:
             return jsonify({'message': 'Unknown agency key'}), 404
-        props = Property.query.filter_by(agency_name=agency.name).all()
+        props = iter_property_dicts(Property.agency_name == agency.name)
     else:
-        props = Property.query.all()
+        props = iter_property_dicts()
     grouped = defaultdict(list)
     for p in props:
-        key = _normalize_location(getattr(p, "house_location", None))
+        cluster_id = p.get("cluster_id")
+        if cluster_id is not None:
+            grouped[("cluster", cluster_id)].append(p)
+            continue
+        key = _normalize_location(p.get("house_location"))
         if not key:
             # skip completely empty locations to avoid dumping everything into one bucket
             continue
-        grouped[key].append(p)
+        grouped[("location", key)].append(p)
 
     result = []
-    for key, items in grouped.items():
-        variants = [i.to_dict() for i in items]
+    for (kind, key), variants in grouped.items():
         sources = sorted({(v.get("source") or "").lower() for v in variants if v.get("source")})
         count = len(variants)
 
@@ -708,7 +1178,8 @@ def get_properties_grouped():
             continue
 
         result.append({
-            "group_key": key,
+            "group_key": key if kind == "location" else _normalize_location(variants[0].get("house_location")),
+            "cluster_id": key if kind == "cluster" else None,
             "count": count,
             "sources": sources,
             "variants": variants,
@@ -719,6 +1190,157 @@ def get_properties_grouped():
 
     return jsonify(result), 200
 
+def _numeric_ranges():
+    """Read min_/max_ price and size query params into {column: (min, max)}."""
+    return {
+        "price_amount": (request.args.get("min_price", type=float), request.args.get("max_price", type=float)),
+        "size_sqm": (request.args.get("min_size", type=float), request.args.get("max_size", type=float)),
+    }
+
+
+LISTING_SORTS = {
+    "price": Property.price_amount.asc().nullslast(),
+    "-price": Property.price_amount.desc().nullslast(),
+    "size": Property.size_sqm.asc().nullslast(),
+    "-size": Property.size_sqm.desc().nullslast(),
+}
+
+
+@app.route("/api/properties/search", methods=["GET"])
+@cross_origin()
+def search_properties_route():
+    """
+    Ranked full-text search with facet counts.
+    Query params:
+      - q=<text> (matches location, agent/agency names and extra info; prefix matching per word)
+      - key=<agency key> (optional; restrict to that agency)
+      - source, status, beds, property_type (optional exact filters)
+      - min_price, max_price, min_size, max_size (optional; numeric, size in m²)
+      - sort=rank|price|-price|size|-size (default rank)
+      - limit (default 20, max 100), offset
+    Total and facets count the newest SEARCH_MATCH_LIMIT matches (total_exact is false past it).
+    """
+    agency_name = None
+    api_key_raw = request.args.get("key")
+    if api_key_raw:
+        agency = _resolve_agency_by_key(unquote(api_key_raw))
+        if not agency:
+            return jsonify({"message": "Unknown agency key"}), 404
+        agency_name = agency.name
+
+    filters = {
+        "source": request.args.get("source"),
+        "status": request.args.get("status"),
+        "beds": request.args.get("beds", type=int),
+        "property_type": request.args.get("property_type") or request.args.get("type"),
+    }
+    limit = min(100, max(1, request.args.get("limit", default=20, type=int)))
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    sort = request.args.get("sort", default="rank")
+    if sort not in SEARCH_SORTS:
+        return jsonify({"message": f"sort must be one of: {', '.join(SEARCH_SORTS)}"}), 400
+
+    found = search_properties(
+        request.args.get("q"),
+        agency_name=agency_name,
+        filters=filters,
+        ranges=_numeric_ranges(),
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+    ids = [pid for pid, _ in found["items"]]
+    rows = {row["id"]: row for row in iter_property_dicts(Property.id.in_(ids))} if ids else {}
+    items = []
+    for pid, rank in found["items"]:
+        if pid in rows:
+            rows[pid]["rank"] = rank
+            items.append(rows[pid])
+
+    return jsonify({
+        "total": found["total"],
+        "total_exact": found["total_exact"],
+        "offset": offset,
+        "limit": limit,
+        "items": items,
+        "facets": found["facets"],
+    }), 200
+
+
+GEO_MAX_RADIUS_KM = 100
+GEO_MAX_RESULTS = 2000
+
+
+def _geo_agency_criteria():
+    """Optional ?key= agency restriction for the geo endpoints; returns (criteria, error_response)."""
+    api_key_raw = request.args.get("key")
+    if not api_key_raw:
+        return [], None
+    agency = _resolve_agency_by_key(unquote(api_key_raw))
+    if not agency:
+        return None, (jsonify({"message": "Unknown agency key"}), 404)
+    return [Property.agency_name == agency.name], None
+
+
+@app.route("/api/properties/near", methods=["GET"])
+@cross_origin()
+def get_properties_near():
+    """
+    Properties within a radius, nearest first.
+    Query params: lat, lng, radius (km, default 2, max 100), key (optional agency), limit (default 200)
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    if lat is None or lng is None or abs(lat) > 90 or abs(lng) > 180:
+        return jsonify({"message": "valid lat and lng are required"}), 400
+    radius = min(GEO_MAX_RADIUS_KM, max(0.01, request.args.get("radius", default=2.0, type=float)))
+    limit = min(GEO_MAX_RESULTS, max(1, request.args.get("limit", default=200, type=int)))
+    criteria, error = _geo_agency_criteria()
+    if error:
+        return error
+
+    items = []
+    for row in iter_property_dicts(*criteria, *geo.bbox_criteria(*geo.radius_box(lat, lng, radius))):
+        distance = geo.haversine_km(lat, lng, row["latitude"], row["longitude"])
+        if distance <= radius:
+            row["distance_km"] = round(distance, 3)
+            items.append(row)
+    items.sort(key=lambda r: r["distance_km"])
+    return jsonify({"total": len(items), "items": items[:limit]}), 200
+
+
+@app.route("/api/properties/bbox", methods=["GET"])
+@cross_origin()
+def get_properties_bbox():
+    """
+    Properties inside a bounding box, for map views.
+    Query params: bbox=min_lng,min_lat,max_lng,max_lat (or min_lat/min_lng/max_lat/max_lng),
+    key (optional agency), limit (default 500)
+    """
+    try:
+        if request.args.get("bbox"):
+            min_lng, min_lat, max_lng, max_lat = [float(v) for v in request.args["bbox"].split(",")]
+        else:
+            min_lat, min_lng, max_lat, max_lng = [float(request.args[k]) for k in ("min_lat", "min_lng", "max_lat", "max_lng")]
+    except (KeyError, ValueError):
+        return jsonify({"message": "bbox=min_lng,min_lat,max_lng,max_lat is required"}), 400
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        return jsonify({"message": "bbox is out of range"}), 400
+    limit = min(GEO_MAX_RESULTS, max(1, request.args.get("limit", default=500, type=int)))
+    criteria, error = _geo_agency_criteria()
+    if error:
+        return error
+
+    items = []
+    truncated = False
+    for row in iter_property_dicts(*criteria, *geo.bbox_criteria(min_lat, min_lng, max_lat, max_lng)):
+        if len(items) >= limit:
+            truncated = True
+            break
+        items.append(row)
+    return jsonify({"total": len(items), "truncated": truncated, "items": items}), 200
+
+
 # Helper function to remove duplicate items
 def remove_duplicate_items(_api_data, _key):
     # Create a dictionary to hold unique items
@@ -736,7 +1358,16 @@ def remove_duplicate_items(_api_data, _key):
     return list(unique_items.values())
 
 # Updated route: Fetch agencies from the database
+def _agencies_version():
+    count, max_id, updated = db.session.execute(
+        select(func.count(Agency.id), func.max(Agency.id), func.max(Agency.updated_at))
+    ).one()
+    # property_count is part of each agency payload
+    return f"{count}:{max_id}:{updated}:{_properties_version()}"
+
+
 @app.route("/api/agencies", methods=['GET'])
+@conditional(_agencies_version)
 def get_agencies():
     agencies = Agency.query.all()  # Query all agencies from the database
     result = []
@@ -752,10 +1383,42 @@ def get_agencies():
     return jsonify(result)  # Convert each agency to a dictionary and return as JSON
 
 # New route: Fetch properties based on agency key
+def _listing_filters(agency):
+    """(criteria, order_by) of the stored listing query params; raises ValueError for a bad sort."""
+    sort = request.args.get("sort")
+    if sort and sort not in LISTING_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(LISTING_SORTS)}")
+    criteria = [Property.agency_name == agency.name]
+    for column, (low, high) in _numeric_ranges().items():
+        if low is not None:
+            criteria.append(getattr(Property, column) >= low)
+        if high is not None:
+            criteria.append(getattr(Property, column) <= high)
+    return criteria, LISTING_SORTS.get(sort)
+
+
+def _default_source(agency):
+    # backfill source from agency if missing
+    return (agency.primary_source or "").strip().lower() or "unknown"
+
+
+def _listing_version():
+    api_key_raw = request.args.get("key")
+    if not api_key_raw or request.args.get("force_refresh", "").lower() in ["1", "true", "yes"]:
+        return None  # upstream data: ETag from the body hash
+    agency = _resolve_agency_by_key(unquote(api_key_raw))
+    return _properties_version(agency.name) if agency else None
+
+
 @app.route("/api/properties", methods=['GET'])
+@conditional(_listing_version)
 def get_properties_external():
     """
-    Fetch properties using the agency's primary_source and stored API key.
+    Serve the agency's stored properties.
+    Stored rows accept min_price, max_price, min_size, max_size (m²) and sort=price|-price|size|-size.
+    force_refresh=1 queues a background refresh of the agency's primary_source feed instead and
+    returns 202 with a job to poll at /api/refresh/<job_id> (refresh_jobs.py); a refresh already
+    running for the agency is returned rather than started twice.
     Supports:
       - primary_source == '4pm'      -> https://api2.4pm.ie/api/property/json?Key=<unique_key>
       - primary_source == 'acquaint' -> https://www.acquaintcrm.co.uk/datafeeds/standardxml/<site_prefix>-0.xml
@@ -783,50 +1446,116 @@ def get_properties_external():
     # If we already have properties in DB for this agency and no force_refresh, return cached data (even empty list)
     force_refresh = request.args.get("force_refresh", "").lower() in ["1", "true", "yes"]
     if not force_refresh:
-        existing_props = Property.query.filter_by(agency_name=agency.name).all()
-        props_dict = [p.to_dict() for p in existing_props]
-        # backfill source from agency if missing
-        agency_source = (agency.primary_source or "").strip().lower() or None
-        for item in props_dict:
-            if not item.get("source"):
-                item["source"] = agency_source or "unknown"
-            if not item.get("sourceLabel"):
-                item["sourceLabel"] = item.get("source")
-        return jsonify(props_dict)
-
-    source = (agency.primary_source or '').lower().strip()
-
-    # Explicit source selection
-    if source == 'acquaint':
-        prefix = (agency.site_prefix or agency.acquaint_site_prefix or '').strip()
-        if not prefix:
-            return jsonify({'message': 'Missing Acquaint site_prefix for this agency'}), 400
-        return _fetch_properties_acquaint(prefix)
-
-    if source == 'myhome':
-        myhome_key = (agency.myhome_api_key or '').strip()
-        if not myhome_key:
-            return jsonify({'message': 'Missing MyHome API key for this agency'}), 400
-        return _fetch_properties_myhome(myhome_key, correlation_id=api_key)
-
-    if source == '4pm':
-        return _fetch_properties_4pm(agency.unique_key or api_key)
-
-    # Fallback auto-detect by available keys if primary_source not set
-    prefix = (agency.site_prefix or agency.acquaint_site_prefix or '').strip()
-    if prefix:
-        return _fetch_properties_acquaint(prefix)
-    if agency.myhome_api_key:
-        return _fetch_properties_myhome(agency.myhome_api_key, correlation_id=api_key)
-    return _fetch_properties_4pm(agency.unique_key or api_key)
+        try:
+            criteria, order_by = _listing_filters(agency)
+        except ValueError as exc:
+            return jsonify({'message': str(exc)}), 400
+        body = property_list_json(*criteria, default_source=_default_source(agency), order_by=order_by)
+        return Response(body, mimetype="application/json")
+
+    # force_refresh: refresh the agency in the background and hand back a job to poll
+    try:
+        source, feed_key = refresh_jobs.plan(agency, api_key, _guess_wordpress_endpoint(agency))
+    except ValueError as exc:
+        return jsonify({'message': str(exc)}), 400
+    job, created = refresh_jobs.enqueue(app, agency, source, feed_key)
+    return _refresh_job_response(job, created)
+
+
+@app.route("/api/properties/export", methods=["GET"])
+def export_properties():
+    """
+    Download the agency's stored properties as a file.
+    Params: key=<agency key>, format=csv|xlsx (default csv), plus the /api/properties filters
+    (min_price, max_price, min_size, max_size, sort). Rows are streamed from the database, so
+    memory use does not grow with the export (see export.py).
+    """
+    api_key_raw = request.args.get('key')
+    if not api_key_raw:
+        return jsonify({'message': 'API key is required'}), 400
+    agency = _resolve_agency_by_key(unquote(api_key_raw))
+    if not agency:
+        return jsonify({'message': 'Unknown agency key'}), 404
+    fmt = (request.args.get("format") or "csv").strip().lower()
+    if fmt not in export.FORMATS:
+        return jsonify({'message': f"format must be one of: {', '.join(export.FORMATS)}"}), 400
+    try:
+        criteria, order_by = _listing_filters(agency)
+    except ValueError as exc:
+        return jsonify({'message': str(exc)}), 400
+
+    body = export.iter_export(fmt, *criteria, default_source=_default_source(agency), order_by=order_by)
+    name = export.filename(agency.name, fmt, datetime.date.today())
+    return Response(
+        stream_with_context(body),
+        content_type=export.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "X-Accel-Buffering": "no"},
+    )
+
+
+def _refresh_job_response(body, created=None):
+    """Response for a refresh job given as its ImportActivity.to_dict()."""
+    body = dict(body)
+    body["job_id"] = body["id"]
+    body["done"] = body["status"] not in refresh_jobs.ACTIVE_STATUSES
+    body["status_url"] = f"/api/refresh/{body['id']}"
+    if created is None:
+        return jsonify(body), 200
+    body["created"] = created
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers["Location"] = body["status_url"]
+    return response
+
+
+@app.route("/api/ingest", methods=["POST"])
+@cross_origin()
+def ingest_listings():
+    """
+    Pushed listing changes for one agency and source (see ingest.py for the batch format).
+    Requires `X-Ingest-Token: <token>` issued for that agency; user logins are not accepted.
+    Returns the inserted/updated/deleted counts; an invalid batch is rejected whole with 400
+    and per-item errors.
+    """
+    if not ingest.INGEST_SECRET:
+        return jsonify({'message': 'Push ingestion is not configured'}), 503
+    token = (request.headers.get("X-Ingest-Token") or "").strip()
+    if not token:
+        return jsonify({'message': 'Ingest token required'}), 401
+    payload = request.get_json(silent=True)
+    api_key_raw = payload.get("agency") if isinstance(payload, dict) else None
+    if not api_key_raw:
+        return jsonify({'message': 'agency key is required'}), 400
+    agency = _resolve_agency_by_key(str(api_key_raw).strip())
+    # same answer for unknown agencies and wrong tokens, so keys cannot be probed
+    if not agency or not ingest.token_allows(agency.name, token):
+        return jsonify({'message': 'Ingest token is not valid for this agency'}), 403
+    try:
+        result = ingest.ingest(agency, payload)
+    except ingest.BatchError as exc:
+        return jsonify({'message': str(exc), 'errors': exc.errors}), 400
+    except Exception as exc:
+        return jsonify({'message': 'Failed to apply batch', 'error': str(exc)}), 500
+    return jsonify({"agency_name": agency.name, **result}), 200
+
+
+@app.route("/api/refresh/<int:job_id>", methods=["GET"])
+@read_replica.primary_db
+def get_refresh_job(job_id):
+    """Status of a force_refresh job: queued/running (message = stage), then ok/failed."""
+    job = refresh_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'message': 'Refresh job not found'}), 404
+    return _refresh_job_response(job.to_dict())
 
 
 def _fetch_properties_4pm(key):
     url = f"https://api2.4pm.ie/api/property/json?Key={key}"
     try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
-        data = response.json()
+        with metrics.upstream("daft", url):
+            response = requests.get(url, timeout=20)
+            response.raise_for_status()
+            data = response.json()
         data = _tag_source(data, "daft")
         return jsonify(data)
     except requests.exceptions.HTTPError as e:
@@ -840,13 +1569,16 @@ def _fetch_properties_4pm(key):
 def _fetch_properties_acquaint(key):
     url = f"https://www.acquaintcrm.co.uk/datafeeds/standardxml/{key}-0.xml"
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+        with metrics.upstream("acquaint", url):
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+        import xmltodict  # only the Acquaint XML feeds need it
         xml_data = xmltodict.parse(response.text)
         props = xml_data.get("data", {}).get("properties", {}).get("property", [])
         # Ensure list
         if isinstance(props, dict):
             props = [props]
+        acquaint_index.put(key, props, size_hint=len(response.text))
         props = _tag_source(props, "acquaint")
         return jsonify(props)
     except requests.exceptions.HTTPError as e:
@@ -862,9 +1594,10 @@ def _fetch_properties_myhome(api_key, correlation_id=None):
     corr = correlation_id or api_key
     url = f"https://agentapi.myhome.ie/search/{api_key}?format=json&correlationId={corr}&PageSize=50&PropertyClassIds=1"
     try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
-        data = response.json()
+        with metrics.upstream("myhome", url):
+            response = requests.get(url, timeout=20)
+            response.raise_for_status()
+            data = response.json()
         # Ensure list; if MyHome returns error object, bubble it as 502
         items = None
         if isinstance(data, list):
@@ -886,6 +1619,11 @@ def _fetch_properties_myhome(api_key, correlation_id=None):
         return jsonify({'message': 'Invalid JSON response from MyHome'}), 502
 
 
+def _get_myhome_detail(url):
+    with metrics.upstream("myhome", url):
+        return json.loads(requests.request("GET", url).text)
+
+
 @app.route("/api/myhome", methods=['GET'])
 @cross_origin(origins="*")  # Allow cross-origin requests from any origin
 def get_property():
@@ -908,8 +1646,7 @@ def get_property():
         pass
 
     url = f"https://agentapi.myhome.ie/property/{api_key}/{id}?format=json"
-    response = requests.request("GET", url)
-    data = json.loads(response.text)
+    data = upstream_flight.do(url, lambda: _get_myhome_detail(url))
     return jsonify(data)
 
 @app.route("/api/acquaint", methods=['GET'])
@@ -933,22 +1670,30 @@ def get_property_by_id():
     if property_id.startswith(api_key):
         property_id = property_id[len(api_key):]
 
-    url = f"https://www.acquaintcrm.co.uk/datafeeds/standardxml/{api_key}-0.xml"
-    
-    # Fetch the XML data
-    response = requests.request("GET", url)
-    if response.status_code != 200:
-        return jsonify({'message': 'Failed to fetch data from the external API'}), response.status_code
+    # Serve from the parsed feed index when this feed was fetched recently
+    cached, matching_property = acquaint_index.get_record(api_key, property_id)
+    if not cached:
+        url = f"https://www.acquaintcrm.co.uk/datafeeds/standardxml/{api_key}-0.xml"
 
-    # Parse the XML data
-    try:
-        xml_data = xmltodict.parse(response.text)
-        properties = xml_data["data"]["properties"]["property"]
-    except Exception as e:
-        return jsonify({'message': 'Error parsing XML data', 'error': str(e)}), 500
+        # Fetch the XML data
+        response = requests.request("GET", url)
+        if response.status_code != 200:
+            return jsonify({'message': 'Failed to fetch data from the external API'}), response.status_code
+
+        # Parse the XML data
+        try:
+            import xmltodict  # only the Acquaint XML feeds need it
+            xml_data = xmltodict.parse(response.text)
+            properties = xml_data["data"]["properties"]["property"]
+            if isinstance(properties, dict):
+                properties = [properties]
+        except Exception as e:
+            return jsonify({'message': 'Error parsing XML data', 'error': str(e)}), 500
+
+        # Index the whole feed so the next lookups for this agency skip the download
+        acquaint_index.put(api_key, properties, size_hint=len(response.text))
+        matching_property = next((prop for prop in properties if prop["id"] == property_id), None)
 
-    # Find the property with the matching ID
-    matching_property = next((prop for prop in properties if prop["id"] == property_id), None)
     if not matching_property:
         return jsonify({'message': 'Property not found'}), 404
 
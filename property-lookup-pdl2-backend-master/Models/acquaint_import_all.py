@@ -5,18 +5,24 @@ Import all properties from Acquaint feeds for agencies stored in DB.
 - Existing properties for each agency are removed before import to avoid duplicates.
 """
 
+import time
 import requests
 from dotenv import load_dotenv
 from sqlalchemy import or_
-from App import app
+from bootstrap import app
 from models import db, Agency, Property
-from myhome_import import fetch_acquaint, parse_acquaint, map_property_acquaint
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+import metrics
+from myhome_import import load_acquaint, map_property_acquaint
 
 load_dotenv()
 
 
 def import_acquaint():
-    with app.app_context():
+    with app.app_context(), query_scope("import:acquaint") as db_scope:
         agencies = Agency.query.filter(
             or_(
                 Agency.primary_source == 'acquaint',
@@ -32,11 +38,12 @@ def import_acquaint():
                 continue
 
             print(f"[Acquaint] Fetching for agency '{agency.name}' with prefix '{prefix}'")
+            started = time.perf_counter()
             try:
-                xml_text = fetch_acquaint(prefix)
-                rows = parse_acquaint(xml_text) or []
+                rows = load_acquaint(prefix, index=False)
             except Exception as exc:
                 print(f"[Acquaint] Failed fetching for {agency.name}: {exc}")
+                metrics.record_import("acquaint", 0, time.perf_counter() - started, status="failed")
                 continue
 
             # Clear only Acquaint properties for this agency; keep other sources (e.g., MyHome)
@@ -56,12 +63,18 @@ def import_acquaint():
                     print(f"[Acquaint] Skip property for {agency.name}: {exc}")
 
             try:
+                refresh_agency_stats(agency.name, imported=["acquaint"])
                 db.session.commit()
                 print(f"[Acquaint] Imported properties for agency {agency.name} (count: {added})")
+                metrics.record_import("acquaint", added, time.perf_counter() - started)
             except Exception as exc:
                 db.session.rollback()
                 print(f"[Acquaint] Commit failed for agency {agency.name}: {exc}")
+                metrics.record_import("acquaint", 0, time.perf_counter() - started, status="failed")
+
+        resolve_after_import()
+        print(f"[Acquaint] DB: {db_scope.summary()}")
 
 
 if __name__ == "__main__":
-    import_acquaint()
+    run_cli(import_acquaint, "import:acquaint")  # --profile stores a cProfile of the run
@@ -9,9 +9,14 @@ import json
 import pathlib
 import datetime
 from dotenv import load_dotenv
-from App import app
+from bootstrap import app
 from models import db, Property, ImportActivity
-from myhome_import import fetch_acquaint, parse_acquaint, map_property_acquaint
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+import metrics
+from myhome_import import load_acquaint, map_property_acquaint
 
 load_dotenv()
 
@@ -29,15 +34,14 @@ def load_prefixes():
 
 def import_all():
     prefixes = load_prefixes()
-    with app.app_context():
+    with app.app_context(), query_scope("import:acquaint_file") as db_scope:
         for pref in prefixes:
             if not pref:
                 continue
             print(f"[Acquaint] Fetching prefix {pref}")
             started = datetime.datetime.utcnow()
             try:
-                xml_text = fetch_acquaint(pref)
-                rows = parse_acquaint(xml_text) or []
+                rows = load_acquaint(pref, index=False)
             except Exception as exc:
                 print(f"[Acquaint] Failed fetch {pref}: {exc}")
                 db.session.add(ImportActivity(
@@ -50,6 +54,7 @@ def import_all():
                     finished_at=datetime.datetime.utcnow()
                 ))
                 db.session.commit()
+                metrics.record_import("acquaint", 0, (datetime.datetime.utcnow() - started).total_seconds(), status="failed")
                 continue
 
             # clear old
@@ -68,6 +73,7 @@ def import_all():
                 except Exception as exc:
                     print(f"[Acquaint] Skip property ({pref}): {exc}")
             try:
+                refresh_agency_stats(pref, imported=["acquaint"])
                 db.session.commit()
                 print(f"[Acquaint] Imported {added} properties for {pref}")
                 finished = datetime.datetime.utcnow()
@@ -82,6 +88,7 @@ def import_all():
                     duration_sec=(finished - started).total_seconds()
                 ))
                 db.session.commit()
+                metrics.record_import("acquaint", added, (finished - started).total_seconds())
             except Exception as exc:
                 db.session.rollback()
                 print(f"[Acquaint] Commit failed for {pref}: {exc}")
@@ -95,7 +102,11 @@ def import_all():
                     finished_at=datetime.datetime.utcnow()
                 ))
                 db.session.commit()
+                metrics.record_import("acquaint", 0, (datetime.datetime.utcnow() - started).total_seconds(), status="failed")
+
+        resolve_after_import()
+        print(f"[Acquaint] DB: {db_scope.summary()}")
 
 
 if __name__ == "__main__":
-    import_all()
+    run_cli(import_all, "import:acquaint_file")  # --profile stores a cProfile of the run
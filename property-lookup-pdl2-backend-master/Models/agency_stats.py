@@ -0,0 +1,114 @@
+"""
+Materialized listing statistics per agency and source (agency_source_stats).
+- refresh_agency_stats() recomputes one agency's rows from the properties table through the
+  (agency_name, source) index. Importers call it right before their per-agency commit, so the
+  figures change in the same transaction as the listings.
+- Agency.total_properties is kept equal to the agency's total across sources.
+- rebuild_all_stats() fills the table for every agency (first deploy, manual edits).
+
+Usage:
+  python agency_stats.py     # rebuild the whole table
+"""
+
+import datetime
+import statistics
+
+from sqlalchemy import func, select, update
+
+from models import db, Agency, AgencySourceStats, ImportActivity, Property
+
+STATUS_BUCKETS = ("live", "agreed", "sold")
+
+
+def status_bucket(status):
+    text = (status or "").lower()
+    if "agreed" in text:
+        return "agreed"
+    if "sold" in text:
+        return "sold"
+    return "live"
+
+
+def _summarize(agency_name, source, statuses, prices, last_import_at, now):
+    counts = dict.fromkeys(STATUS_BUCKETS, 0)
+    for status in statuses:
+        counts[status_bucket(status)] += 1
+    return {
+        "agency_name": agency_name,
+        "source": source,
+        "total_count": len(statuses),
+        "live_count": counts["live"],
+        "agreed_count": counts["agreed"],
+        "sold_count": counts["sold"],
+        "priced_count": len(prices),
+        "min_price": min(prices) if prices else None,
+        "median_price": statistics.median(prices) if prices else None,
+        "max_price": max(prices) if prices else None,
+        "last_import_at": last_import_at,
+        "updated_at": now,
+    }
+
+
+def refresh_agency_stats(agency_name, imported=(), conn=None):
+    """
+    Recompute the stats rows of one agency. Sources listed in `imported` get last_import_at
+    set to now (and a row even when the import produced nothing); the others keep theirs.
+    Runs on db.session unless a connection is given, and does not commit.
+    """
+    ex = conn if conn is not None else db.session
+    stats = AgencySourceStats.__table__
+    now = datetime.datetime.utcnow()
+    previous = dict(ex.execute(
+        select(stats.c.source, stats.c.last_import_at).where(stats.c.agency_name == agency_name)
+    ).all())
+    if not previous:
+        # first time this agency is summarized: take import times from the activity log
+        previous = dict(ex.execute(
+            select(ImportActivity.source, func.max(ImportActivity.finished_at))
+            .where(ImportActivity.agency_name == agency_name, ImportActivity.status == "ok")
+            .group_by(ImportActivity.source)
+        ).all())
+
+    statuses = {source: [] for source in imported}
+    prices = {source: [] for source in imported}
+    rows = ex.execute(
+        select(Property.source, Property.house_extra_info_2, Property.price_amount)
+        .where(Property.agency_name == agency_name)
+    )
+    for source, status, price in rows:
+        source = source or "unknown"
+        statuses.setdefault(source, []).append(status)
+        if price is not None:
+            prices.setdefault(source, []).append(price)
+
+    params = [
+        _summarize(agency_name, source, statuses[source], prices.get(source, []),
+                   now if source in imported else previous.get(source), now)
+        for source in sorted(statuses)
+    ]
+    ex.execute(stats.delete().where(stats.c.agency_name == agency_name))
+    if params:
+        ex.execute(stats.insert(), params)
+    ex.execute(
+        update(Agency.__table__)
+        .where(Agency.__table__.c.name == agency_name)
+        .values(total_properties=sum(p["total_count"] for p in params))
+    )
+    return params
+
+
+def rebuild_all_stats(conn=None):
+    ex = conn if conn is not None else db.session
+    names = ex.execute(select(Property.agency_name).where(Property.agency_name.isnot(None)).distinct()).scalars().all()
+    for name in names:
+        refresh_agency_stats(name, conn=conn)
+    return len(names)
+
+
+if __name__ == "__main__":
+    from bootstrap import app
+
+    with app.app_context():
+        count = rebuild_all_stats()
+        db.session.commit()
+        print(f"[Stats] Rebuilt statistics for {count} agencies")
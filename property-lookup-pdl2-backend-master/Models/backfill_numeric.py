@@ -0,0 +1,62 @@
+"""
+Backfill price_amount / price_currency / price_qualifier / size_sqm for existing properties.
+- Adds the columns and indexes first if the database predates them.
+- Walks the table in id order in batches and only touches rows whose numeric columns are
+  still empty (pass --all to re-parse every row, e.g. after a parser change).
+"""
+
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import select, update, bindparam, or_
+from bootstrap import app
+from models import db, Property
+from parsing import parse_price, parse_size
+from schema import ensure_schema
+
+load_dotenv()
+
+BATCH_SIZE = 2000
+
+
+def backfill_numeric(reparse_all=False):
+    with app.app_context():
+        ensure_schema(db.engine)
+        stmt = (
+            update(Property.__table__)
+            .where(Property.__table__.c.id == bindparam("row_id"))
+            .values(
+                price_amount=bindparam("price_amount"),
+                price_currency=bindparam("price_currency"),
+                price_qualifier=bindparam("price_qualifier"),
+                size_sqm=bindparam("size_sqm"),
+            )
+        )
+        last_id = 0
+        updated = 0
+        while True:
+            query = select(Property.id, Property.house_price, Property.house_mt_squared).where(Property.id > last_id)
+            if not reparse_all:
+                query = query.where(or_(Property.price_amount.is_(None), Property.size_sqm.is_(None)))
+            rows = db.session.execute(query.order_by(Property.id).limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            params = []
+            for row_id, price, size in rows:
+                amount, currency, qualifier = parse_price(price)
+                params.append({
+                    "row_id": row_id,
+                    "price_amount": amount,
+                    "price_currency": currency,
+                    "price_qualifier": qualifier,
+                    "size_sqm": parse_size(size),
+                })
+            db.session.execute(stmt, params)
+            db.session.commit()
+            updated += len(params)
+            last_id = rows[-1][0]
+            print(f"[Backfill] {updated} rows parsed (last id {last_id})")
+        print(f"[Backfill] Done, {updated} rows parsed")
+
+
+if __name__ == "__main__":
+    backfill_numeric(reparse_all="--all" in sys.argv[1:])
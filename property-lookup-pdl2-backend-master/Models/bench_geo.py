@@ -0,0 +1,96 @@
+"""
+Benchmark: radius query through the geohash index vs a full scan with haversine.
+Builds a throwaway SQLite database with N rows spread over Ireland and reports the
+median latency of random 2 km radius queries for both strategies.
+
+Usage:
+  python bench_geo.py                # 100k and 1M rows
+  python bench_geo.py 250000         # custom sizes
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import statistics
+
+from flask import Flask
+from sqlalchemy import select
+from models import db, Property
+import geo
+
+QUERIES = 50
+RADIUS_KM = 2.0
+# Rough bounding box of the island of Ireland
+LAT_RANGE = (51.4, 55.4)
+LNG_RANGE = (-10.5, -5.9)
+
+
+def _seed(count, rng):
+    batch = []
+    for i in range(count):
+        lat = rng.uniform(*LAT_RANGE)
+        lng = rng.uniform(*LNG_RANGE)
+        batch.append({
+            "agency_agent_name": "Agent",
+            "agency_name": f"Agency {i % 500}",
+            "house_location": f"{i} Bench Road",
+            "house_price": "N/A",
+            "house_bedrooms": 3,
+            "house_bathrooms": 1,
+            "house_mt_squared": "N/A",
+            "latitude": lat,
+            "longitude": lng,
+            "geohash": geo.encode(lat, lng),
+        })
+        if len(batch) >= 20000:
+            db.session.execute(Property.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Property.__table__.insert(), batch)
+    db.session.commit()
+
+
+def _indexed(lat, lng):
+    criteria = geo.bbox_criteria(*geo.radius_box(lat, lng, RADIUS_KM))
+    rows = db.session.execute(select(Property.id, Property.latitude, Property.longitude).where(*criteria)).all()
+    return [r.id for r in rows if geo.haversine_km(lat, lng, r.latitude, r.longitude) <= RADIUS_KM]
+
+
+def _full_scan(lat, lng):
+    rows = db.session.execute(select(Property.id, Property.latitude, Property.longitude)).all()
+    return [r.id for r in rows if geo.haversine_km(lat, lng, r.latitude, r.longitude) <= RADIUS_KM]
+
+
+def _median_ms(fn, points):
+    timings = []
+    for lat, lng in points:
+        started = time.perf_counter()
+        fn(lat, lng)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes):
+    rng = random.Random(42)
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = Flask(__name__)
+            app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db.init_app(app)
+            with app.app_context():
+                db.create_all()
+                _seed(count, rng)
+                points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(QUERIES)]
+                # sanity check: both strategies find the same rows
+                assert sorted(_indexed(*points[0])) == sorted(_full_scan(*points[0]))
+                indexed_ms = _median_ms(_indexed, points)
+                scan_ms = _median_ms(_full_scan, points[:5])
+                print(f"{count:>9} rows | geohash index: {indexed_ms:8.2f} ms | full scan: {scan_ms:9.2f} ms | x{scan_ms / indexed_ms:.0f}")
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
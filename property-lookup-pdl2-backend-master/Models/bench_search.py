@@ -0,0 +1,97 @@
+"""
+Benchmark: property search (search.search_properties) latency at N rows.
+Seeds N listings with repetitive addresses, so common words ("street", "dublin") match a
+large share of the table, and reports p50/p95 of each query over ROUNDS runs.
+Runs on a throwaway SQLite database unless SEARCH_BENCH_URI points at an empty scratch
+database (e.g. postgresql://localhost/search_bench); its properties table is dropped first.
+
+Usage:
+  python bench_search.py                # 100k and 1M rows
+  python bench_search.py 250000         # custom sizes
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+from flask import Flask
+from models import db, Property
+from schema import ensure_schema
+from search import search_properties
+
+ROUNDS = 40
+STREETS = ["Main", "High", "Church", "Mill", "Park", "Green", "Oak", "Elm", "River", "Castle",
+           "Abbey", "Bridge", "Station", "Chapel", "Fair"]
+TOWNS = ["Cork", "Dublin", "Galway", "Limerick", "Sligo", "Ennis", "Naas", "Bray", "Tralee", "Athlone"]
+# (label, search_properties kwargs)
+QUERIES = [
+    ("number + word: 12 abbey", {"q": "12 abbey"}),
+    ("two words: mill cork", {"q": "mill cork"}),
+    ("broad: dublin", {"q": "dublin"}),
+    ("every row: street", {"q": "street"}),
+    ("every row by price", {"q": "street", "sort": "price"}),
+    ("word + facet: house, 2 beds", {"q": "house", "filters": {"beds": 2}}),
+    ("agency only", {"agency_name": "Agency 7"}),
+    ("no query", {}),
+]
+
+
+def _seed(count, rng):
+    batch = []
+    for i in range(count):
+        batch.append({
+            "agency_agent_name": "Agent",
+            "agency_name": f"Agency {i % 500}",
+            "house_location": f"{rng.randint(1, 300)} {rng.choice(STREETS)} Street, {rng.choice(TOWNS)}",
+            "house_price": "N/A",
+            "house_bedrooms": i % 5,
+            "house_bathrooms": 1,
+            "house_mt_squared": "N/A",
+            "house_extra_info_1": rng.choice(["House", "Apartment"]),
+            "house_extra_info_2": rng.choice(["For Sale", "Agreed"]),
+            "price_amount": rng.choice([None, rng.randint(100, 900) * 1000]),
+            "source": rng.choice(["daft", "myhome", "acquaint"]),
+        })
+        if len(batch) >= 20000:
+            db.session.execute(Property.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Property.__table__.insert(), batch)
+    db.session.commit()
+
+
+def _percentiles_ms(kwargs):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        found = search_properties(**kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1], found
+
+
+def run(sizes):
+    rng = random.Random(42)
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = Flask(__name__)
+            app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SEARCH_BENCH_URI") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db.init_app(app)
+            with app.app_context():
+                Property.__table__.drop(db.engine, checkfirst=True)
+                db.create_all()
+                _seed(count, rng)
+                ensure_schema(db.engine)  # listing and search indexes, as at app startup
+                print(f"{count} rows ({db.engine.dialect.name})")
+                for label, kwargs in QUERIES:
+                    p50, p95, found = _percentiles_ms(kwargs)
+                    total = f"{found['total']}{'' if found['total_exact'] else '+'}"
+                    print(f"  {label:<30} | {total:>6} matches | p50 {p50:7.1f} ms | p95 {p95:7.1f} ms")
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: Property.to_dict() listing path vs the Core select() path in fast_rows.
+Builds a throwaway SQLite database with N rows and reports rows/sec for each path.
+
+Usage:
+  python bench_serialize.py            # 10k and 100k rows
+  python bench_serialize.py 50000      # custom sizes
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+from flask import Flask
+from models import db, Property
+from fast_rows import iter_property_dicts, property_list_json, orjson
+
+AGENCY = "Bench Agency"
+
+
+def _seed(count):
+    rows = []
+    for i in range(count):
+        rows.append({
+            "agency_agent_name": "Agent",
+            "agency_name": AGENCY,
+            "house_location": f"{i} Main Street, Dublin",
+            "house_price": f"€{300000 + i:,}",
+            "house_bedrooms": i % 5,
+            "house_bathrooms": i % 3,
+            "house_mt_squared": "120 m²",
+            "house_extra_info_1": "House",
+            "house_extra_info_2": "For Sale",
+            "house_extra_info_3": "Live",
+            "house_extra_info_4": "For Sale",
+            "agency_image_url": f"https://img.example.com/{i}.jpg",
+            "images_url_house": json.dumps([f"https://img.example.com/{i}.jpg"]),
+            "source": None if i % 10 == 0 else "daft",
+        })
+    db.session.execute(Property.__table__.insert(), rows)
+    db.session.commit()
+
+
+def _orm_path():
+    props = Property.query.filter_by(agency_name=AGENCY).all()
+    props_dict = [p.to_dict() for p in props]
+    for item in props_dict:
+        if not item.get("source"):
+            item["source"] = "unknown"
+        if not item.get("sourceLabel"):
+            item["sourceLabel"] = item.get("source")
+    return json.dumps(props_dict).encode("utf-8")
+
+
+def _fast_path():
+    return property_list_json(Property.agency_name == AGENCY, default_source="unknown")
+
+
+def _time(fn, count, repeat=3):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best, best
+
+
+def run(sizes):
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = Flask(__name__)
+            app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db.init_app(app)
+            with app.app_context():
+                db.create_all()
+                _seed(count)
+                # sanity check: both paths return the same rows
+                sample = next(iter_property_dicts(Property.agency_name == AGENCY, default_source="unknown"))
+                assert set(sample) == set(Property.query.first().to_dict())
+                orm_rate, orm_sec = _time(_orm_path, count)
+                fast_rate, fast_sec = _time(_fast_path, count)
+                print(
+                    f"{count:>8} rows | to_dict: {orm_rate:>10,.0f} rows/s ({orm_sec:.3f}s)"
+                    f" | fast_rows{' +orjson' if orjson else ''}: {fast_rate:>10,.0f} rows/s ({fast_sec:.3f}s)"
+                    f" | x{fast_rate / orm_rate:.1f}"
+                )
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
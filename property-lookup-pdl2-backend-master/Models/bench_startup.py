@@ -0,0 +1,63 @@
+"""
+Startup cost of the web app vs the importer bootstrap.
+Each module is imported in a fresh interpreter (against a throwaway SQLite database unless
+SQLALCHEMY_DATABASE_URI is set) and the import time, peak RSS and number of loaded modules
+are reported, best of N runs.
+
+Usage:
+  python bench_startup.py                       # App, bootstrap and the importers
+  python bench_startup.py daft_import 10        # custom module(s) and run count
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_MODULES = ("App", "bootstrap", "myhome_import", "daft_import", "acquaint_import_all")
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "xmltodict": "xmltodict" in sys.modules,
+}))
+"""
+
+
+def measure(module, runs, env):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, module],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(samples, key=lambda s: s["seconds"])
+    best["max_rss_mb"] = min(s["max_rss_mb"] for s in samples)
+    return best
+
+
+def main():
+    args = sys.argv[1:]
+    runs = int(args.pop()) if args and args[-1].isdigit() else 5
+    modules = args or DEFAULT_MODULES
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        env.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        print(f"{'module':<22}{'import ms':>10}{'RSS MB':>9}{'modules':>9}  xmltodict")
+        for module in modules:
+            r = measure(module, runs, env)
+            print(f"{module:<22}{r['seconds'] * 1000:>10.0f}{r['max_rss_mb']:>9.1f}{r['modules']:>9}  "
+                  f"{'loaded' if r['xmltodict'] else '-'}")
+
+
+if __name__ == "__main__":
+    main()
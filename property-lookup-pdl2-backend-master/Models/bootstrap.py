@@ -0,0 +1,38 @@
+"""
+Data-layer bootstrap for the import scripts and scheduled jobs.
+Builds a bare Flask app that only carries the database (engine, db.session, models), so
+`from bootstrap import app` gives an app context without importing App.py: no CORS, no
+routes, no WordPress endpoint list and none of the web-only modules.
+The schema is checked the same way the web app does it (import_activity, ensure_schema).
+When the web app imports an importer module inside a request, its own app is reused.
+
+  python bench_startup.py    # startup time and memory of App.py vs this module
+"""
+
+import os
+
+from dotenv import load_dotenv
+from flask import Flask, current_app, has_app_context
+
+from models import db, ImportActivity
+from schema import ensure_schema
+
+load_dotenv()
+
+
+def create_data_app():
+    data_app = Flask("importer")
+    data_app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
+    data_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(data_app)
+    with data_app.app_context():
+        try:
+            ImportActivity.__table__.create(db.engine, checkfirst=True)
+        except Exception:
+            pass
+        ensure_schema(db.engine)
+    return data_app
+
+
+# App.py pulls mapping helpers from myhome_import at request time; don't build a second app then
+app = current_app._get_current_object() if has_app_context() else create_data_app()
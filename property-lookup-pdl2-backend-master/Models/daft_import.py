@@ -9,8 +9,17 @@ import datetime
 import requests
 from dotenv import load_dotenv
 from sqlalchemy import or_
-from App import app
+from bootstrap import app
 from models import db, Agency, Property, ImportActivity
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+from singleflight import upstream_flight
+import metrics
+from parsing import apply_numeric_fields
+from geo import apply_coordinates
+from matcher import normalize_eircode
 
 load_dotenv()
 
@@ -36,6 +45,8 @@ def map_property_4pm(raw, agency_name):
     beds = raw.get("bedrooms") or raw.get("beds") or 0
     baths = raw.get("bathrooms") or raw.get("baths") or 0
     size = raw.get("square_metres") or raw.get("sq_ft") or raw.get("acres") or "N/A"
+    # The daft payload carries the unit in the field name, not in the value
+    size_unit = "sqm" if raw.get("square_metres") else "sqft" if raw.get("sq_ft") else "acres" if raw.get("acres") else None
 
     prop_type = raw.get("property_type") or raw.get("house_type")
     status = "Agreed" if str(raw.get("agreed") or "0") != "0" else "For Sale"
@@ -53,7 +64,7 @@ def map_property_4pm(raw, agency_name):
     main_photo = photos[0] if photos else None
     images_json = clamp(json.dumps(photos[:5]), 255) if photos else None
 
-    return Property(
+    prop = Property(
         agency_agent_name=clamp(raw.get("agent") or raw.get("Agent") or agency_name),
         agency_name=clamp(agency_name),
         house_location=clamp(address),
@@ -69,14 +80,23 @@ def map_property_4pm(raw, agency_name):
         images_url_house=images_json,
         source="daft",
     )
+    apply_coordinates(prop, raw.get("latitude"), raw.get("longitude"))
+    prop.eircode = normalize_eircode(raw.get("postcode"), address)
+    prop.external_id = clamp(raw.get("ad_id") or raw.get("id"), 64)
+    return apply_numeric_fields(prop, size_unit=size_unit)
+
+
+def _get_json(url):
+    with metrics.upstream("daft", url):
+        resp = requests.get(url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
 
 
 def fetch_daft_api(key):
     # New endpoint for Daft/4PM
     url = f"https://daftapi.4pm.ie/property?key={key}"
-    resp = requests.get(url, timeout=FETCH_TIMEOUT)
-    resp.raise_for_status()
-    data = resp.json()
+    data = upstream_flight.do(url, lambda: _get_json(url))
     if isinstance(data, list):
         return data
     if isinstance(data, dict):
@@ -89,7 +109,7 @@ def fetch_daft_api(key):
 
 
 def import_daft():
-    with app.app_context():
+    with app.app_context(), query_scope("import:daft") as db_scope:
         agencies = Agency.query.filter(
             or_(Agency.primary_source == "4pm", Agency.daft_api_key.isnot(None))
         ).all()
@@ -130,10 +150,14 @@ def import_daft():
                         finished_at=datetime.datetime.now(datetime.timezone.utc),
                     )
                 )
+                # the old rows are already deleted in this transaction
+                refresh_agency_stats(agency.name)
                 db.session.commit()
+                metrics.record_import("daft", 0, (datetime.datetime.now(datetime.timezone.utc) - started).total_seconds(), status="failed")
                 continue
 
             try:
+                refresh_agency_stats(agency.name, imported=["daft"])
                 db.session.commit()
                 finished = datetime.datetime.now(datetime.timezone.utc)
                 print(f"[Daft] Imported {added} properties for {agency.name}")
@@ -150,6 +174,7 @@ def import_daft():
                     )
                 )
                 db.session.commit()
+                metrics.record_import("daft", added, (finished - started).total_seconds())
             except Exception as exc:
                 db.session.rollback()
                 print(f"[Daft] Commit failed for {agency.name}: {exc}")
@@ -165,7 +190,11 @@ def import_daft():
                     )
                 )
                 db.session.commit()
+                metrics.record_import("daft", 0, (datetime.datetime.now(datetime.timezone.utc) - started).total_seconds(), status="failed")
+
+        resolve_after_import()
+        print(f"[Daft] DB: {db_scope.summary()}")
 
 
 if __name__ == "__main__":
-    import_daft()
+    run_cli(import_daft, "import:daft")  # --profile stores a cProfile of the run
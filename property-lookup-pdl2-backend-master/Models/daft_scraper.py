@@ -0,0 +1,416 @@
+"""
+Scrape the daft.ie for-sale search with a pool of headless Chrome workers.
+Stores records in the properties table with source='daft_web' (upserted by listing id).
+- SCRAPE_WORKERS browsers run in parallel, each crawling its own shard of result pages
+  (worker k loads pages k+1, k+1+N, ...) by URL instead of clicking "next", until the last page
+  reported by the page or an empty page.
+- Listings are read from the page's __NEXT_DATA__ JSON, falling back to the listing cards.
+- Parsed listings are written in batches of SCRAPE_BATCH_SIZE through the push-ingestion write
+  path (ingest.apply_batch) while the browsers keep loading; stats and clusters follow at the end.
+- A complete run (every page loaded, no --max-pages) deletes the daft_web listings it did not
+  see, as the WordPress full crawl does; partial or failed runs only upsert.
+- Offline runs: --save-html DIR keeps every loaded page as page-<n>.html; serve that directory
+  (python -m http.server 8000) and point --base-url at it to replay the pages locally.
+- fixtures/daft_web holds saved result pages (__NEXT_DATA__ pages and a card-only page) with
+  the rows they must map to in expected.json; --check DIR parses them without a browser or
+  database writes. Run it after changing the parsers, and add a page when daft.ie changes.
+
+Usage:
+  python daft_scraper.py [--workers 4] [--max-pages 10] [--dry-run]
+  python daft_scraper.py --base-url "http://localhost:8000/page-{page}.html"
+  python daft_scraper.py --check fixtures/daft_web
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import select
+
+from bootstrap import app
+from models import db, Property
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+from ingest import apply_batch, row_values
+import metrics
+from myhome_import import map_property_common, sanitize_str
+
+SOURCE = "daft_web"
+SEARCH_URL = os.getenv("DAFT_SEARCH_URL", "https://www.daft.ie/property-for-sale/ireland?pageSize=20&from={offset}")
+PAGE_SIZE = 20
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "200"))
+SCRAPE_PAGE_TIMEOUT = int(os.getenv("SCRAPE_PAGE_TIMEOUT", "20"))
+SCRAPE_MAX_FAILURES = 3  # consecutive failed pages before a worker gives up
+CHROMEDRIVER = os.getenv("CHROMEDRIVER") or None  # default: Selenium Manager finds/downloads it
+CHROME_BINARY = os.getenv("CHROME_BINARY") or None
+LISTING_CLASS = "sc-7e7edbc6-0"  # search result card (fallback parser)
+
+_NEXT_DATA = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+_DONE = object()
+
+
+# ---------------------- Browser ----------------------
+
+def make_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--window-size=1280,2000")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    if CHROME_BINARY:
+        options.binary_location = CHROME_BINARY
+    service = Service(executable_path=CHROMEDRIVER) if CHROMEDRIVER else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(SCRAPE_PAGE_TIMEOUT * 2)
+    return driver
+
+
+def load_page(driver, url):
+    """Page source once the listings (or the page data) are in the DOM, no fixed sleeps."""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with metrics.upstream(SOURCE, url):
+        driver.get(url)
+        try:
+            WebDriverWait(driver, SCRAPE_PAGE_TIMEOUT).until(
+                lambda d: d.find_elements(By.ID, "__NEXT_DATA__") or d.find_elements(By.CLASS_NAME, LISTING_CLASS)
+            )
+        except TimeoutException:
+            pass  # parse what is there; a page past the end simply has no listings
+        return driver.page_source
+
+
+def page_url(template, page):
+    return template.format(page=page, offset=(page - 1) * PAGE_SIZE)
+
+
+# ---------------------- Parsing ----------------------
+
+def _first_int(value):
+    match = re.search(r"\d+", str(value or ""))
+    return int(match.group()) if match else 0
+
+
+def _listing_from_next_data(item):
+    listing = item.get("listing") if isinstance(item, dict) and "listing" in item else item
+    if not isinstance(listing, dict):
+        return None
+    seller = listing.get("seller") or {}
+    images = (listing.get("media") or {}).get("images") or []
+    photos = []
+    for image in images:
+        if isinstance(image, dict):
+            url = image.get("size720x480") or image.get("size600x600") or next(iter(image.values()), None)
+            if isinstance(url, str):
+                photos.append(url)
+    area = listing.get("floorArea") or {}
+    coords = (listing.get("point") or {}).get("coordinates") or [None, None]
+    sale_type = listing.get("saleType")
+    return {
+        "id": listing.get("id"),
+        "address": listing.get("title"),
+        "price": listing.get("price"),
+        "beds": _first_int(listing.get("numBedrooms")),
+        "baths": _first_int(listing.get("numBathrooms")),
+        "size": f"{area.get('value')} m²" if isinstance(area, dict) and area.get("value") else None,
+        "property_type": listing.get("propertyType"),
+        "sale_type": ", ".join(sale_type) if isinstance(sale_type, list) else sale_type,
+        "agency": seller.get("branch") or seller.get("name"),
+        "agent": seller.get("name"),
+        "photos": photos,
+        "longitude": coords[0] if len(coords) > 1 else None,
+        "latitude": coords[1] if len(coords) > 1 else None,
+    }
+
+
+def _listings_from_cards(html):
+    # Same field order the original Selenium scraper read from the card text
+    from bs4 import BeautifulSoup
+
+    listings = []
+    for card in BeautifulSoup(html, "html.parser").select(f".{LISTING_CLASS}"):
+        details = [line.strip() for line in card.get_text("\n").split("\n") if line.strip()]
+        if len(details) < 8:
+            continue
+        images = [img.get("src") for img in card.find_all("img") if img.get("src")]
+        listings.append({
+            "id": None,
+            "agent": details[0],
+            "agency": details[1],
+            "address": details[2],
+            "price": details[3],
+            "beds": _first_int(details[4]),
+            "baths": _first_int(details[5]),
+            "size": details[6],
+            "property_type": details[7],
+            "sale_type": details[8] if len(details) > 8 else None,
+            "photos": images[1:],  # the first image is the agency logo
+        })
+    return listings
+
+
+def parse_page(html):
+    """(listings, total pages or None) of one search results page."""
+    match = _NEXT_DATA.search(html)
+    if match:
+        try:
+            props = json.loads(match.group(1)).get("props", {}).get("pageProps", {})
+        except ValueError:
+            props = None
+        if isinstance(props, dict) and "listings" in props:
+            listings = [row for row in map(_listing_from_next_data, props.get("listings") or []) if row]
+            total = (props.get("paging") or {}).get("totalPages")
+            return listings, int(total) if total else None
+    return _listings_from_cards(html), None
+
+
+def map_property_daft_web(raw):
+    agency_name = sanitize_str(raw.get("agency") or "Unknown agency")
+    prop = map_property_common(
+        agency_name=agency_name,
+        agent_name=raw.get("agent"),
+        address=raw.get("address"),
+        price=raw.get("price") or "N/A",
+        beds=raw.get("beds"),
+        baths=raw.get("baths"),
+        size=raw.get("size") or "N/A",
+        extras=[raw.get("property_type"), raw.get("sale_type") or "For Sale", "Live", raw.get("sale_type")],
+        main_photo=(raw.get("photos") or [None])[0],
+        photo_urls=raw.get("photos") or [],
+        source=SOURCE,
+        latitude=raw.get("latitude"),
+        longitude=raw.get("longitude"),
+        external_id=raw.get("id"),
+    )
+    if not prop.external_id:
+        # card fallback carries no listing id
+        digest = hashlib.sha1(f"{prop.agency_name}|{prop.house_location}".lower().encode("utf-8")).hexdigest()
+        prop.external_id = f"h:{digest[:30]}"
+    return prop
+
+
+CHECK_FIELDS = ("external_id", "agency_name", "house_location", "price_amount", "size_sqm", "house_bedrooms")
+
+
+def check_fixtures(directory):
+    """
+    Parse and map every *.html page in directory and compare with its expected.json
+    ({file: {"total_pages", "rows": [[CHECK_FIELDS...], ...]}}). Returns a list of mismatches.
+    """
+    with open(os.path.join(directory, "expected.json"), "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    problems = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        name = os.path.basename(path)
+        with open(path, "r", encoding="utf-8") as f:
+            listings, total_pages = parse_page(f.read())
+        rows = []
+        for raw in listings:
+            prop = map_property_daft_web(raw)
+            rows.append([getattr(prop, field) for field in CHECK_FIELDS])
+        want = expected.get(name)
+        if want is None:
+            problems.append(f"{name}: not in expected.json")
+        elif total_pages != want["total_pages"]:
+            problems.append(f"{name}: total pages {total_pages}, expected {want['total_pages']}")
+        elif rows != want["rows"]:
+            problems.append(f"{name}: rows differ\n  got      {rows}\n  expected {want['rows']}")
+        print(f"[Scraper] {name}: {len(rows)} listings, {total_pages} pages")
+    return problems
+
+
+# ---------------------- Worker pool ----------------------
+
+def _worker(k, workers, template, max_pages, save_html, driver_factory, out):
+    driver = None
+    page = k + 1
+    try:
+        driver = driver_factory()
+        total = None
+        failures = 0
+        while (max_pages is None or page <= max_pages) and (total is None or page <= total):
+            url = page_url(template, page)
+            try:
+                html = load_page(driver, url)
+                if save_html:
+                    with open(os.path.join(save_html, f"page-{page}.html"), "w", encoding="utf-8") as f:
+                        f.write(html)
+                listings, total_pages = parse_page(html)
+            except Exception as exc:
+                failures += 1
+                out.put((page, [], f"{url}: {exc}"))
+                if failures >= SCRAPE_MAX_FAILURES:
+                    break
+                page += workers
+                continue
+            failures = 0
+            if not listings and total is not None and page <= total:
+                # load_page gives up quietly on a timeout; an empty page inside the range is a failure
+                out.put((page, [], f"{url}: no listings on page {page} of {total}"))
+                break
+            out.put((page, listings, None))
+            if not listings:
+                break
+            total = total_pages or total
+            page += workers
+    except Exception as exc:
+        out.put((page, [], f"worker {k}: {exc}"))
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        out.put(_DONE)
+
+
+def scrape(template=SEARCH_URL, workers=SCRAPE_WORKERS, max_pages=None, save_html=None, driver_factory=make_driver):
+    """Yield (page, listings, error) from the browser pool as pages finish."""
+    if save_html:
+        os.makedirs(save_html, exist_ok=True)
+    out = queue.Queue()
+    threads = [
+        threading.Thread(
+            target=_worker, args=(k, workers, template, max_pages, save_html, driver_factory, out),
+            name=f"scraper-{k}", daemon=True,
+        )
+        for k in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    while running:
+        item = out.get()
+        if item is _DONE:
+            running -= 1
+            continue
+        yield item
+
+
+# ---------------------- Runner ----------------------
+
+def _flush(pending, touched):
+    written = 0
+    for agency_name, rows in pending.items():
+        counts = apply_batch(agency_name, SOURCE, rows, [])
+        written += counts["inserted"] + counts["updated"]
+        touched.add(agency_name)
+    db.session.commit()
+    pending.clear()
+    return written
+
+
+def _delete_unseen(seen, touched):
+    """Delete stored daft_web rows whose listing was not on any page of a complete run."""
+    table = Property.__table__
+    stored = db.session.execute(
+        select(table.c.agency_name, table.c.external_id).where(table.c.source == SOURCE)
+    ).all()
+    deletes = {}
+    for agency_name, ext_id in stored:
+        if ext_id and ext_id not in seen.get(agency_name, ()):
+            deletes.setdefault(agency_name, []).append(ext_id)
+    deleted = 0
+    for agency_name, ext_ids in deletes.items():
+        deleted += apply_batch(agency_name, SOURCE, {}, ext_ids)["deleted"]
+        touched.add(agency_name)
+    db.session.commit()
+    return deleted
+
+
+def scrape_daft(template=SEARCH_URL, workers=SCRAPE_WORKERS, max_pages=None, save_html=None, dry_run=False):
+    started = time.perf_counter()
+    with app.app_context(), query_scope("import:daft_web") as db_scope:
+        pending = {}  # agency -> {external_id: row values}
+        seen = {}  # agency -> external ids on the pages, for deleting the rest after a complete run
+        touched = set()
+        pages = listings_seen = written = deleted = failed = 0
+        first_empty = last_full = 0  # an empty page before a page with listings means a gap
+        for page, listings, error in scrape(template, workers, max_pages, save_html):
+            if error:
+                print(f"[Scraper] Page {page} failed: {error}")
+                failed += 1
+                continue
+            if listings:
+                last_full = max(last_full, page)
+            else:
+                first_empty = min(first_empty or page, page)
+            pages += 1
+            listings_seen += len(listings)
+            print(f"[Scraper] Page {page}: {len(listings)} listings")
+            if dry_run:
+                continue
+            for raw in listings:
+                try:
+                    prop = map_property_daft_web(raw)
+                except Exception as exc:
+                    print(f"[Scraper] Skip listing on page {page}: {exc}")
+                    continue
+                pending.setdefault(prop.agency_name, {})[prop.external_id] = row_values(prop)
+                seen.setdefault(prop.agency_name, set()).add(prop.external_id)
+            if sum(len(rows) for rows in pending.values()) >= SCRAPE_BATCH_SIZE:
+                written += _flush(pending, touched)
+
+        if not dry_run:
+            try:
+                written += _flush(pending, touched)
+                # an unparseable layout yields no listings; that must not empty the table
+                complete = not failed and max_pages is None and not (first_empty and first_empty < last_full)
+                if complete and seen:
+                    deleted = _delete_unseen(seen, touched)
+                for agency_name in sorted(touched):
+                    refresh_agency_stats(agency_name, imported=[SOURCE])
+                db.session.commit()
+                status = "ok"
+            except Exception as exc:
+                db.session.rollback()
+                print(f"[Scraper] Commit failed: {exc}")
+                status = "failed"
+            metrics.record_import(SOURCE, written, time.perf_counter() - started, status=status)
+            resolve_after_import()
+        print(f"[Scraper] {pages} pages, {listings_seen} listings, {written} rows written, {deleted} deleted for "
+              f"{len(touched)} agencies in {time.perf_counter() - started:.1f}s")
+        print(f"[Scraper] DB: {db_scope.summary()}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Scrape daft.ie search results with a headless browser pool")
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS)
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--base-url", default=SEARCH_URL, help="page URL template with {page} or {offset}")
+    parser.add_argument("--save-html", default=None, help="directory to keep the loaded pages in")
+    parser.add_argument("--dry-run", action="store_true", help="parse and report, write nothing")
+    parser.add_argument("--profile", action="store_true", help="store a cProfile of the run")
+    parser.add_argument("--check", metavar="DIR", help="parse saved pages against DIR/expected.json and exit")
+    args = parser.parse_args(argv)
+    if args.check:
+        problems = check_fixtures(args.check)
+        for problem in problems:
+            print(f"[Scraper] MISMATCH {problem}")
+        sys.exit(1 if problems else 0)
+    run_cli(
+        lambda: scrape_daft(args.base_url, max(1, args.workers), args.max_pages, args.save_html, args.dry_run),
+        "import:daft_web",
+        argv,
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
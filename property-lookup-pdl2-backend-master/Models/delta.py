@@ -0,0 +1,139 @@
+"""
+Whole-agency delta between stored properties and the live feeds.
+Both sides are plain dicts with: id, source, house_location, house_price, status.
+- Rows are hash-joined on (source, normalized address).
+- Leftovers on both sides are paired by fuzzy address match within the same source,
+  so an edited address shows up as a change rather than a remove + add.
+- Everything that is still unpaired is reported as added (live only) or removed (DB only).
+- iter_delta() yields the changes as they are found, for streamed responses.
+"""
+
+from collections import defaultdict
+
+from matcher import ADDRESS_MATCH_MIN_SCORE, LiveItemIndex, address_tokens
+
+DELTA_FIELDS = (
+    ("price", "house_price"),
+    ("status", "status"),
+    ("address", "house_location"),
+)
+
+
+def _clean(val):
+    return str(val).strip() if val is not None else ""
+
+
+def _join_key(row):
+    return ((row.get("source") or "").lower(), " ".join(address_tokens(row.get("house_location"))))
+
+
+def field_deltas(local, live):
+    deltas = []
+    for field, column in DELTA_FIELDS:
+        a, b = _clean(local.get(column)), _clean(live.get(column))
+        if a != b:
+            deltas.append({"field": field, "local": a, "live": b})
+    return deltas
+
+
+def compute_delta(db_rows, live_rows):
+    """
+    Return a list of change records ordered as changed, added, removed:
+      {"change": "changed", "id", "source", "address", "deltas": [...]}
+      {"change": "added", "source", "address", "live": {...}}
+      {"change": "removed", "id", "source", "address"}
+    plus a summary dict with counts (including unchanged).
+    """
+    summary = {}
+    changes = list(iter_delta(db_rows, live_rows, summary))
+    return changes, summary
+
+
+def _changed(pairs):
+    for row, live in pairs:
+        deltas = field_deltas(row, live)
+        if deltas:
+            yield {
+                "change": "changed",
+                "id": row.get("id"),
+                "source": row.get("source"),
+                "address": row.get("house_location"),
+                "deltas": deltas,
+            }
+
+
+def iter_delta(db_rows, live_rows, summary):
+    """
+    Generator form of compute_delta(): yields the same change records as they are found
+    (exact-address changes before the fuzzy pass runs) and fills `summary` once exhausted.
+    """
+    changed = 0
+    buckets = defaultdict(list)
+    for row in db_rows:
+        buckets[_join_key(row)].append(row)
+
+    pairs = []
+    unmatched_live = []
+    for live in live_rows:
+        bucket = buckets.get(_join_key(live))
+        if bucket:
+            pairs.append((bucket.pop(), live))
+        else:
+            unmatched_live.append(live)
+    unmatched_db = [row for bucket in buckets.values() for row in bucket]
+    for change in _changed(pairs):
+        changed += 1
+        yield change
+    exact = len(pairs)
+
+    # Second pass: fuzzy address match per source for rows whose address was edited
+    if unmatched_db and unmatched_live:
+        by_source = defaultdict(list)
+        for live in unmatched_live:
+            by_source[(live.get("source") or "").lower()].append(live)
+        indexes = {source: LiveItemIndex(rows) for source, rows in by_source.items()}
+        taken = set()
+        still_db = []
+        for row in unmatched_db:
+            index = indexes.get((row.get("source") or "").lower())
+            live = None
+            if index is not None:
+                for cand in index.candidates(row.get("house_location"), limit=3, min_score=ADDRESS_MATCH_MIN_SCORE):
+                    if id(cand["item"]) not in taken:
+                        live = cand["item"]
+                        break
+            if live is None:
+                still_db.append(row)
+            else:
+                taken.add(id(live))
+                pairs.append((row, live))
+        unmatched_db = still_db
+        unmatched_live = [live for live in unmatched_live if id(live) not in taken]
+
+    for change in _changed(pairs[exact:]):
+        changed += 1
+        yield change
+    for live in unmatched_live:
+        yield {
+            "change": "added",
+            "source": live.get("source"),
+            "address": live.get("house_location"),
+            "live": live,
+        }
+    for row in unmatched_db:
+        yield {
+            "change": "removed",
+            "id": row.get("id"),
+            "source": row.get("source"),
+            "address": row.get("house_location"),
+        }
+
+    summary.update({
+        "changed": changed,
+        "added": len(unmatched_live),
+        "removed": len(unmatched_db),
+        "unchanged": len(pairs) - changed,
+        "local_total": len(db_rows),
+        "live_total": len(live_rows),
+    })
+
@@ -0,0 +1,330 @@
+"""
+Cross-source entity resolution: the same house listed through MyHome, Acquaint, Daft and
+WordPress gets one PropertyCluster, stored in properties.cluster_id.
+- Only rows with no cluster_id are processed. Importers re-insert the rows they fetch, so
+  that is exactly the set of new or re-imported rows.
+- A re-imported row whose identity (agency, source, normalized address, eircode) was seen
+  before is reattached through its fingerprint key, without any scoring.
+- Other rows are only compared with clusters sharing a blocking key (eircode, house number +
+  street tokens, street name + price bucket, ~150 m geohash cell). They join the best cluster
+  scoring >= CLUSTER_MIN_SCORE or start a new one.
+Clusters and their keys are never renumbered or dropped, so ids stay stable across imports.
+
+Usage:
+  python entity_resolution.py            # resolve pending rows
+  python entity_resolution.py --rebuild  # forget every cluster and resolve all rows again
+"""
+
+import hashlib
+import math
+import os
+import re
+import sys
+
+from sqlalchemy import bindparam, func, select, update
+
+from models import db, Property, PropertyCluster, ClusterBlockKey
+from matcher import address_tokens, trigrams, normalize_eircode
+import geo
+
+CLUSTER_MIN_SCORE = float(os.getenv("CLUSTER_MIN_SCORE", "0.55"))
+BATCH_SIZE = 2000
+# Blocking keys shared by more clusters than this (a bare street name in a big town) are
+# too broad to be useful and are skipped instead of compared pairwise
+MAX_BLOCK_CLUSTERS = 50
+# Price bands ~15% wide
+PRICE_BUCKET_BASE = 1.15
+# Geohash precision 7 cells are ~150 m x 150 m
+GEO_BLOCK_PRECISION = 7
+_KEY_CHUNK = 500
+
+# Words that do not identify a street on their own
+_GENERIC = {"apartment", "apt", "unit", "flat", "no", "number", "the", "house", "site", "block", "county"}
+_EIRCODE_TEXT = re.compile(r"\b([AC-FHKNPRTV-Y]\d{2}|D6W)\s?[0-9AC-FHKNPRTV-Y]{4}\b", re.IGNORECASE)
+
+
+def _price_bucket(price):
+    if not price or price <= 0:
+        return None
+    return int(math.log(price, PRICE_BUCKET_BASE))
+
+
+def profile(agency_name, source, address, eircode=None, price=None, beds=None, latitude=None, longitude=None):
+    """Everything the blocking and scoring steps need about one row or cluster."""
+    text = _EIRCODE_TEXT.sub(" ", address or "")
+    segments = [address_tokens(seg) for seg in text.split(",")]
+    tokens = [tok for seg in segments for tok in seg]
+    street = []
+    for seg in segments:
+        words = [tok for tok in seg if not tok.isdigit()]
+        if any(tok not in _GENERIC for tok in words):
+            street = words
+            break
+    return {
+        "agency": agency_name or "",
+        "source": (source or "").lower(),
+        "tokens": tokens,
+        "grams": None,  # filled on first comparison, see _grams()
+        "numbers": {tok for tok in tokens if tok.isdigit()},
+        "street": street,
+        "eircode": normalize_eircode(eircode, address),
+        "price": price if price and price > 0 else None,
+        "beds": beds if beds and beds > 0 else None,
+        "lat": latitude,
+        "lng": longitude,
+    }
+
+
+def fingerprint_key(prof):
+    ident = "|".join((prof["agency"], prof["source"], " ".join(prof["tokens"]), prof["eircode"] or ""))
+    return "f:" + hashlib.sha1(ident.encode("utf-8")).hexdigest()[:24]
+
+
+def block_keys(prof):
+    keys = set()
+    if prof["eircode"]:
+        keys.add("e:" + prof["eircode"].replace(" ", ""))
+    street = " ".join(prof["street"])
+    if street:
+        numbers = ",".join(sorted(prof["numbers"]))
+        keys.add(f"s:{numbers}:{street}"[:120])
+        bucket = _price_bucket(prof["price"])
+        name = next((tok for tok in prof["street"] if tok not in _GENERIC and len(tok) > 2), None)
+        if name and bucket is not None:
+            keys.add(f"p:{name}:{bucket}"[:120])
+    if prof["lat"] is not None and prof["lng"] is not None:
+        keys.add("g:" + geo.encode(prof["lat"], prof["lng"], GEO_BLOCK_PRECISION))
+    return keys
+
+
+def _grams(prof):
+    if prof["grams"] is None:
+        prof["grams"] = trigrams(prof["tokens"])
+    return prof["grams"]
+
+
+def score(a, b):
+    """Similarity of two profiles; >= CLUSTER_MIN_SCORE means the same property."""
+    grams_a, grams_b = _grams(a), _grams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    total = 0.6 * (2.0 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)))
+    if a["eircode"] and b["eircode"]:
+        total += 0.5 if a["eircode"] == b["eircode"] else -0.6
+    if a["numbers"] and b["numbers"] and not (a["numbers"] & b["numbers"]):
+        total -= 0.4  # different house / apartment numbers
+    if a["price"] and b["price"]:
+        ratio = min(a["price"], b["price"]) / max(a["price"], b["price"])
+        if ratio >= 0.95:
+            total += 0.1
+        elif ratio < 0.75:
+            total -= 0.1
+    if None not in (a["lat"], a["lng"], b["lat"], b["lng"]):
+        distance = geo.haversine_km(a["lat"], a["lng"], b["lat"], b["lng"])
+        if distance <= 0.15:
+            total += 0.2
+        elif distance > 2:
+            total -= 0.3
+    if a["beds"] and b["beds"]:
+        total += 0.05 if a["beds"] == b["beds"] else -0.1
+    return total
+
+
+_REPRESENTATIVE = (("eircode", "eircode"), ("price_amount", "price"), ("bedrooms", "beds"),
+                   ("latitude", "lat"), ("longitude", "lng"))
+
+
+class _Cluster:
+    __slots__ = ("id", "profile", "model", "updates")
+
+    def __init__(self, cluster_id, prof, model=None):
+        self.id = cluster_id
+        self.profile = prof
+        self.model = model  # only set for clusters created in this run, until they are flushed
+        self.updates = {}
+
+    def absorb(self, prof):
+        """Fill representative fields the cluster is missing from a new member."""
+        for column, key in _REPRESENTATIVE:
+            if self.profile[key] is None and prof[key] is not None:
+                self.profile[key] = prof[key]
+                self.updates[column] = prof[key]
+
+
+class Resolver:
+    """Holds the key -> cluster map for one run so later batches see clusters made by earlier ones."""
+
+    def __init__(self):
+        # block key -> set of _Cluster; keys too broad to compare hold plain cluster ids instead
+        self.key_clusters = {}
+        self.clusters = {}  # cluster id -> _Cluster
+        self.stats = {"rows": 0, "reattached": 0, "matched": 0, "created": 0}
+
+    def _load_keys(self, keys):
+        missing = [k for k in keys if k not in self.key_clusters]
+        found = {}
+        for i in range(0, len(missing), _KEY_CHUNK):
+            rows = db.session.execute(
+                select(ClusterBlockKey.block_key, ClusterBlockKey.cluster_id)
+                .where(ClusterBlockKey.block_key.in_(missing[i:i + _KEY_CHUNK]))
+            ).all()
+            for key, cluster_id in rows:
+                found.setdefault(key, set()).add(cluster_id)
+        need = set()
+        for key, ids in found.items():
+            if len(ids) <= MAX_BLOCK_CLUSTERS or key[0] in "ef":
+                need.update(cid for cid in ids if cid not in self.clusters)
+        need = list(need)
+        cols = [PropertyCluster.id, PropertyCluster.sample_address] + [getattr(PropertyCluster, c) for c, _ in _REPRESENTATIVE]
+        for i in range(0, len(need), _KEY_CHUNK):
+            for row in db.session.execute(select(*cols).where(PropertyCluster.id.in_(need[i:i + _KEY_CHUNK]))):
+                self.clusters[row[0]] = _Cluster(row[0], profile(None, None, *row[1:]))
+        for key in missing:
+            ids = found.get(key, ())
+            if len(ids) > MAX_BLOCK_CLUSTERS and key[0] not in "ef":
+                self.key_clusters[key] = set(ids)
+            else:
+                self.key_clusters[key] = {self.clusters[cid] for cid in ids if cid in self.clusters}
+
+    def _best(self, prof, keys):
+        seen = set()
+        best, best_score = None, CLUSTER_MIN_SCORE
+        for key in keys:
+            members = self.key_clusters.get(key) or ()
+            if len(members) > MAX_BLOCK_CLUSTERS and not key.startswith("e:"):
+                continue
+            for cluster in members:
+                if cluster in seen:
+                    continue
+                seen.add(cluster)
+                value = score(prof, cluster.profile)
+                if value >= best_score:
+                    best, best_score = cluster, value
+        return best
+
+    def run_batch(self, rows):
+        """
+        Assign clusters to rows of (id, agency, source, address, eircode, price, beds, lat, lng).
+        Returns (row id, cluster) pairs, new (block key, cluster) pairs and the new clusters.
+        """
+        work = []
+        for row in rows:
+            prof = profile(*row[1:])
+            work.append((row[0], row[3], prof, fingerprint_key(prof), block_keys(prof)))
+        # Unchanged re-imported rows are settled by their fingerprint alone, so the blocking
+        # keys are only looked up for the rest
+        self._load_keys(list({fp for _, _, _, fp, _ in work}))
+        self._load_keys(list({key for _, _, _, fp, keys in work if not self.key_clusters.get(fp) for key in keys}))
+
+        assignments = []
+        new_keys = []
+        created = []
+        for row_id, address, prof, fp, keys in work:
+            self.stats["rows"] += 1
+            known = self.key_clusters.get(fp)
+            if known:
+                assignments.append((row_id, next(iter(known))))
+                self.stats["reattached"] += 1
+                continue
+            cluster = self._best(prof, keys)
+            if cluster is None:
+                model = PropertyCluster(sample_address=(address or "").strip()[:255] or None,
+                                        **{column: prof[key] for column, key in _REPRESENTATIVE})
+                cluster = _Cluster(None, dict(prof), model)
+                created.append(cluster)
+                self.stats["created"] += 1
+            else:
+                cluster.absorb(prof)
+                self.stats["matched"] += 1
+            assignments.append((row_id, cluster))
+            for key in keys | {fp}:
+                members = self.key_clusters.setdefault(key, set())
+                if cluster not in members and cluster.id not in members:
+                    members.add(cluster)
+                    new_keys.append((key, cluster))
+        return assignments, new_keys, created
+
+
+def _pending_rows(last_id, limit):
+    return db.session.execute(
+        select(
+            Property.id, Property.agency_name, Property.source, Property.house_location, Property.eircode,
+            Property.price_amount, Property.house_bedrooms, Property.latitude, Property.longitude,
+        )
+        .where(Property.cluster_id.is_(None), Property.id > last_id)
+        .order_by(Property.id)
+        .limit(limit)
+    ).all()
+
+
+def resolve_pending(batch_size=BATCH_SIZE):
+    """Cluster every unresolved property; returns counts of rows reattached / matched / created."""
+    resolver = Resolver()
+    assign_stmt = (
+        update(Property.__table__)
+        .where(Property.__table__.c.id == bindparam("row_id"))
+        .values(cluster_id=bindparam("cluster_id"))
+    )
+    last_id = 0
+    while True:
+        rows = _pending_rows(last_id, batch_size)
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        rows = [r for r in rows if (r.house_location or "").strip()]
+        if not rows:
+            continue
+        assignments, new_keys, created = resolver.run_batch(rows)
+        if created:
+            db.session.add_all([c.model for c in created])
+            db.session.flush()
+            for cluster in created:
+                cluster.id = cluster.model.id
+                cluster.model = None
+                resolver.clusters[cluster.id] = cluster
+        for cluster in resolver.clusters.values():
+            if cluster.updates:
+                db.session.execute(
+                    update(PropertyCluster.__table__)
+                    .where(PropertyCluster.__table__.c.id == cluster.id)
+                    .values(updated_at=func.now(), **cluster.updates)
+                )
+                cluster.updates = {}
+        if new_keys:
+            db.session.execute(
+                ClusterBlockKey.__table__.insert(),
+                [{"block_key": key, "cluster_id": cluster.id} for key, cluster in new_keys],
+            )
+        db.session.execute(assign_stmt, [{"row_id": row_id, "cluster_id": cluster.id} for row_id, cluster in assignments])
+        db.session.commit()
+    stats = resolver.stats
+    print(f"[Resolve] {stats['rows']} rows: {stats['reattached']} reattached, {stats['matched']} matched, {stats['created']} new clusters")
+    return stats
+
+
+def reset_clusters():
+    db.session.execute(update(Property.__table__).values(cluster_id=None))
+    db.session.execute(ClusterBlockKey.__table__.delete())
+    db.session.execute(PropertyCluster.__table__.delete())
+    db.session.commit()
+
+
+def resolve_after_import():
+    """Called by the importers at the end of a run; a failure here never fails the import."""
+    try:
+        return resolve_pending()
+    except Exception as exc:
+        db.session.rollback()
+        print(f"[Resolve] Failed: {exc}")
+        return None
+
+
+if __name__ == "__main__":
+    from bootstrap import app
+    from schema import ensure_schema
+
+    with app.app_context():
+        ensure_schema(db.engine)
+        if "--rebuild" in sys.argv[1:]:
+            reset_clusters()
+        resolve_pending()
@@ -0,0 +1,97 @@
+"""
+ORM-free read path for property listings.
+- Selects only the columns that Property.to_dict() exposes with a Core select(),
+  streams the row tuples (yield_per) and builds the dicts with a precompiled key list.
+- The source backfill that get_properties_external() did in a second pass is done
+  while the rows are built.
+- dumps() uses orjson when it is installed and falls back to the stdlib encoder.
+"""
+
+import json
+
+from sqlalchemy import select
+
+from models import db, Property
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+YIELD_PER = 2000
+
+# Output key -> column, in Property.to_dict() order
+PROPERTY_FIELDS = (
+    ("id", Property.id),
+    ("agency_agent_name", Property.agency_agent_name),
+    ("agency_name", Property.agency_name),
+    ("house_location", Property.house_location),
+    ("house_price", Property.house_price),
+    ("house_bedrooms", Property.house_bedrooms),
+    ("house_bathrooms", Property.house_bathrooms),
+    ("house_mt_squared", Property.house_mt_squared),
+    ("house_extra_info_1", Property.house_extra_info_1),
+    ("house_extra_info_2", Property.house_extra_info_2),
+    ("house_extra_info_3", Property.house_extra_info_3),
+    ("house_extra_info_4", Property.house_extra_info_4),
+    ("agency_image_url", Property.agency_image_url),
+    ("images_url_house", Property.images_url_house),
+    ("source", Property.source),
+    ("price_amount", Property.price_amount),
+    ("price_currency", Property.price_currency),
+    ("price_qualifier", Property.price_qualifier),
+    ("size_sqm", Property.size_sqm),
+    ("latitude", Property.latitude),
+    ("longitude", Property.longitude),
+    ("eircode", Property.eircode),
+    ("external_id", Property.external_id),
+    ("cluster_id", Property.cluster_id),
+)
+_KEYS = tuple(key for key, _ in PROPERTY_FIELDS)
+_COLUMNS = tuple(col for _, col in PROPERTY_FIELDS)
+_SOURCE_POS = _KEYS.index("source")
+
+
+def iter_property_rows(*where, default_source=None, order_by=None):
+    """
+    Yield value tuples in PROPERTY_FIELDS order for rows matching the given criteria, read
+    YIELD_PER rows at a time (a server-side cursor where the driver supports one).
+    default_source fills rows that have no source (as the listing endpoint always did).
+    """
+    stmt = select(*_COLUMNS).where(*where).execution_options(yield_per=YIELD_PER)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    for row in db.session.execute(stmt):
+        if default_source is not None and not row[_SOURCE_POS]:
+            row = (*row[:_SOURCE_POS], default_source, *row[_SOURCE_POS + 1:])
+        yield row
+
+
+def iter_property_dicts(*where, default_source=None, order_by=None):
+    """Yield Property.to_dict()-shaped dicts for rows matching the given criteria (see iter_property_rows)."""
+    keys = _KEYS
+    for row in iter_property_rows(*where, default_source=default_source, order_by=order_by):
+        item = dict(zip(keys, row))
+        item["sourceLabel"] = row[_SOURCE_POS]
+        yield item
+
+
+def dumps(obj):
+    """Encode to JSON bytes, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def property_list_json(*where, default_source=None, order_by=None, chunk_size=YIELD_PER):
+    """Serialize matching rows as one JSON array, encoding chunk by chunk so no full list of dicts is kept."""
+    parts = []
+    chunk = []
+    for item in iter_property_dicts(*where, default_source=default_source, order_by=order_by):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            parts.append(dumps(chunk)[1:-1])
+            chunk = []
+    if chunk:
+        parts.append(dumps(chunk)[1:-1])
+    return b"[" + b",".join(parts) + b"]"
@@ -0,0 +1,111 @@
+"""
+In-process cache of parsed feeds, indexed by property id.
+- One entry per feed key (e.g. Acquaint site prefix) holding {property_id: record}.
+- Entries expire after a TTL and the least recently used ones are evicted once the
+  estimated memory footprint goes over the configured budget.
+- Filled by the live endpoints and refresh jobs whenever they parse a feed, so single
+  property lookups can be answered without downloading the feed again. The cache lives in
+  each web worker's memory: only in-process callers warm it, so the import CLIs (separate
+  processes) skip it.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+ACQUAINT_INDEX_TTL_SEC = int(os.getenv("ACQUAINT_INDEX_TTL_SEC", "600"))
+ACQUAINT_INDEX_MAX_BYTES = int(os.getenv("ACQUAINT_INDEX_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _estimate_size(rows):
+    total = 0
+    for row in rows:
+        try:
+            total += len(json.dumps(row, default=str))
+        except Exception:
+            total += 1024
+    return total
+
+
+class FeedIndexCache:
+    def __init__(self, ttl_sec, max_bytes, id_field="id"):
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.id_field = id_field
+        self._entries = OrderedDict()  # key -> (expires_at, size, {id: record})
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, rows, size_hint=None):
+        """Index rows by id under key. size_hint is the raw payload size if known."""
+        if not key:
+            return
+        index = {}
+        for row in rows or []:
+            if isinstance(row, dict) and row.get(self.id_field) is not None:
+                index[str(row.get(self.id_field))] = row
+        size = size_hint if size_hint else _estimate_size(index.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_sec, size, index)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def get_index(self, key):
+        """Return {id: record} for key, or None when missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def get_record(self, key, record_id):
+        """
+        Return (found_index, record). found_index is False when the feed is not cached,
+        so callers can tell "feed unknown" apart from "id not in feed".
+        """
+        index = self.get_index(key)
+        if index is None:
+            return False, None
+        return True, index.get(str(record_id))
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+acquaint_index = FeedIndexCache(ACQUAINT_INDEX_TTL_SEC, ACQUAINT_INDEX_MAX_BYTES)
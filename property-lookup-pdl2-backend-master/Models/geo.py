@@ -0,0 +1,127 @@
+"""
+Geohash index for property coordinates (no PostGIS, works the same on SQLite).
+- Every row with coordinates stores a precision-9 geohash in an indexed column.
+- A radius or bounding-box query is turned into a handful of geohash prefixes that cover
+  the box; each prefix becomes an index range scan (geohash >= p AND geohash < p + '{'),
+  then rows are filtered exactly on lat/lng and, for radius queries, by haversine distance.
+"""
+
+import math
+
+from sqlalchemy import and_, or_
+
+from models import Property
+
+GEOHASH_PRECISION = 9
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Sorts after every base32 character, so p <= geohash < p + _UPPER is "starts with p"
+_UPPER = "{"
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = (value << 1) | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height in degrees latitude, width in degrees longitude) of a geohash cell."""
+    total = 5 * precision
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """Geohash prefixes (as long as possible, at most max_cells of them) covering the box."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = int((max_lat - min_lat) / height) + 2
+        cols = int((max_lng - min_lng) / width) + 2
+        if rows * cols > max_cells * 4 and precision > 1:
+            continue
+        cells = set()
+        for i in range(rows):
+            lat = min(max_lat, min_lat + i * height)
+            for j in range(cols):
+                lng = min(max_lng, min_lng + j * width)
+                cells.add(encode(lat, lng, precision))
+        if len(cells) <= max_cells or precision == 1:
+            return sorted(cells)
+    return []
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def radius_box(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * max(0.01, math.cos(math.radians(lat)))))
+    return max(-90.0, lat - dlat), max(-180.0, lng - dlng), min(90.0, lat + dlat), min(180.0, lng + dlng)
+
+
+def bbox_criteria(min_lat, min_lng, max_lat, max_lng):
+    """SQLAlchemy criteria selecting rows inside the box through the geohash index."""
+    prefixes = cover(min_lat, min_lng, max_lat, max_lng)
+    return [
+        or_(*[and_(Property.geohash >= p, Property.geohash < p + _UPPER) for p in prefixes]),
+        Property.latitude.between(min_lat, max_lat),
+        Property.longitude.between(min_lng, max_lng),
+    ]
+
+
+def to_coordinate(value, limit):
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(num) or abs(num) > limit:
+        return None
+    return num
+
+
+def apply_coordinates(prop, latitude, longitude):
+    """Store validated coordinates and their geohash on a Property (0,0 is treated as missing)."""
+    lat = to_coordinate(latitude, 90)
+    lng = to_coordinate(longitude, 180)
+    if lat is None or lng is None or (lat == 0 and lng == 0):
+        prop.latitude = prop.longitude = prop.geohash = None
+    else:
+        prop.latitude, prop.longitude = lat, lng
+        prop.geohash = encode(lat, lng)
+    return prop
@@ -0,0 +1,145 @@
+"""
+Conditional responses and compression for the large JSON endpoints.
+- @conditional(version_fn) derives a strong ETag from a cheap data version (e.g. the last
+  import id and row count) and answers If-None-Match with 304 before the view runs.
+  Without a version the ETag is a hash of the rendered body.
+- init_app() registers an after_request hook that gzip/brotli-compresses large JSON
+  bodies and records bytes sent and 304s per route.
+"""
+
+import os
+import gzip
+import hashlib
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_MIMETYPES = {"application/json", "application/x-ndjson", "text/plain", "text/csv"}
+_ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+_stats = defaultdict(lambda: {"responses": 0, "not_modified": 0, "bytes_sent": 0, "bytes_uncompressed": 0})
+_stats_lock = threading.Lock()
+
+
+def _etag_matches(etag):
+    if not request.if_none_match:
+        return False
+    # The compressed representations carry a suffix; all of them validate the same data
+    return any(request.if_none_match.contains(etag + suffix) for suffix in ("", *_ENCODING_SUFFIX.values()))
+
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def conditional(version_fn=None):
+    """
+    Make a GET view conditional. version_fn() returns a short string that changes
+    whenever the response would, or None to fall back to hashing the body.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            version = None
+            if version_fn is not None:
+                try:
+                    version = version_fn()
+                except Exception:
+                    version = None
+
+            etag = None
+            if version is not None:
+                seed = f"{request.path}?{request.query_string.decode('utf-8', 'replace')}#{version}"
+                etag = hashlib.sha1(seed.encode("utf-8")).hexdigest()
+                if _etag_matches(etag):
+                    return _not_modified(etag)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            if etag is None:
+                etag = hashlib.sha1(response.get_data()).hexdigest()
+                if _etag_matches(etag):
+                    return _not_modified(etag)
+            response.set_etag(etag)
+            return response
+        return wrapped
+    return decorator
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESS_MIMETYPES
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = _pick_encoding()
+    response.vary.add("Accept-Encoding")
+    if not encoding:
+        return response
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + _ENCODING_SUFFIX[encoding], weak=weak)
+    return response
+
+
+def _record(response, uncompressed):
+    rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+    sent = 0 if response.is_streamed else (response.content_length or 0)
+    with _stats_lock:
+        entry = _stats[rule]
+        entry["responses"] += 1
+        entry["bytes_sent"] += sent
+        entry["bytes_uncompressed"] += uncompressed
+        if response.status_code == 304:
+            entry["not_modified"] += 1
+
+
+def stats():
+    with _stats_lock:
+        result = {}
+        for rule, entry in _stats.items():
+            row = dict(entry)
+            row["not_modified_ratio"] = round(entry["not_modified"] / entry["responses"], 4) if entry["responses"] else 0.0
+            result[rule] = row
+        return result
+
+
+def init_app(app):
+    @app.after_request
+    def _compress_and_record(response):
+        uncompressed = 0 if response.is_streamed or response.direct_passthrough else (response.content_length or 0)
+        response = _compress(response)
+        _record(response, uncompressed)
+        return response
@@ -0,0 +1,287 @@
+"""
+Image proxy for property photos (GET /api/images?url=...&w=...).
+- An upstream image is downloaded once and kept on disk; thumbnails are resized from that
+  copy to the nearest of IMAGE_WIDTHS (never upscaled). Without Pillow the original is served.
+- The cache directory is bounded to IMAGE_CACHE_MAX_BYTES: file mtimes record the last use
+  and the least recently used images are removed once it is over the budget.
+- Entries carry a content-hash ETag. Originals are fetched again after IMAGE_REFRESH_SEC;
+  an unchanged image keeps its ETag, so clients revalidate with 304s.
+- Concurrent requests for the same image and width share one fetch/resize (single-flight,
+  across worker processes too when SINGLEFLIGHT_DIR is set).
+- Only public http(s) hosts are fetched (redirects are checked as well), unless
+  IMAGE_ALLOW_PRIVATE_HOSTS=1.
+- Only raster images (IMAGE_TYPES: JPEG, PNG, WebP, GIF, AVIF) are served.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+import metrics
+import url_guard
+from singleflight import SingleFlight
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency: originals are served unresized
+    Image = ImageOps = None
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_REFRESH_SEC = int(os.getenv("IMAGE_REFRESH_SEC", str(7 * 24 * 3600)))
+IMAGE_MAX_AGE_SEC = int(os.getenv("IMAGE_MAX_AGE_SEC", str(30 * 24 * 3600)))  # Cache-Control max-age
+IMAGE_TIMEOUT = int(os.getenv("IMAGE_TIMEOUT", "15"))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_BYTES", str(20 * 1024 * 1024)))
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,640,1024").split(",") if w.strip()))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_ALLOW_PRIVATE_HOSTS = os.getenv("IMAGE_ALLOW_PRIVATE_HOSTS", "0") == "1"
+MAX_REDIRECTS = 3
+# Raster formats only: SVG can carry scripts and would run them on this API's origin
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif", "image/avif"}
+_LOW_WATER = 0.9  # eviction frees space down to this share of the budget
+
+
+class ImageError(Exception):
+    """An image could not be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+def snap_width(width):
+    """The cached width for a requested one: 0 (original) or the nearest IMAGE_WIDTHS step up."""
+    if not width or width <= 0 or not IMAGE_WIDTHS:
+        return 0
+    return next((w for w in IMAGE_WIDTHS if w >= width), IMAGE_WIDTHS[-1])
+
+
+def check_url(url):
+    if IMAGE_ALLOW_PRIVATE_HOSTS:
+        if urlparse(url).scheme not in ("http", "https") or not urlparse(url).hostname:
+            raise ImageError("url must be an http(s) URL", 400)
+        return
+    try:
+        url_guard.check_public_url(url)
+    except ValueError as exc:
+        raise ImageError(str(exc), 400)
+    except OSError as exc:
+        raise ImageError(f"Cannot resolve {urlparse(url).hostname}: {exc}")
+
+
+class ImageCache:
+    """Cached files under directory/<key[:2]>/<key> with a <key>.json sidecar (etag, type, fetch time)."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, counted on first write
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key[:2], key)
+        return base, base + ".json"
+
+    def get(self, key):
+        path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # last use, for LRU eviction
+        except (OSError, ValueError):
+            return None
+        entry["path"] = path
+        return entry
+
+    def put(self, key, data, content_type, fetched_at):
+        path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "etag": hashlib.sha1(data).hexdigest(),
+            "content_type": content_type,
+            "fetched_at": fetched_at,
+            "size": len(data),
+        }
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, meta_path)  # the sidecar goes last: an entry is complete once it exists
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data)
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.evict()
+        return {**entry, "path": path}
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _files(self):
+        # (last use, size, data path) of every cached file
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith((".json", ".tmp")):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def evict(self):
+        """Recount the directory (other processes write to it too) and drop the least recently used."""
+        with self._lock:
+            files = self._files()
+            size = sum(f[1] for f in files)
+            if size > self.max_bytes:
+                for _, file_size, path in sorted(files):
+                    if size <= self.max_bytes * _LOW_WATER:
+                        break
+                    for victim in (path + ".json", path):
+                        try:
+                            os.remove(victim)
+                        except OSError:
+                            pass
+                    size -= file_size
+                    self.evictions += 1
+            self._size = size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "directory": self.directory,
+            }
+
+
+cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+image_flight = SingleFlight(shared_dir=os.getenv("SINGLEFLIGHT_DIR"))
+
+
+def cache_key(url, width):
+    return hashlib.sha1(f"{url}#{width}".encode("utf-8")).hexdigest()
+
+
+def _fresh(entry):
+    # entries cached before IMAGE_TYPES was narrowed are fetched again (and refused)
+    return (entry is not None and entry.get("content_type") in IMAGE_TYPES
+            and time.time() - entry.get("fetched_at", 0) < IMAGE_REFRESH_SEC)
+
+
+def _fetch(url):
+    """(bytes, content type) of an upstream image, following redirects to allowed hosts only."""
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        try:
+            with metrics.upstream("image", url):
+                resp = requests.get(url, timeout=IMAGE_TIMEOUT, stream=True, allow_redirects=False)
+                with resp:
+                    if resp.is_redirect:
+                        url = urljoin(url, resp.headers.get("Location", ""))
+                        continue
+                    resp.raise_for_status()
+                    content_type = (resp.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+                    if content_type not in IMAGE_TYPES:
+                        raise ImageError(f"Unsupported image type: {content_type or 'none'}")
+                    data = bytearray()
+                    for chunk in resp.iter_content(64 * 1024):
+                        data += chunk
+                        if len(data) > IMAGE_MAX_SOURCE_BYTES:
+                            raise ImageError("Upstream image is too large")
+                    return bytes(data), content_type
+        except requests.exceptions.RequestException as exc:
+            raise ImageError(f"Failed to fetch image: {exc}")
+    raise ImageError("Too many redirects")
+
+
+def _resize(data, width):
+    """(bytes, content type) of the image scaled down to width, or None if it is narrow enough."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.width <= width:
+                return None
+            alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if alpha else "RGB")
+            img.thumbnail((width, img.height), Image.LANCZOS)
+            out = io.BytesIO()
+            if alpha:
+                img.save(out, "PNG", optimize=True)
+                return out.getvalue(), "image/png"
+            img.save(out, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+            return out.getvalue(), "image/jpeg"
+    except Exception as exc:
+        raise ImageError(f"Could not decode image: {exc}")
+
+
+def _build(url, width):
+    key = cache_key(url, width)
+    entry = cache.get(key)
+    if _fresh(entry):
+        return entry  # finished by another process while this one waited
+    if width == 0:
+        data, content_type = _fetch(url)
+        return cache.put(key, data, content_type, time.time())
+
+    original = get_image(url, 0)
+    if Image is None:
+        return original
+    with open(original["path"], "rb") as f:
+        resized = _resize(f.read(), width)
+    if resized is None:
+        return original
+    return cache.put(key, resized[0], resized[1], original["fetched_at"])
+
+
+def get_image(url, width=0):
+    """Cache entry (path, etag, content_type, ...) of url at a snapped width, fetched on a miss."""
+    width = snap_width(width)
+    entry = cache.get(cache_key(url, width))
+    cache.record(hit=_fresh(entry))
+    if _fresh(entry):
+        return entry
+    return image_flight.do(f"image:{url}#{width}", lambda: _build(url, width))
+
+
+def open_image(url, width=0):
+    """(open file, entry) of a cached image; an entry evicted before it is opened is rebuilt once."""
+    for attempt in range(2):
+        entry = get_image(url, width)
+        try:
+            return open(entry["path"], "rb"), entry
+        except OSError:
+            if attempt:
+                raise ImageError("Cached image disappeared")
+            for path in (entry["path"] + ".json", entry["path"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def stats():
+    return {**cache.stats(), "resize": Image is not None, "widths": list(IMAGE_WIDTHS), "singleflight": image_flight.stats()}
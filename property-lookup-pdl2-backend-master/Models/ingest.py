@@ -0,0 +1,199 @@
+"""
+Push ingestion (POST /api/ingest): feeds that can notify us send listing changes in batches
+instead of waiting for the polling importers.
+
+  {"agency": "<agency key>", "source": "daft" | "myhome" | "acquaint" | "wordpress",
+   "upserts": [<feed item>, ...],      # same shapes the importers fetch
+   "deletes": ["<feed id>", ...]}
+
+- Items are mapped with the importer mappers (map_property_*), so a pushed listing is stored
+  exactly as a polled import would store it, and matched on (agency, source, external_id).
+- Pushes authenticate with `X-Ingest-Token: <token>`, a per-agency token derived from the
+  server-side INGEST_SECRET (HMAC of the agency name), so a token only writes its own agency.
+  Issue one with `python ingest.py "<agency name>"`; unset INGEST_SECRET disables pushes.
+- The whole batch is validated first; any bad item rejects the batch and nothing is written.
+- Writes are executemany INSERT/UPDATE/DELETE statements in one transaction, followed by the
+  agency stats refresh, an import_activity row and cluster resolution for the new/changed rows.
+"""
+
+import datetime
+import hashlib
+import hmac
+import os
+import sys
+import time
+
+from sqlalchemy import bindparam, select
+
+from models import db, ImportActivity, Property
+from query_stats import query_scope
+import metrics
+
+INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "500"))
+INGEST_SECRET = os.getenv("INGEST_SECRET", "")
+SOURCES = ("daft", "myhome", "acquaint", "wordpress")
+
+# Columns written from the mapped Property; id and cluster_id are managed here
+_COLUMNS = tuple(c.name for c in Property.__table__.columns if c.name not in ("id", "cluster_id"))
+
+
+def agency_token(agency_name):
+    """Ingest token of an agency: HMAC-SHA256 of its name under INGEST_SECRET."""
+    if not INGEST_SECRET:
+        raise RuntimeError("INGEST_SECRET is not set")
+    return hmac.new(INGEST_SECRET.encode(), agency_name.encode(), hashlib.sha256).hexdigest()
+
+
+def token_allows(agency_name, token):
+    """True when `token` is the ingest token of this agency (constant-time comparison)."""
+    if not INGEST_SECRET or not token:
+        return False
+    return hmac.compare_digest(agency_token(agency_name), token)
+
+
+def row_values(prop):
+    """Column values of a mapped (unsaved) Property, as written by apply_batch()."""
+    return {name: getattr(prop, name) for name in _COLUMNS}
+
+
+class BatchError(ValueError):
+    """A batch failed validation; `errors` lists the offending items."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+def _mapper(source):
+    # Importer modules are loaded on first use, inside the web app context (see bootstrap.py)
+    if source == "daft":
+        from daft_import import map_property_4pm
+        return map_property_4pm
+    if source == "myhome":
+        from myhome_import import map_property_myhome
+        return map_property_myhome
+    if source == "acquaint":
+        from myhome_import import map_property_acquaint
+        return map_property_acquaint
+    from wordpress_import import map_property_wordpress
+    return map_property_wordpress
+
+
+def validate(payload):
+    """(source, upserts, deletes) of a request body, or BatchError."""
+    if not isinstance(payload, dict):
+        raise BatchError("Body must be a JSON object")
+    source = str(payload.get("source") or "").strip().lower()
+    if source not in SOURCES:
+        raise BatchError(f"source must be one of: {', '.join(SOURCES)}")
+    upserts = payload.get("upserts") or []
+    deletes = payload.get("deletes") or []
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        raise BatchError("upserts and deletes must be lists")
+    if not upserts and not deletes:
+        raise BatchError("Batch is empty")
+    if len(upserts) + len(deletes) > INGEST_MAX_BATCH:
+        raise BatchError(f"Batch too large: at most {INGEST_MAX_BATCH} upserts and deletes")
+    errors = []
+    for i, item in enumerate(deletes):
+        if not isinstance(item, (str, int)) or isinstance(item, bool) or str(item).strip() == "":
+            errors.append({"delete": i, "error": "must be a feed id"})
+    for i, item in enumerate(upserts):
+        if not isinstance(item, dict):
+            errors.append({"upsert": i, "error": "must be an object"})
+    if errors:
+        raise BatchError("Invalid batch", errors)
+    return source, upserts, [str(item).strip()[:64] for item in deletes]
+
+
+def map_upserts(source, upserts, agency_name, strict=True):
+    """
+    Mapped column dicts keyed by external_id (last one wins). Invalid items raise BatchError,
+    or are logged and skipped with strict=False (importers).
+    """
+    mapper = _mapper(source)
+    rows = {}
+    errors = []
+    for i, raw in enumerate(upserts):
+        try:
+            prop = mapper(raw, agency_name)
+        except Exception as exc:
+            errors.append({"upsert": i, "error": f"could not map item: {exc}"})
+            continue
+        if not prop.external_id:
+            errors.append({"upsert": i, "error": "item has no feed id"})
+            continue
+        prop.source = source
+        rows[prop.external_id] = row_values(prop)
+    if errors and strict:
+        raise BatchError("Invalid items", errors)
+    for error in errors:
+        print(f"Skip {source} property for {agency_name}: item {error['upsert']}: {error['error']}")
+    return rows
+
+
+def apply_batch(agency_name, source, rows, deletes):
+    """Write one validated batch in the current transaction; returns counts per operation."""
+    table = Property.__table__
+    scope = (table.c.agency_name == agency_name, table.c.source == source)
+    ids = list(rows)
+    existing = {}
+    if ids:
+        existing = dict(db.session.execute(
+            select(table.c.external_id, table.c.id).where(*scope, table.c.external_id.in_(ids))
+        ).all())
+
+    inserts = [values for ext_id, values in rows.items() if ext_id not in existing]
+    updates = [{**values, "row_id": existing[ext_id]} for ext_id, values in rows.items() if ext_id in existing]
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        # SET takes the column keys of the parameter rows; changed listings go back to the resolver
+        db.session.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(cluster_id=None),
+            updates,
+        )
+    deleted = 0
+    if deletes:
+        deleted = db.session.execute(table.delete().where(*scope, table.c.external_id.in_(deletes))).rowcount
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": deleted}
+
+
+def ingest(agency, payload):
+    """Validate, map and apply a pushed batch for an agency; raises BatchError on bad input."""
+    from agency_stats import refresh_agency_stats
+    from entity_resolution import resolve_after_import
+
+    source, upserts, deletes = validate(payload)
+    rows = map_upserts(source, upserts, agency.name)
+    started = time.perf_counter()
+    started_at = datetime.datetime.utcnow()
+    with query_scope(f"ingest:{source}"):
+        try:
+            result = apply_batch(agency.name, source, rows, deletes)
+            refresh_agency_stats(agency.name, imported=[source])
+            db.session.add(ImportActivity(
+                agency_name=agency.name,
+                source=source,
+                added_count=result["inserted"] + result["updated"],
+                status="ok",
+                message=f"push: {result['inserted']} inserted, {result['updated']} updated, {result['deleted']} deleted",
+                started_at=started_at,
+                finished_at=datetime.datetime.utcnow(),
+                duration_sec=time.perf_counter() - started,
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            metrics.record_import(source, 0, time.perf_counter() - started, status="failed")
+            raise
+        metrics.record_import(source, result["inserted"] + result["updated"], time.perf_counter() - started)
+        if rows:
+            resolve_after_import()
+    return {"source": source, **result}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit('usage: python ingest.py "<agency name>"')
+    print(agency_token(sys.argv[1]))
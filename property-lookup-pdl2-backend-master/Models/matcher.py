@@ -0,0 +1,180 @@
+"""
+Indexed matching of a local property against live feed items.
+- normalize_prop() reduces a DB row or a live item to id/price/status/address.
+- LiveItemIndex is built once per fetch: exact maps for ids and reference numbers and a
+  token + trigram index over addresses, returning ranked candidates with scores.
+"""
+
+import os
+import re
+from collections import defaultdict
+from html import unescape
+
+ADDRESS_MATCH_MIN_SCORE = float(os.getenv("ADDRESS_MATCH_MIN_SCORE", "0.55"))
+# Number of items sharing the most selective address tokens that get a trigram score
+CANDIDATE_POOL_SIZE = 64
+
+# Fields that carry a listing id or reference number in the feeds we consume
+ID_FIELDS = ("id", "PropertyId", "propertyId", "uniquereferencenumber", "reference", "ref", "daft_id")
+ADDRESS_FIELDS = ("addressText", "DisplayAddress", "displayAddress", "displayaddress", "full_address", "house_location", "address")
+
+_ABBREVIATIONS = {
+    "st": "street",
+    "rd": "road",
+    "ave": "avenue",
+    "av": "avenue",
+    "dr": "drive",
+    "ln": "lane",
+    "pk": "park",
+    "sq": "square",
+    "tce": "terrace",
+    "ct": "court",
+    "co": "county",
+    "apt": "apartment",
+    "no": "",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Routing key (A65, D6W, ...) + 4 character unique identifier
+_EIRCODE = re.compile(r"\b([AC-FHKNPRTV-Y]\d{2}|D6W)\s?([0-9AC-FHKNPRTV-Y]{4})\b", re.IGNORECASE)
+
+
+def normalize_value(val):
+    if val is None:
+        return ''
+    try:
+        return str(val).strip()
+    except Exception:
+        return ''
+
+
+def normalize_prop(obj):
+    if not obj:
+        return {}
+    return {
+        "id": normalize_value(obj.get("id") if isinstance(obj, dict) else getattr(obj, "id", None)) or normalize_value(obj.get("uniquereferencenumber") if isinstance(obj, dict) else getattr(obj, "uniquereferencenumber", None)),
+        "price": normalize_value(obj.get("priceText") if isinstance(obj, dict) else getattr(obj, "price", None) or getattr(obj, "priceText", None) or getattr(obj, "house_price", None)),
+        "status": normalize_value(obj.get("statusText") if isinstance(obj, dict) else getattr(obj, "status", None) or getattr(obj, "statusText", None) or getattr(obj, "house_extra_info_3", None)),
+        "address": normalize_value(obj.get("addressText") if isinstance(obj, dict) else getattr(obj, "addressText", None) or getattr(obj, "displayaddress", None) or getattr(obj, "house_location", None)),
+    }
+
+
+def address_text(item):
+    """Best-effort display address of a live item or DB row dict."""
+    if not isinstance(item, dict):
+        return ''
+    for field in ADDRESS_FIELDS:
+        val = item.get(field)
+        if isinstance(val, dict):
+            # Acquaint nests the address parts
+            parts = [val.get(k) for k in ("propertyname", "street", "locality", "town", "region", "postcode")]
+            val = ", ".join(str(p.get("#text") if isinstance(p, dict) else p) for p in parts if p)
+        if val:
+            return normalize_value(val)
+    title = item.get("title")
+    if isinstance(title, dict):
+        title = title.get("rendered")
+    return normalize_value(unescape(title)) if title else ''
+
+
+def normalize_eircode(*values):
+    """Return the first valid Eircode found in the given values, formatted as 'A65 F4E2'."""
+    for value in values:
+        if not value:
+            continue
+        match = _EIRCODE.search(str(value))
+        if match:
+            return f"{match.group(1)} {match.group(2)}".upper()
+    return None
+
+
+def address_tokens(text):
+    tokens = []
+    for tok in _NON_ALNUM.split(unescape(text or "").lower()):
+        tok = _ABBREVIATIONS.get(tok, tok)
+        if tok:
+            tokens.append(tok)
+    return tokens
+
+
+def trigrams(tokens):
+    grams = set()
+    for tok in tokens:
+        padded = f"  {tok} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def item_ids(item):
+    ids = set()
+    if isinstance(item, dict):
+        for field in ID_FIELDS:
+            val = normalize_value(item.get(field))
+            if val:
+                ids.add(val.lower())
+    return ids
+
+
+class LiveItemIndex:
+    def __init__(self, items):
+        self.items = list(items or [])
+        self._by_id = {}
+        self._by_token = defaultdict(set)
+        self._grams = []
+        for pos, item in enumerate(self.items):
+            for key in item_ids(item):
+                self._by_id.setdefault(key, pos)
+            tokens = address_tokens(address_text(item))
+            for tok in set(tokens):
+                self._by_token[tok].add(pos)
+            self._grams.append(trigrams(tokens))
+        # Tokens shared by a large share of addresses (town, county, "road") barely narrow
+        # the search, so they are only used when nothing more selective matches
+        self._selective_max = max(64, len(self.items) // 20)
+
+    def __len__(self):
+        return len(self.items)
+
+    def by_id(self, value):
+        pos = self._by_id.get(normalize_value(value).lower()) if value is not None else None
+        return self.items[pos] if pos is not None else None
+
+    def candidates(self, address, limit=5, min_score=0.0):
+        """Rank items by trigram similarity of their address to the given one."""
+        tokens = address_tokens(address)
+        if not tokens:
+            return []
+        query = trigrams(tokens)
+        postings = sorted((self._by_token[tok] for tok in set(tokens) if tok in self._by_token), key=len)
+        if not postings:
+            return []
+        shared = defaultdict(int)
+        for posting in [p for p in postings if len(p) <= self._selective_max] or postings[:1]:
+            for pos in posting:
+                shared[pos] += 1
+        pool = sorted(shared, key=lambda pos: -shared[pos])[:CANDIDATE_POOL_SIZE]
+        ranked = []
+        for pos in pool:
+            grams = self._grams[pos]
+            if not grams:
+                continue
+            score = 2.0 * len(query & grams) / (len(query) + len(grams))
+            if score >= min_score:
+                ranked.append((score, pos))
+        ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [{"score": round(score, 4), "item": self.items[pos]} for score, pos in ranked[:limit]]
+
+    def match(self, prop_id=None, address=None, min_score=ADDRESS_MATCH_MIN_SCORE):
+        """
+        Return (item, info) for the best match: an exact id/reference hit first, then
+        the top address candidate above min_score. info carries how it matched,
+        the score and the ranked address candidates.
+        """
+        if prop_id is not None:
+            hit = self.by_id(prop_id)
+            if hit is not None:
+                return hit, {"by": "id", "score": 1.0, "candidates": []}
+        ranked = self.candidates(address) if address else []
+        if ranked and ranked[0]["score"] >= min_score:
+            return ranked[0]["item"], {"by": "address", "score": ranked[0]["score"], "candidates": ranked}
+        return None, {"by": None, "score": 0.0, "candidates": ranked}
@@ -0,0 +1,333 @@
+"""
+Prometheus text-format metrics, without extra dependencies.
+- Counter and Histogram with labels, kept in a process-local registry.
+- With METRICS_DIR set (several web workers, cron importers) every process writes its values to
+  METRICS_DIR/metrics-<pid>.json (at most every METRICS_FLUSH_SEC and at exit) and render()
+  sums the files of all processes, finished ones included, so counters never go backwards.
+  At each scrape the files of processes that have exited are merged into metrics-finished.json
+  and removed, so the directory does not grow with every worker restart (pids are checked on
+  this host: do not share METRICS_DIR between hosts or containers).
+  Clear the directory when the service is deployed, as with prometheus_client's multiprocess mode.
+- init_app() times every request per route and reads its DB queries from query_stats; upstream()
+  times a feed fetch; record_import() is called by the importers once per agency commit.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: finished processes' files are kept, not merged
+    fcntl = None
+
+import query_stats
+
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_SEC = float(os.getenv("METRICS_FLUSH_SEC", "5"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def snapshot(self):
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labels": list(self.labels),
+            "buckets": list(getattr(self, "buckets", ())),
+            "values": [[list(key), list(value) if isinstance(value, list) else value] for key, value in self.values.items()],
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            # per-bucket (not cumulative) counts, then sum and count
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP responses by route, method and status", ("route", "method", "status"))
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+HTTP_DB_QUERIES = Histogram("http_request_db_queries", "DB queries run per HTTP request", ("route",), QUERY_COUNT_BUCKETS)
+HTTP_DB_SECONDS = Histogram("http_request_db_seconds", "DB time spent per HTTP request", ("route",))
+DB_QUERIES = Counter("db_queries_total", "DB statements executed by this service")
+DB_SECONDS = Counter("db_query_seconds_total", "Time spent executing DB statements")
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Feed fetches by source, host and outcome", ("source", "host", "outcome"))
+UPSTREAM_SECONDS = Histogram("upstream_request_duration_seconds", "Feed fetch latency by source and host", ("source", "host"))
+IMPORT_SECONDS = Histogram("import_job_duration_seconds", "Importer run time per agency and source", ("source", "status"), JOB_BUCKETS)
+IMPORT_ROWS = Counter("import_rows_written_total", "Properties written by the importers", ("source",))
+
+
+# ---------------- recording helpers ----------------
+
+@contextmanager
+def upstream(source, url):
+    """Time one upstream fetch; an exception inside the block counts as an error."""
+    host = urlparse(url).hostname or ""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, source=source, host=host)
+        UPSTREAM_REQUESTS.inc(source=source, host=host, outcome=outcome)
+
+
+def record_import(source, rows, seconds, status="ok"):
+    IMPORT_SECONDS.observe(seconds, source=source, status=status)
+    if rows:
+        IMPORT_ROWS.inc(rows, source=source)
+    maybe_flush()
+
+
+def _observe_statement(statement, seconds):
+    DB_QUERIES.inc()
+    DB_SECONDS.inc(seconds)
+
+
+query_stats.observers.append(_observe_statement)
+
+
+def init_app(app):
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        scope = g.get("query_scope")
+        if scope is not None:
+            HTTP_DB_QUERIES.observe(scope.count, route=route)
+            HTTP_DB_SECONDS.observe(scope.seconds, route=route)
+        maybe_flush()
+        return response
+
+
+# ---------------- multiprocess files ----------------
+
+_last_flush = 0.0
+# pid plus start time, so a recycled pid never overwrites the totals of a finished process
+_FILE_NAME = f"metrics-{os.getpid()}-{int(time.time() * 1000)}.json"
+# totals of processes that have exited, merged by _compact()
+_FINISHED_NAME = "metrics-finished.json"
+_LOCK_NAME = ".flush.lock"
+
+
+def _snapshot():
+    with _lock:
+        return {name: metric.snapshot() for name, metric in _registry.items()}
+
+
+def flush():
+    if not METRICS_DIR:
+        return
+    global _last_flush
+    _last_flush = time.monotonic()
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, _FILE_NAME)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_snapshot(), f)
+        os.replace(tmp, path)
+    except OSError as exc:
+        print(f"[metrics] flush failed: {exc}")
+
+
+def maybe_flush():
+    if METRICS_DIR and time.monotonic() - _last_flush >= METRICS_FLUSH_SEC:
+        flush()
+
+
+atexit.register(flush)
+
+
+def _merge(into, snap):
+    for name, metric in snap.items():
+        target = into.setdefault(name, {**metric, "values": {}})
+        for key, value in metric["values"]:
+            key = tuple(key)
+            current = target["values"].get(key)
+            if current is None:
+                target["values"][key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                target["values"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                target["values"][key] = current + value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _file_pid(entry):
+    """pid of a metrics-<pid>-<ms>.json(.tmp) file name, None for other files."""
+    parts = entry.split("-")
+    if len(parts) < 2 or parts[0] != "metrics" or not parts[1].split(".")[0].isdigit():
+        return None
+    return int(parts[1].split(".")[0])
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _compact(entries):
+    """Merge the files of exited processes into _FINISHED_NAME and delete them (lock held)."""
+    dead = []
+    for entry in entries:
+        pid = _file_pid(entry)
+        if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+            dead.append(entry)
+    if not dead:
+        return
+    finished_path = os.path.join(METRICS_DIR, _FINISHED_NAME)
+    merged = {}
+    _merge(merged, _read(finished_path) or {})
+    for entry in dead:
+        if entry.endswith(".json"):
+            _merge(merged, _read(os.path.join(METRICS_DIR, entry)) or {})
+    snapshot = {
+        name: {**metric, "values": [[list(key), value] for key, value in metric["values"].items()]}
+        for name, metric in merged.items()
+    }
+    tmp = f"{finished_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, finished_path)
+    for entry in dead:
+        try:
+            os.remove(os.path.join(METRICS_DIR, entry))
+        except OSError:
+            pass
+
+
+def collect():
+    """Values of every process (this one live, the others from their last flush)."""
+    merged = {}
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        lock_file = None
+        try:
+            if fcntl:
+                # the same directory is compacted by every scraping process: one at a time
+                lock_file = open(os.path.join(METRICS_DIR, _LOCK_NAME), "a+")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    _compact(os.listdir(METRICS_DIR))
+                except OSError as exc:
+                    print(f"[metrics] compaction failed: {exc}")
+            for entry in sorted(os.listdir(METRICS_DIR)):
+                if not entry.endswith(".json") or entry == _FILE_NAME:
+                    continue
+                _merge(merged, _read(os.path.join(METRICS_DIR, entry)) or {})
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+    _merge(merged, _snapshot())
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_INF = 'le="+Inf"'
+
+
+def render():
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labels"]
+        for key, value in sorted(metric["values"].items()):
+            if metric["kind"] == "counter":
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"], value):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(names, key, _INF)} {value[-1]}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(names, key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,13 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Enum
+from sqlalchemy.dialects import mysql
+import datetime
 import json
+from read_replica import RoutingSession
 
-# Initialize the database
-db = SQLAlchemy()
+# Initialize the database (db.session sends read-only request SELECTs to the replica, see read_replica.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # User model
 class User(db.Model):
@@ -57,6 +60,24 @@ class Property(db.Model):
     agency_image_url = db.Column(db.String(255))
     images_url_house = db.Column(db.String(255))
     source = db.Column(db.String(50))
+    # Typed values parsed from house_price / house_mt_squared (see parsing.py)
+    price_amount = db.Column(db.Float, index=True)
+    price_currency = db.Column(db.String(3))
+    price_qualifier = db.Column(db.String(20))
+    size_sqm = db.Column(db.Float, index=True)
+    # Coordinates from the feeds; geohash is the spatial index (see geo.py)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)
+    eircode = db.Column(db.String(8), index=True)
+    # Listing id in the source feed; push ingestion (ingest.py) upserts and deletes by it
+    external_id = db.Column(db.String(64))
+    # Cross-source duplicate cluster (see entity_resolution.py); NULL until resolved
+    cluster_id = db.Column(db.Integer, index=True)
+    # Set on insert and on every ORM/Core update, so listing ETags notice in-place edits;
+    # microseconds (and DATETIME(6) on MySQL) so two edits within a second still differ
+    updated_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+                           default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     def __init__(self, agency_agent_name, agency_name, house_location, house_price, house_bedrooms, house_bathrooms, house_mt_squared, house_extra_info_1, house_extra_info_2, house_extra_info_3, house_extra_info_4, agency_image_url, images_url_house, source=None):
         self.agency_agent_name = agency_agent_name
@@ -91,7 +112,16 @@ class Property(db.Model):
             "agency_image_url": self.agency_image_url,
             "images_url_house": self.images_url_house,
             "source": self.source,
-            "sourceLabel": self.source  # camelCase for frontend convenience
+            "sourceLabel": self.source,  # camelCase for frontend convenience
+            "price_amount": self.price_amount,
+            "price_currency": self.price_currency,
+            "price_qualifier": self.price_qualifier,
+            "size_sqm": self.size_sqm,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "eircode": self.eircode,
+            "external_id": self.external_id,
+            "cluster_id": self.cluster_id,
         }
 
 
@@ -122,6 +152,100 @@ class ImportActivity(db.Model):
             "duration_sec": self.duration_sec,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+class PropertyCluster(db.Model):
+    """One real-world listing; properties from different sources point at it via cluster_id."""
+    __tablename__ = 'property_clusters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sample_address = db.Column(db.String(255), nullable=True)
+    eircode = db.Column(db.String(8), nullable=True)
+    price_amount = db.Column(db.Float, nullable=True)
+    bedrooms = db.Column(db.Integer, nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "sample_address": self.sample_address,
+            "eircode": self.eircode,
+            "price_amount": self.price_amount,
+            "bedrooms": self.bedrooms,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
+
+
+class ClusterBlockKey(db.Model):
+    """Blocking keys of a cluster, so new rows are only compared with clusters sharing a key."""
+    __tablename__ = 'property_cluster_keys'
+
+    block_key = db.Column(db.String(120), primary_key=True)
+    cluster_id = db.Column(db.Integer, primary_key=True)
+
+
+class AgencySourceStats(db.Model):
+    """Per agency and source listing figures, rewritten by the importers with each agency commit."""
+    __tablename__ = 'agency_source_stats'
+
+    agency_name = db.Column(db.String(255), primary_key=True)
+    source = db.Column(db.String(50), primary_key=True)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    live_count = db.Column(db.Integer, nullable=False, default=0)
+    agreed_count = db.Column(db.Integer, nullable=False, default=0)
+    sold_count = db.Column(db.Integer, nullable=False, default=0)
+    priced_count = db.Column(db.Integer, nullable=False, default=0)
+    min_price = db.Column(db.Float, nullable=True)
+    median_price = db.Column(db.Float, nullable=True)
+    max_price = db.Column(db.Float, nullable=True)
+    last_import_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+    def to_dict(self):
+        return {
+            "agency_name": self.agency_name,
+            "source": self.source,
+            "total_count": self.total_count,
+            "live_count": self.live_count,
+            "agreed_count": self.agreed_count,
+            "sold_count": self.sold_count,
+            "priced_count": self.priced_count,
+            "min_price": self.min_price,
+            "median_price": self.median_price,
+            "max_price": self.max_price,
+            "last_import_at": self.last_import_at.isoformat() if self.last_import_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class WordPressCursor(db.Model):
+    """Sync position of one WordPress endpoint (see wordpress_crawler.py), keyed by sha1 of its URL."""
+    __tablename__ = 'wordpress_cursors'
+
+    endpoint_hash = db.Column(db.String(40), primary_key=True)
+    endpoint = db.Column(db.Text, nullable=False)
+    # newest modified_gmt seen, in the site's own clock; sent back as modified_after
+    last_modified_gmt = db.Column(db.String(32), nullable=True)
+    last_full_sync_at = db.Column(db.DateTime, nullable=True)
+    last_sync_at = db.Column(db.DateTime, nullable=True)
+    post_count = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(50), nullable=True)
+    message = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "last_modified_gmt": self.last_modified_gmt,
+            "last_full_sync_at": self.last_full_sync_at.isoformat() if self.last_full_sync_at else None,
+            "last_sync_at": self.last_sync_at.isoformat() if self.last_sync_at else None,
+            "post_count": self.post_count,
+            "status": self.status,
+            "message": self.message,
+        }
+
+
 class Agency(db.Model):
     __tablename__ = 'agencies'
 
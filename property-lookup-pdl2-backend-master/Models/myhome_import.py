@@ -8,11 +8,22 @@ Existing properties for each agency are cleared before import to avoid duplicate
 
 import os
 import json
+import time
 import requests
 from dotenv import load_dotenv
-from App import app
+from bootstrap import app
 from models import db, Agency, Property
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
 from sqlalchemy import or_
+from feed_cache import acquaint_index
+from singleflight import upstream_flight
+import metrics
+from parsing import apply_numeric_fields
+from geo import apply_coordinates
+from matcher import normalize_eircode
 
 load_dotenv()
 
@@ -33,7 +44,7 @@ def clamp(value, max_len=255):
     return s[:max_len]
 
 
-def map_property_common(agency_name, agent_name, address, price, beds, baths, size, extras, main_photo, photo_urls, source=None):
+def map_property_common(agency_name, agent_name, address, price, beds, baths, size, extras, main_photo, photo_urls, source=None, latitude=None, longitude=None, eircode=None, external_id=None):
     # Clamp all string fields to DB limits (varchar 255)
     photo_urls = [p for p in photo_urls if p]
     images_json = clamp(json.dumps(photo_urls[:5]), 255) if photo_urls else None
@@ -58,6 +69,10 @@ def map_property_common(agency_name, agent_name, address, price, beds, baths, si
             prop.source = clamp(source)
         except Exception:
             pass
+    apply_numeric_fields(prop)
+    apply_coordinates(prop, latitude, longitude)
+    prop.eircode = normalize_eircode(eircode, address)
+    prop.external_id = clamp(external_id, 64) if external_id not in (None, "") else None
     return prop
 
 
@@ -114,6 +129,7 @@ def map_property_myhome(raw, agency_name):
     main_photo = raw.get("MainPhoto") or (photo_urls[0] if photo_urls else None)
 
     agent_name = sanitize_str(raw.get("GroupName") or raw.get("Group") or raw.get("agentName") or agency_name)
+    location = raw.get("BrochureMap") or {}
 
     return map_property_common(
         agency_name=agency_name,
@@ -132,14 +148,23 @@ def map_property_myhome(raw, agency_name):
         main_photo=main_photo,
         photo_urls=photo_urls,
         source="myhome",
+        latitude=location.get("latitude") if isinstance(location, dict) else None,
+        longitude=location.get("longitude") if isinstance(location, dict) else None,
+        eircode=raw.get("Eircode"),
+        external_id=raw.get("PropertyId") or raw.get("Id") or raw.get("id"),
     )
 
 
+def _get_json(url):
+    with metrics.upstream("myhome", url):
+        resp = requests.get(url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
+
+
 def fetch_myhome_search(api_key):
     url = f"https://agentapi.myhome.ie/search/{api_key}?format=json&correlationId={api_key}&PageSize=50&PropertyClassIds=1"
-    resp = requests.get(url, timeout=FETCH_TIMEOUT)
-    resp.raise_for_status()
-    data = resp.json()
+    data = upstream_flight.do(url, lambda: _get_json(url))
     if isinstance(data, dict):
         return data.get("SearchResults") or data.get("results") or data.get("Properties") or data.get("items") or data.get("properties") or []
     if isinstance(data, list):
@@ -151,9 +176,10 @@ def fetch_myhome_search(api_key):
 
 def fetch_acquaint(prefix):
     url = f"https://www.acquaintcrm.co.uk/datafeeds/standardxml/{prefix}-0.xml"
-    resp = requests.get(url, timeout=FETCH_TIMEOUT)
-    resp.raise_for_status()
-    data = resp.text
+    with metrics.upstream("acquaint", url):
+        resp = requests.get(url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        data = resp.text
     return data
 
 
@@ -166,6 +192,22 @@ def parse_acquaint(xml_text):
     return props
 
 
+def load_acquaint(prefix, index=True):
+    """
+    Fetch and parse an Acquaint feed, and index it for single-property lookups. The import
+    CLIs pass index=False: their process exits after the run, so nothing would read it.
+    """
+    def load():
+        xml_text = fetch_acquaint(prefix)
+        rows = parse_acquaint(xml_text) or []
+        if index:
+            acquaint_index.put(prefix, rows, size_hint=len(xml_text))
+        return rows
+
+    # Concurrent loads of the same feed share one download and parse
+    return upstream_flight.do(f"acquaint:{prefix}", load)
+
+
 def map_property_acquaint(raw, agency_name):
     def pick(*vals):
         for v in vals:
@@ -238,13 +280,17 @@ def map_property_acquaint(raw, agency_name):
         main_photo=main_photo,
         photo_urls=photos,
         source="acquaint",
+        latitude=pick_text(raw.get("latitude") or addr.get("latitude")),
+        longitude=pick_text(raw.get("longitude") or addr.get("longitude")),
+        eircode=pick_text(addr.get("postcode") or raw.get("postcode") or raw.get("postalcode")),
+        external_id=pick_text(raw.get("id") or raw.get("propertyid")),
     )
 
 
 # ---------------------- Runner ----------------------
 
 def import_feeds():
-    with app.app_context():
+    with app.app_context(), query_scope("import:feeds") as db_scope:
         agencies = Agency.query.filter(
             or_(
                 Agency.primary_source.in_(["myhome", "acquaint"]),
@@ -258,6 +304,8 @@ def import_feeds():
             source = (agency.primary_source or "").strip().lower()
             is_myhome = source == "myhome" or agency.myhome_api_key
             is_acquaint = source == "acquaint" or agency.site_prefix or agency.acquaint_site_prefix
+            imported = {}  # source -> rows written
+            started = time.perf_counter()
 
             if is_myhome:
                 api_key = (agency.myhome_api_key or "").strip()
@@ -277,8 +325,10 @@ def import_feeds():
                                 added += 1
                             except Exception as exc:
                                 print(f"Skip myhome property for {agency.name}: {exc}")
+                        imported["myhome"] = added
                     except Exception as exc:
                         print(f"Failed fetching MyHome for {agency.name}: {exc}")
+                        metrics.record_import("myhome", 0, time.perf_counter() - started, status="failed")
                         rows = []
                         added = 0
                 else:
@@ -295,8 +345,7 @@ def import_feeds():
                             Property.agency_name == agency.name,
                             Property.source == "acquaint"
                         ).delete()
-                        xml_text = fetch_acquaint(prefix)
-                        rows = parse_acquaint(xml_text) or []
+                        rows = load_acquaint(prefix, index=False)
                         added = 0
                         for raw in rows:
                             try:
@@ -304,19 +353,29 @@ def import_feeds():
                                 added += 1
                             except Exception as exc:
                                 print(f"Skip acquaint property for {agency.name}: {exc}")
+                        imported["acquaint"] = added
                     except Exception as exc:
                         print(f"Failed fetching Acquaint for {agency.name}: {exc}")
+                        metrics.record_import("acquaint", 0, time.perf_counter() - started, status="failed")
                         rows = []
                         added = 0
 
             # Commit once per agency and report result
             try:
+                refresh_agency_stats(agency.name, imported=imported)
                 db.session.commit()
                 print(f"Imported properties for agency {agency.name} (count: {added})")
+                status = "ok"
             except Exception as exc:
                 db.session.rollback()
                 print(f"Commit failed for agency {agency.name}: {exc}")
+                status = "failed"
+            for name, count in imported.items():
+                metrics.record_import(name, count if status == "ok" else 0, time.perf_counter() - started, status=status)
+
+        resolve_after_import()
+        print(f"[Import] DB: {db_scope.summary()}")
 
 
 if __name__ == "__main__":
-    import_feeds()
+    run_cli(import_feeds, "import:feeds")  # --profile stores a cProfile of the run
@@ -5,8 +5,13 @@ Keeps other sources (e.g., Acquaint/Daft) intact.
 
 from dotenv import load_dotenv
 from sqlalchemy import or_
-from App import app
+from bootstrap import app
 from models import db, Agency, Property, ImportActivity
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+import metrics
 from myhome_import import fetch_myhome_search, map_property_myhome
 import datetime
 
@@ -14,7 +19,7 @@ load_dotenv()
 
 
 def import_myhome_only():
-    with app.app_context():
+    with app.app_context(), query_scope("import:myhome") as db_scope:
         agencies = Agency.query.filter(
             or_(
                 Agency.primary_source == "myhome",
@@ -56,10 +61,14 @@ def import_myhome_only():
                     started_at=started,
                     finished_at=datetime.datetime.utcnow()
                 ))
+                # the old rows are already deleted in this transaction
+                refresh_agency_stats(agency.name)
                 db.session.commit()
+                metrics.record_import("myhome", 0, (datetime.datetime.utcnow() - started).total_seconds(), status="failed")
                 continue
 
             try:
+                refresh_agency_stats(agency.name, imported=["myhome"])
                 db.session.commit()
                 print(f"[MyHome] Imported {added} properties for {agency.name}")
                 finished = datetime.datetime.utcnow()
@@ -74,6 +83,7 @@ def import_myhome_only():
                     duration_sec=(finished - started).total_seconds()
                 ))
                 db.session.commit()
+                metrics.record_import("myhome", added, (finished - started).total_seconds())
             except Exception as exc:
                 db.session.rollback()
                 print(f"[MyHome] Commit failed for {agency.name}: {exc}")
@@ -87,7 +97,11 @@ def import_myhome_only():
                     finished_at=datetime.datetime.utcnow()
                 ))
                 db.session.commit()
+                metrics.record_import("myhome", 0, (datetime.datetime.utcnow() - started).total_seconds(), status="failed")
+
+        resolve_after_import()
+        print(f"[MyHome] DB: {db_scope.summary()}")
 
 
 if __name__ == "__main__":
-    import_myhome_only()
+    run_cli(import_myhome_only, "import:myhome")  # --profile stores a cProfile of the run
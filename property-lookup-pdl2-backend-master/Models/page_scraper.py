@@ -0,0 +1,323 @@
+"""
+Batch page scraper: the Python side of playwright-scraper/scrape.js for many URLs at once.
+- One headless Chromium per process, started on first use and kept running, with a pool of
+  PLAYWRIGHT_CONTEXTS long-lived browser contexts. A page borrows a context for its load, so
+  the pool size caps how many pages load at once; a batch can ask for fewer (concurrency).
+- Contexts are replaced after PLAYWRIGHT_CONTEXT_MAX_PAGES pages to bound their memory, and
+  the browser is relaunched if it dies. Images, media and fonts are not downloaded.
+- Only public hosts are loaded (url_guard): job URLs are checked up front, and every request
+  the browser makes, redirects included, is checked again by a route handler. Set
+  PLAYWRIGHT_ALLOW_PRIVATE_HOSTS=1 to scrape local test pages.
+- Playwright's async API runs on one event loop in a background thread; scrape() is a plain
+  generator that yields each result as its page finishes, so Flask routes can stream it.
+- A job is {"url", "selectors"?: {field: css}, "id"?}; a result is the scrape.js line
+  {"url", "scrapedAt", "data": {field: text}} (or {"url", "error"}), plus the job's id.
+
+Usage:
+  python page_scraper.py urls.txt [--concurrency 4]   # one URL per line, NDJSON on stdout
+"""
+
+import argparse
+import asyncio
+import atexit
+import datetime
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+
+import metrics
+import url_guard
+
+PLAYWRIGHT_CONTEXTS = int(os.getenv("PLAYWRIGHT_CONTEXTS", "4"))
+PLAYWRIGHT_CONTEXT_MAX_PAGES = int(os.getenv("PLAYWRIGHT_CONTEXT_MAX_PAGES", "50"))
+PLAYWRIGHT_TIMEOUT = int(os.getenv("PLAYWRIGHT_TIMEOUT", "45"))
+PLAYWRIGHT_MAX_URLS = int(os.getenv("PLAYWRIGHT_MAX_URLS", "500"))
+PLAYWRIGHT_ALLOW_PRIVATE_HOSTS = os.getenv("PLAYWRIGHT_ALLOW_PRIVATE_HOSTS", "0") == "1"
+BLOCKED_RESOURCES = {"image", "media", "font"}
+HOST_CHECK_TTL_SEC = 60
+
+
+def _default_selectors():
+    # Same defaults and SELECTORS override as scrape.js
+    try:
+        selectors = json.loads(os.getenv("SELECTORS") or "{}")
+    except ValueError:
+        selectors = {}
+    if not isinstance(selectors, dict):
+        selectors = {}
+    return {
+        "price": selectors.get("price") or ".price",
+        "status": selectors.get("status") or ".status",
+        "address": selectors.get("address") or ".address",
+    }
+
+
+DEFAULT_SELECTORS = _default_selectors()
+
+
+def _valid_selectors(value):
+    return isinstance(value, dict) and all(
+        isinstance(k, str) and isinstance(v, str) and v.strip() for k, v in value.items()
+    )
+
+
+def build_jobs(pages, selectors=None):
+    """
+    Validated job dicts from a request's pages (URL strings or {url, selectors?, id?} objects);
+    batch-level selectors apply to pages without their own. Raises ValueError.
+    """
+    if not isinstance(pages, list) or not pages:
+        raise ValueError("pages must be a non-empty list")
+    if len(pages) > PLAYWRIGHT_MAX_URLS:
+        raise ValueError(f"At most {PLAYWRIGHT_MAX_URLS} pages per batch")
+    if selectors is not None and not _valid_selectors(selectors):
+        raise ValueError("selectors must map field names to CSS selectors")
+    default = selectors or DEFAULT_SELECTORS
+    jobs = []
+    checked = set()  # hosts already resolved to public addresses
+    for i, page in enumerate(pages):
+        job = {"url": page} if isinstance(page, str) else dict(page) if isinstance(page, dict) else None
+        if job is None:
+            raise ValueError(f"pages[{i}] must be a URL or an object with a url")
+        url = str(job.get("url") or "").strip()
+        if urlparse(url).scheme not in ("http", "https") or not urlparse(url).hostname:
+            raise ValueError(f"pages[{i}]: url must be an http(s) URL")
+        if not PLAYWRIGHT_ALLOW_PRIVATE_HOSTS:
+            host = urlparse(url).hostname
+            if host not in checked:
+                try:
+                    url_guard.check_public_url(url)
+                except url_guard.BlockedHost:
+                    raise ValueError(f"pages[{i}]: url host is not allowed")
+                except OSError:
+                    raise ValueError(f"pages[{i}]: cannot resolve {host}")
+                checked.add(host)
+        if job.get("selectors") is not None and not _valid_selectors(job["selectors"]):
+            raise ValueError(f"pages[{i}]: selectors must map field names to CSS selectors")
+        job["url"] = url
+        job["selectors"] = job.get("selectors") or default
+        jobs.append(job)
+    return jobs
+
+
+class _Slot:
+    __slots__ = ("context", "pages", "generation")
+
+    def __init__(self):
+        self.context = None
+        self.pages = 0
+        self.generation = -1
+
+
+class PageScraper:
+    def __init__(self, contexts=PLAYWRIGHT_CONTEXTS, timeout=PLAYWRIGHT_TIMEOUT,
+                 max_pages_per_context=PLAYWRIGHT_CONTEXT_MAX_PAGES):
+        self.contexts = max(1, contexts)
+        self.timeout = timeout
+        self.max_pages_per_context = max_pages_per_context
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # event-loop side, created on the loop
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._slots = None
+        self._browser_lock = None
+
+    # ---------- loop thread ----------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="page-scraper", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def submit(self, job):
+        """concurrent.futures.Future of one job's result."""
+        return asyncio.run_coroutine_threadsafe(self._scrape(job), self._ensure_loop())
+
+    def close(self):
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+    # ---------- browser and contexts (event loop only) ----------
+
+    async def _ensure_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+            self._slots = asyncio.Queue()
+            for _ in range(self.contexts):
+                self._slots.put_nowait(_Slot())
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            from playwright.async_api import async_playwright
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._generation += 1  # contexts of a previous browser are gone with it
+
+    async def _context(self, slot):
+        recycle = slot.pages >= self.max_pages_per_context
+        if slot.context is not None and slot.generation == self._generation and not recycle:
+            return slot.context
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        # service workers would fetch outside the route handler
+        slot.context = await self._browser.new_context(service_workers="block")
+        await slot.context.route("**/*", _guard_route)
+        slot.pages = 0
+        slot.generation = self._generation
+        return slot.context
+
+    async def _scrape(self, job):
+        url = job["url"]
+        result = {"url": url}
+        if "id" in job:
+            result["id"] = job["id"]
+        try:
+            await self._ensure_browser()
+        except Exception as exc:
+            result["error"] = f"browser unavailable: {exc}"
+            return result
+        slot = await self._slots.get()
+        try:
+            context = await self._context(slot)
+            page = await context.new_page()
+            slot.pages += 1
+            try:
+                with metrics.upstream("page", url):
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout * 1000)
+                if not await _allowed(page.url):
+                    raise url_guard.BlockedHost(f"redirected to a blocked host: {urlparse(page.url).hostname}")
+                result["scrapedAt"] = datetime.datetime.utcnow().isoformat() + "Z"
+                result["data"] = {field: await _extract(page, selector) for field, selector in job["selectors"].items()}
+            finally:
+                await page.close()
+        except Exception as exc:
+            result["error"] = str(exc)
+        finally:
+            self._slots.put_nowait(slot)
+        return result
+
+    async def _shutdown(self):
+        if self._slots is not None:
+            while not self._slots.empty():
+                slot = self._slots.get_nowait()
+                if slot.context is not None:
+                    try:
+                        await slot.context.close()
+                    except Exception:
+                        pass
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    # ---------- batches ----------
+
+    def scrape(self, jobs, concurrency=None):
+        """
+        Yield a result per job in completion order, keeping at most `concurrency` pages of this
+        batch in flight (default: the context pool size). Closing the generator cancels the rest.
+        """
+        limit = max(1, min(int(concurrency or self.contexts), self.contexts))
+        remaining = iter(jobs)
+        pending = {self.submit(job) for job in itertools.islice(remaining, limit)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    job = next(remaining, None)
+                    if job is not None:
+                        pending.add(self.submit(job))
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+_host_checks = {}  # host -> (allowed, checked at), used on the event loop only
+
+
+async def _allowed(url):
+    scheme = urlparse(url).scheme
+    if scheme not in ("http", "https"):
+        return scheme in ("data", "blob", "about")
+    if PLAYWRIGHT_ALLOW_PRIVATE_HOSTS:
+        return True
+    host = urlparse(url).hostname
+    cached = _host_checks.get(host)
+    if cached is not None and time.monotonic() - cached[1] < HOST_CHECK_TTL_SEC:
+        return cached[0]
+    try:
+        await url_guard.check_public_url_async(url)
+        allowed = True
+    except (ValueError, OSError):
+        allowed = False
+    _host_checks[host] = (allowed, time.monotonic())
+    return allowed
+
+
+async def _guard_route(route):
+    # every request of the page: navigations, their redirects and the page's own fetches
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCES or not await _allowed(request.url):
+        await route.abort("blockedbyclient")
+    else:
+        await route.continue_()
+
+
+async def _extract(page, selector):
+    try:
+        el = await page.query_selector(selector)
+        if not el:
+            return ""
+        return ((await el.text_content()) or "").strip()
+    except Exception:
+        return ""
+
+
+scraper = PageScraper()
+atexit.register(scraper.close)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Scrape listing pages with a pool of browser contexts")
+    parser.add_argument("urls", help="file with one URL per line ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=PLAYWRIGHT_CONTEXTS)
+    args = parser.parse_args(argv)
+
+    f = sys.stdin if args.urls == "-" else open(args.urls, "r", encoding="utf-8")
+    with f:
+        urls = [line.strip() for line in f if line.strip()]
+    try:
+        jobs = build_jobs(urls)
+    except ValueError as exc:
+        parser.error(str(exc))
+    for result in scraper.scrape(jobs, args.concurrency):
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
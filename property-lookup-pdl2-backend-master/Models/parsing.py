@@ -0,0 +1,110 @@
+"""
+Parsers for the free-text price and size strings the feeds deliver.
+- parse_price("€350,000") -> (350000.0, "EUR", None); parse_price("POA") -> (None, None, "POA")
+- parse_size("1,200 sq ft") -> 111.48 (m²); "1.1 acres" and "0.5 ha" are converted too,
+  a bare number is taken as m². Compact forms work as well: "85m2" -> 85.0,
+  "85.5m²" -> 85.5, "85sqm" -> 85.0, "1200sqft" -> 111.48.
+apply_numeric_fields() fills Property.price_amount/price_currency/price_qualifier/size_sqm.
+"""
+
+import re
+
+_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k|m|mil|million)?\b", re.IGNORECASE)
+_CURRENCIES = (
+    (re.compile(r"€|\beur\b|\beuro", re.IGNORECASE), "EUR"),
+    (re.compile(r"£|\bgbp\b", re.IGNORECASE), "GBP"),
+    (re.compile(r"\$|\busd\b", re.IGNORECASE), "USD"),
+)
+# First match wins; qualifiers with no amount (POA) stop the amount parse
+_QUALIFIERS = (
+    (re.compile(r"\bpoa\b|on application|price on request", re.IGNORECASE), "POA"),
+    (re.compile(r"per\s*month|\bpcm\b|\bmonthly\b|/\s*month", re.IGNORECASE), "per_month"),
+    (re.compile(r"per\s*week|\bpw\b|\bweekly\b|/\s*week", re.IGNORECASE), "per_week"),
+    (re.compile(r"in excess of|\bioe\b|offers? (?:over|in excess)|\bover\b", re.IGNORECASE), "in_excess_of"),
+    (re.compile(r"\bamv\b|advised market value|guide", re.IGNORECASE), "AMV"),
+    (re.compile(r"\bfrom\b", re.IGNORECASE), "from"),
+    (re.compile(r"\bsold\b", re.IGNORECASE), "sold"),
+)
+_MULTIPLIERS = {"k": 1_000, "m": 1_000_000, "mil": 1_000_000, "million": 1_000_000}
+
+# A number and the unit written after it, matched together so "102 sq m (1,100 sq ft)" and
+# "2 bedrooms 85 m2" take the figure the unit belongs to. Sizes have no k/m multipliers, and
+# a unit may follow the number directly ("85m2", "1200sqft"); group names are SIZE_UNIT_FACTORS keys.
+_SIZE = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)(?!\d|\.\d)\s*"
+    r"(?:(?P<sqft>sq\.?\s*f(?:ee)?t|ft2|ft²|square\s*f(?:ee|oo)t)"
+    r"|(?P<acres>acre)"
+    r"|(?P<hectares>hectare|ha\b)"
+    r"|(?P<sqm>m2|m²|sq\.?\s*m|square\s*met|metre))?",
+    re.IGNORECASE,
+)
+SIZE_UNIT_FACTORS = {"sqm": 1.0, "sqft": 0.09290304, "acres": 4046.8564224, "hectares": 10_000.0}
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return str(value).strip()
+
+
+def parse_price(value):
+    """Return (amount, currency, qualifier); amount is None when no price is given."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (float(value) if value > 0 else None), None, None
+    text = _to_text(value)
+    if not text:
+        return None, None, None
+
+    qualifier = None
+    for pattern, name in _QUALIFIERS:
+        if pattern.search(text):
+            qualifier = name
+            break
+    if qualifier == "POA":
+        return None, None, qualifier
+
+    currency = None
+    for pattern, code in _CURRENCIES:
+        if pattern.search(text):
+            currency = code
+            break
+
+    match = _NUMBER.search(text)
+    if not match:
+        return None, currency, qualifier
+    try:
+        amount = float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None, currency, qualifier
+    suffix = (match.group(2) or "").lower()
+    amount *= _MULTIPLIERS.get(suffix, 1)
+    return (amount if amount > 0 else None), currency, qualifier
+
+
+def parse_size(value, unit=None):
+    """Return the size in m², or None. unit ('sqm', 'sqft', 'acres', 'hectares') overrides detection."""
+    text = _to_text(value)
+    if not text:
+        return None
+    matches = list(_SIZE.finditer(text))
+    if not matches:
+        return None
+    # the first number with a unit; a bare number (taken as m²) only when none has one
+    match = next((m for m in matches if m.lastgroup), matches[0])
+    try:
+        number = float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+    factor = SIZE_UNIT_FACTORS.get(unit or match.lastgroup or "sqm")
+    if not factor or number <= 0:
+        return None
+    return round(number * factor, 2)
+
+
+def apply_numeric_fields(prop, size_unit=None):
+    """Derive the typed price/size columns of a Property from its text columns."""
+    prop.price_amount, prop.price_currency, prop.price_qualifier = parse_price(prop.house_price)
+    prop.size_sqm = parse_size(prop.house_mt_squared, unit=size_unit)
+    return prop
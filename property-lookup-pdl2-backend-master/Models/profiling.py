@@ -0,0 +1,198 @@
+"""
+Opt-in cProfile profiling of requests and import runs, kept in a local profile store.
+- A request is profiled when an authenticated user sends `X-Profile: 1` or `?profile=1`,
+  or when it is picked by PROFILE_SAMPLE_RATE (0..1, default 0).
+- Each profile is saved to PROFILE_DIR as <id>.prof (pstats format, open it with snakeviz
+  or `python -m pstats`) plus <id>.json with the route, timing and top cumulative functions.
+  Only the newest PROFILE_MAX_FILES profiles are kept.
+- The import CLIs accept --profile and store their run the same way (run_cli()).
+- One request is profiled at a time per process: the profiler is process-global on Python
+  3.12+, and a profile also records other threads' work while it runs. Requests arriving
+  while one is being profiled are served unprofiled.
+- A streamed response is profiled up to the point its body starts; the generator that
+  produces the body runs after the profile has been stopped.
+"""
+
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+TOP_FUNCTIONS = 25
+
+_active = threading.Lock()  # held while a request is being profiled
+_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+
+def _new_id():
+    return f"{datetime.datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    """[{function, calls, tottime, cumtime}] sorted by cumulative time."""
+    stats.sort_stats("cumulative")
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        _cc, calls, tottime, cumtime, _callers = stats.stats[func]
+        filename, line, name = func
+        label = f"{os.path.basename(filename)}:{line}({name})" if line else name
+        rows.append({
+            "function": label,
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    return rows
+
+
+def _prune():
+    try:
+        names = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith(".json"))
+    except OSError:
+        return
+    for name in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + ext))
+            except OSError:
+                pass
+
+
+def save(profiler, meta, profile_id=None):
+    """Write the profile and its metadata; returns the metadata (with id and top functions)."""
+    profile_id = profile_id or _new_id()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    profiler.dump_stats(base + ".prof")
+    stats = pstats.Stats(base + ".prof")
+    meta = {
+        "id": profile_id,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "total_calls": stats.total_calls,
+        **meta,
+        "top": top_functions(stats),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    _prune()
+    return meta
+
+
+def list_profiles(limit=50):
+    try:
+        names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")), reverse=True)
+    except OSError:
+        return []
+    result = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r", encoding="utf-8") as f:
+                result.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return result
+
+
+def profile_paths(profile_id):
+    """(json path, prof path) of a stored profile, or None for unknown/invalid ids."""
+    if not profile_id or not _ID.match(profile_id):
+        return None
+    base = os.path.join(PROFILE_DIR, profile_id)
+    if not os.path.exists(base + ".json"):
+        return None
+    return base + ".json", base + ".prof"
+
+
+def _requested():
+    flag = request.headers.get("X-Profile") or request.args.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+def init_app(app, is_authenticated):
+    """is_authenticated() tells whether the current request carries a valid user token."""
+
+    @app.before_request
+    def _start_profile():
+        trigger = None
+        if _requested() and is_authenticated():
+            trigger = "requested"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            trigger = "sampled"
+        if trigger is None or not _active.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler (e.g. a CLI tool) is active in this process
+            _active.release()
+            return
+        g.profile = {"profiler": profiler, "trigger": trigger, "started": time.perf_counter(),
+                     "id": _new_id(), "status": 500}
+
+    @app.after_request
+    def _profile_header(response):
+        state = g.get("profile")
+        if state is not None:
+            state["status"] = response.status_code
+            response.headers["X-Profile-Id"] = state["id"]
+        return response
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        # teardown also runs when the view raised, so the profiler is always stopped
+        state = g.pop("profile", None)
+        if state is None:
+            return
+        try:
+            state["profiler"].disable()
+            save(state["profiler"], {
+                "kind": "request",
+                "name": f"{request.method} {request.url_rule.rule if request.url_rule is not None else request.path}",
+                "path": request.full_path.rstrip("?"),
+                "status": state["status"],
+                "trigger": state["trigger"],
+                "duration_ms": round((time.perf_counter() - state["started"]) * 1000, 1),
+            }, profile_id=state["id"])
+        except Exception as exc:
+            print(f"[profiling] could not save profile: {exc}")
+        finally:
+            _active.release()
+
+
+def run_cli(fn, name, argv=None):
+    """Run an import CLI entry point, profiling it when --profile is on the command line."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--profile" not in argv:
+        return fn()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    status = "ok"
+    profiler.enable()
+    try:
+        return fn()
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        profiler.disable()
+        meta = save(profiler, {
+            "kind": "job",
+            "name": name,
+            "path": " ".join(sys.argv),
+            "status": status,
+            "trigger": "cli",
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+        print(f"[profiling] {name}: saved profile {meta['id']} to {PROFILE_DIR}")
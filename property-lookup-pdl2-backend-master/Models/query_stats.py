@@ -0,0 +1,135 @@
+"""
+SQL statement accounting through SQLAlchemy engine events.
+- Every statement is counted and timed into the current scope: one per HTTP request
+  (init_app) and one per import run (query_scope("import:<source>") in the importers).
+  Scopes nest, a statement counts towards every enclosing scope.
+- Statements slower than SLOW_QUERY_MS are logged with their bound parameters and the
+  route or job that ran them.
+- In debug mode (or with DB_QUERY_HEADERS=1) responses carry X-DB-Queries / X-DB-Time.
+- assert_max_queries(n) is the helper for tests that bound the queries of an endpoint.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+DB_QUERY_HEADERS = os.getenv("DB_QUERY_HEADERS", "").lower() in ("1", "true", "yes")
+_PARAMS_MAX_CHARS = 500
+
+# Called with (statement, seconds) for every statement, e.g. by metrics.py
+observers = []
+
+_current = contextvars.ContextVar("query_scope", default=None)
+
+
+class QueryScope:
+    __slots__ = ("name", "parent", "count", "seconds", "statements")
+
+    def __init__(self, name, parent=None, capture=False):
+        self.name = name
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if capture else None
+
+    def record(self, statement, seconds):
+        scope = self
+        while scope is not None:
+            scope.count += 1
+            scope.seconds += seconds
+            if scope.statements is not None:
+                scope.statements.append(statement)
+            scope = scope.parent
+
+    def summary(self):
+        return f"{self.count} queries, {self.seconds * 1000:.1f} ms"
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def query_scope(name, capture=False):
+    scope = QueryScope(name, parent=_current.get(), capture=capture)
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit, name="test"):
+    """
+    Fail when the block runs more than `limit` statements, listing them.
+        with assert_max_queries(3):
+            client.get("/api/agencies")
+    """
+    with query_scope(name, capture=True) as scope:
+        yield scope
+    if scope.count > limit:
+        listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(scope.statements))
+        raise AssertionError(f"{scope.count} queries run, at most {limit} expected:\n{listing}")
+
+
+def _format_params(parameters, executemany):
+    if executemany and isinstance(parameters, (list, tuple)):
+        text = f"{list(parameters[:3])!r} (+{max(0, len(parameters) - 3)} more)"
+    else:
+        text = repr(parameters)
+    return text if len(text) <= _PARAMS_MAX_CHARS else text[:_PARAMS_MAX_CHARS] + "..."
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    scope = _current.get()
+    if scope is not None:
+        scope.record(statement, elapsed)
+    for observer in observers:
+        observer(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        where = scope.name if scope is not None else "-"
+        sql = " ".join(statement.split())
+        print(f"[slow-query] {elapsed * 1000:.1f} ms in {where}: {sql} | params={_format_params(parameters, executemany)}")
+
+
+def init_app(app):
+    @app.before_request
+    def _open_request_scope():
+        name = request.url_rule.rule if request.url_rule is not None else request.path
+        scope = QueryScope(f"{request.method} {name}", parent=_current.get())
+        g.query_scope = scope
+        g.query_scope_token = _current.set(scope)
+
+    @app.after_request
+    def _query_headers(response):
+        scope = g.get("query_scope")
+        if scope is not None and (app.debug or DB_QUERY_HEADERS):
+            response.headers["X-DB-Queries"] = str(scope.count)
+            response.headers["X-DB-Time"] = f"{scope.seconds * 1000:.1f}ms"
+        return response
+
+    @app.teardown_request
+    def _close_request_scope(exc):
+        token = g.pop("query_scope_token", None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # set in a different context (e.g. a streamed response)
@@ -0,0 +1,150 @@
+"""
+Optional read replica for the read-only API routes.
+- Set SQLALCHEMY_READ_URI to a replica of the primary database. It becomes the "read"
+  engine of Flask-SQLAlchemy (SQLALCHEMY_BINDS) and SELECTs issued while serving GET/HEAD
+  requests go to it. Writes, flushes and routes marked @primary_db stay on the primary.
+- Every REPLICA_CHECK_SEC the replica is checked; when it does not answer or lags more
+  than REPLICA_MAX_LAG_SEC, reads fall back to the primary until the next check passes.
+  Lag is the WAL replay delay on PostgreSQL (0 once all received WAL is replayed); on
+  other databases the replica counts as lagging while its newest import_activity id is
+  behind the primary's.
+- Local testing: point SQLALCHEMY_DATABASE_URI and SQLALCHEMY_READ_URI at two SQLite files
+  (copy the first to make the second); with DB_QUERY_HEADERS=1 responses carry X-DB-Route.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql import Select
+
+READ_BIND = "read"
+SQLALCHEMY_READ_URI = os.getenv("SQLALCHEMY_READ_URI") or None
+REPLICA_MAX_LAG_SEC = float(os.getenv("REPLICA_MAX_LAG_SEC", "30"))
+REPLICA_CHECK_SEC = float(os.getenv("REPLICA_CHECK_SEC", "5"))
+
+# Caught up (all received WAL replayed) is 0 even when the primary has been idle for hours;
+# only while WAL is pending does the age of the last replayed transaction count as lag
+_PG_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+_LAST_IMPORT = text("SELECT MAX(id) FROM import_activity")
+
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+_health_lock = threading.Lock()
+# separate from _health_lock, which is held for the whole probe
+_count_lock = threading.Lock()
+_health = {"healthy": False, "checked_at": None, "lag_sec": None, "reason": "not checked", "reads": 0, "fallbacks": 0}
+
+
+class RoutingSession(Session):
+    """db.session class: SELECTs go to the replica while a read-only request is being served."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _use_replica.get() and not self._flushing and (clause is None or isinstance(clause, Select)):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None and replica_healthy(self._db):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def configure(app):
+    """Register the replica as the "read" bind; call before db.init_app(app)."""
+    if SQLALCHEMY_READ_URI:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[READ_BIND] = SQLALCHEMY_READ_URI
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def _measure_lag(db, engine):
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return float(conn.execute(_PG_LAG).scalar() or 0)
+        replica_last = conn.execute(_LAST_IMPORT).scalar()
+    with db.engine.connect() as conn:
+        primary_last = conn.execute(_LAST_IMPORT).scalar()
+    if primary_last is not None and (replica_last is None or replica_last < primary_last):
+        return float("inf")
+    return 0.0
+
+
+def replica_healthy(db):
+    """Cached health check; at most one probe per REPLICA_CHECK_SEC across threads."""
+    now = time.monotonic()
+    checked = _health["checked_at"]
+    if checked is not None and now - checked < REPLICA_CHECK_SEC:
+        return _health["healthy"]
+    with _health_lock:
+        if _health["checked_at"] is not None and now - _health["checked_at"] < REPLICA_CHECK_SEC:
+            return _health["healthy"]
+        engine = db.engines.get(READ_BIND)
+        try:
+            lag = _measure_lag(db, engine)
+            healthy = lag <= REPLICA_MAX_LAG_SEC
+            reason = None if healthy else "lagging"
+        except Exception as exc:
+            lag, healthy, reason = None, False, f"unreachable: {exc.__class__.__name__}"
+        if healthy != _health["healthy"]:
+            print(f"[replica] {'healthy' if healthy else 'falling back to primary (' + reason + ')'}")
+        _health.update(healthy=healthy, checked_at=time.monotonic(), reason=reason,
+                       lag_sec=None if lag is None or lag == float("inf") else round(lag, 3))
+        return healthy
+
+
+def primary_db(view):
+    """Keep a GET view on the primary (read-your-writes, health checks)."""
+    view.primary_db = True
+    return view
+
+
+@contextmanager
+def use_primary():
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def status():
+    return {"configured": bool(SQLALCHEMY_READ_URI), "max_lag_sec": REPLICA_MAX_LAG_SEC, **_health}
+
+
+def init_app(app, db, add_headers=False):
+    if not SQLALCHEMY_READ_URI:
+        return
+
+    @app.before_request
+    def _route_reads():
+        if request.method not in ("GET", "HEAD"):
+            return
+        view = app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, "primary_db", False):
+            return
+        request.replica_token = _use_replica.set(True)
+        healthy = replica_healthy(db)
+        with _count_lock:
+            _health["reads" if healthy else "fallbacks"] += 1
+        request.db_route = "replica" if healthy else "primary"
+
+    @app.after_request
+    def _route_header(response):
+        if add_headers or app.debug:
+            response.headers["X-DB-Route"] = getattr(request, "db_route", "primary")
+        return response
+
+    @app.teardown_request
+    def _reset_route(exc):
+        token = getattr(request, "replica_token", None)
+        if token is not None:
+            try:
+                _use_replica.reset(token)
+            except ValueError:
+                pass  # set in a different context (e.g. a streamed response)
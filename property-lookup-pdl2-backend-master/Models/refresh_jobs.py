@@ -0,0 +1,166 @@
+"""
+Background force-refresh of one agency (GET /api/properties?force_refresh=1).
+- enqueue() records the job as an import_activity row (status queued -> running -> ok/failed,
+  message = current stage, added_count = rows written) and runs it on a small thread pool,
+  so the request returns the job id at once; GET /api/refresh/<id> reads the row back.
+- A job fetches the agency's primary feed, maps it with the importer mappers, replaces the
+  agency's rows of that source and refreshes stats and clusters, as the importers do.
+- While a job for the agency is queued or running (started less than REFRESH_JOB_STALE_SEC
+  ago, in any worker process) enqueue() hands out that job instead of starting another one.
+"""
+
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import update
+
+from models import db, ImportActivity, Property
+from query_stats import query_scope
+import metrics
+import read_replica
+
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "2"))
+REFRESH_JOB_STALE_SEC = int(os.getenv("REFRESH_JOB_STALE_SEC", "900"))
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="refresh")
+_lock = threading.Lock()
+
+
+def plan(agency, api_key, wordpress_endpoint=None):
+    """
+    (source, feed key) to refresh for an agency, picked like the listing route picks its feed.
+    Raises ValueError with a client message when the agency has no usable key.
+    """
+    source = (agency.primary_source or "").lower().strip()
+    if source == "wordpress":
+        if not wordpress_endpoint:
+            raise ValueError("No WordPress endpoint matches this agency")
+        return "wordpress", wordpress_endpoint
+    prefix = (agency.site_prefix or agency.acquaint_site_prefix or "").strip()
+    if source == "acquaint":
+        if not prefix:
+            raise ValueError("Missing Acquaint site_prefix for this agency")
+        return "acquaint", prefix
+    if source == "myhome":
+        myhome_key = (agency.myhome_api_key or "").strip()
+        if not myhome_key:
+            raise ValueError("Missing MyHome API key for this agency")
+        return "myhome", myhome_key
+    if source != "4pm":
+        if prefix:
+            return "acquaint", prefix
+        if agency.myhome_api_key:
+            return "myhome", agency.myhome_api_key.strip()
+    return "daft", (agency.daft_api_key or agency.unique_key or api_key).strip()
+
+
+def _active_job(agency_name):
+    since = datetime.datetime.utcnow() - datetime.timedelta(seconds=REFRESH_JOB_STALE_SEC)
+    return (
+        ImportActivity.query
+        .filter(
+            ImportActivity.agency_name == agency_name,
+            ImportActivity.status.in_(ACTIVE_STATUSES),
+            ImportActivity.started_at >= since,
+        )
+        .order_by(ImportActivity.id.desc())
+        .first()
+    )
+
+
+def enqueue(app, agency, source, key):
+    """Queue a refresh of agency/source; returns (job, created) where job is the activity row's to_dict()."""
+    # a GET request may be reading from the replica: the dedup check, and the reload of the
+    # new row that commit() expired, must both see the primary
+    with _lock, read_replica.use_primary():
+        job = _active_job(agency.name)
+        if job is not None:
+            return job.to_dict(), False
+        job = ImportActivity(
+            agency_name=agency.name,
+            source=source,
+            added_count=0,
+            status="queued",
+            message="queued",
+            started_at=datetime.datetime.utcnow(),
+        )
+        db.session.add(job)
+        db.session.commit()
+        body = job.to_dict()
+    _executor.submit(_run, app, body["id"], agency.name, source, key)
+    return body, True
+
+
+def get_job(job_id):
+    return db.session.get(ImportActivity, job_id)
+
+
+def _progress(job_id, **values):
+    db.session.execute(update(ImportActivity).where(ImportActivity.id == job_id).values(**values))
+    db.session.commit()
+
+
+def _fetch(source, key):
+    # Importer modules are loaded here, inside the web app context, so bootstrap reuses the app
+    if source == "myhome":
+        from myhome_import import fetch_myhome_search, map_property_myhome
+        return fetch_myhome_search(key) or [], map_property_myhome
+    if source == "acquaint":
+        from myhome_import import load_acquaint, map_property_acquaint
+        return load_acquaint(key) or [], map_property_acquaint
+    if source == "wordpress":
+        from wordpress_crawler import Crawler
+        from wordpress_import import map_property_wordpress
+        return Crawler().fetch_posts(key)[0], map_property_wordpress
+    from daft_import import fetch_daft_api, map_property_4pm
+    return fetch_daft_api(key) or [], map_property_4pm
+
+
+def _run(app, job_id, agency_name, source, key):
+    from agency_stats import refresh_agency_stats
+    from entity_resolution import resolve_after_import
+
+    started = time.perf_counter()
+    with app.app_context(), query_scope(f"refresh:{source}") as db_scope:
+        try:
+            _progress(job_id, status="running", message="fetching")
+            rows, mapper = _fetch(source, key)
+            _progress(job_id, message=f"writing {len(rows)} rows")
+
+            db.session.query(Property).filter(
+                Property.agency_name == agency_name,
+                Property.source == source,
+            ).delete()
+            added = 0
+            for raw in rows:
+                try:
+                    prop = mapper(raw, agency_name)
+                    prop.source = source
+                    db.session.add(prop)
+                    added += 1
+                except Exception as exc:
+                    print(f"[Refresh] Skip {source} property for {agency_name}: {exc}")
+            refresh_agency_stats(agency_name, imported=[source])
+            db.session.commit()
+
+            _progress(job_id, added_count=added, message="resolving clusters")
+            resolve_after_import()
+            elapsed = time.perf_counter() - started
+            _progress(job_id, status="ok", message=None, finished_at=datetime.datetime.utcnow(),
+                      duration_sec=elapsed)
+            metrics.record_import(source, added, elapsed)
+            print(f"[Refresh] {agency_name}: {added} {source} properties, DB: {db_scope.summary()}")
+        except Exception as exc:
+            db.session.rollback()
+            elapsed = time.perf_counter() - started
+            print(f"[Refresh] Failed for {agency_name} ({source}): {exc}")
+            try:
+                _progress(job_id, status="failed", message=str(exc)[:1000],
+                          finished_at=datetime.datetime.utcnow(), duration_sec=elapsed)
+            except Exception:
+                db.session.rollback()
+            metrics.record_import(source, 0, elapsed, status="failed")
@@ -0,0 +1,87 @@
+"""
+Idempotent schema upkeep run at startup (there are no migrations in this project).
+Each step is applied in its own transaction and failures are logged, not raised,
+so an older database or a read-only user never stops the app from starting.
+"""
+
+from sqlalchemy import inspect, text
+
+
+def add_missing_columns(conn, table):
+    """ALTER TABLE ... ADD COLUMN for model columns that the live table does not have yet."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        col_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+
+
+def _property_columns(conn):
+    from models import Property
+    add_missing_columns(conn, Property.__table__)
+    for index in Property.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _listing_indexes(conn):
+    # Listings and importers filter by agency (and source) on every call
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_properties_agency_source ON properties (agency_name, source)"))
+    # Per-agency price range filters and sorting
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_properties_agency_price ON properties (agency_name, price_amount)"))
+    # Push ingestion matches listings on their feed id
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_properties_agency_source_external ON properties (agency_name, source, external_id)"))
+    # Listing ETags take the agency's newest updated_at
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_properties_agency_updated ON properties (agency_name, updated_at)"))
+
+
+def _cluster_tables(conn):
+    from models import PropertyCluster, ClusterBlockKey
+    PropertyCluster.__table__.create(conn, checkfirst=True)
+    ClusterBlockKey.__table__.create(conn, checkfirst=True)
+    # Resolution pages through unresolved rows in id order
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_properties_cluster_pending ON properties (cluster_id, id)"))
+
+
+def _agency_stats(conn):
+    from models import AgencySourceStats
+    from agency_stats import rebuild_all_stats
+    if inspect(conn).has_table(AgencySourceStats.__tablename__):
+        return
+    AgencySourceStats.__table__.create(conn)
+    rebuild_all_stats(conn)
+
+
+def _wordpress_cursors(conn):
+    from models import WordPressCursor
+    WordPressCursor.__table__.create(conn, checkfirst=True)
+
+
+def _search_index(conn):
+    from search import ensure_search_index
+    ensure_search_index(conn)
+
+
+STEPS = [
+    _property_columns,
+    _listing_indexes,
+    _cluster_tables,
+    _agency_stats,
+    _search_index,
+    _wordpress_cursors,
+]
+
+
+def ensure_schema(engine):
+    try:
+        if not inspect(engine).has_table("properties"):
+            return  # fresh database; nothing to upgrade yet
+    except Exception as exc:
+        print(f"[schema] skipped: {exc}")
+        return
+    for step in STEPS:
+        try:
+            with engine.begin() as conn:
+                step(conn)
+        except Exception as exc:
+            print(f"[schema] {step.__name__} skipped: {exc}")
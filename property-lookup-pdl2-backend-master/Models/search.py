@@ -0,0 +1,180 @@
+"""
+Ranked full-text and faceted property search.
+- PostgreSQL: GIN index on a 'simple' tsvector over the text columns, ranked with ts_rank_cd.
+- SQLite: FTS5 external-content table kept in sync by triggers, ranked with bm25.
+- Anything else (e.g. MySQL): LIKE on every term, newest first.
+The page is sorted and sliced in SQL over every match (ORDER BY <sort>, id LIMIT/OFFSET).
+The total and the facet counts (source, status, beds, property type) are counted over the
+newest SEARCH_MATCH_LIMIT matches only, which keeps broad queries cheap; past the cap the
+total is reported as the cap with total_exact false.
+"""
+
+import os
+import re
+from collections import Counter
+
+from sqlalchemy import text
+
+from models import db
+
+SEARCH_COLUMNS = (
+    "house_location",
+    "agency_agent_name",
+    "agency_name",
+    "house_extra_info_1",
+    "house_extra_info_2",
+    "house_extra_info_3",
+    "house_extra_info_4",
+)
+# Facet name -> column
+FACETS = (
+    ("source", "source"),
+    ("status", "house_extra_info_2"),
+    ("beds", "house_bedrooms"),
+    ("property_type", "house_extra_info_1"),
+)
+MAX_TERMS = 8
+SEARCH_MATCH_LIMIT = int(os.getenv("SEARCH_MATCH_LIMIT", "2000"))
+
+_PG_DOCUMENT = "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({c}, '')" for c in SEARCH_COLUMNS) + ")"
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_index(conn):
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_properties_search ON properties USING GIN ({_PG_DOCUMENT})"))
+        for _, column in FACETS:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_properties_{column} ON properties ({column})"))
+    elif dialect == "sqlite":
+        # The update trigger is created last, so it marks a complete setup
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'properties_fts_au'")).first():
+            return
+        conn.execute(text("DROP TABLE IF EXISTS properties_fts"))
+        cols = ", ".join(SEARCH_COLUMNS)
+        new_cols = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+        old_cols = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE properties_fts USING fts5({cols}, content='properties', content_rowid='id')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER properties_fts_ai AFTER INSERT ON properties BEGIN "
+            f"INSERT INTO properties_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER properties_fts_ad AFTER DELETE ON properties BEGIN "
+            f"INSERT INTO properties_fts(properties_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER properties_fts_au AFTER UPDATE ON properties BEGIN "
+            f"INSERT INTO properties_fts(properties_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO properties_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+        conn.execute(text("INSERT INTO properties_fts(properties_fts) VALUES ('rebuild')"))
+
+
+def _terms(q):
+    return [t.lower() for t in _TERM.findall(q or "")][:MAX_TERMS]
+
+
+def _match(dialect, terms, params):
+    """
+    Return (from, where, score, newest) SQL fragments for the text match on this dialect;
+    newest orders the matches newest first.
+    """
+    if not terms:
+        return "properties", [], "0", "properties.id DESC"
+    if dialect == "postgresql":
+        params["tsq"] = " & ".join(f"{t}:*" for t in terms)
+        return (
+            "properties",
+            [f"{_PG_DOCUMENT} @@ to_tsquery('simple', :tsq)"],
+            f"ts_rank_cd({_PG_DOCUMENT}, to_tsquery('simple', :tsq))",
+            "properties.id DESC",
+        )
+    if dialect == "sqlite":
+        params["fts"] = " ".join(f'"{t}"*' for t in terms)
+        # FTS5 drives the join and returns rowids in order, so a LIMIT stops the scan early
+        return (
+            "properties_fts JOIN properties ON properties.id = properties_fts.rowid",
+            ["properties_fts MATCH :fts"],
+            "-bm25(properties_fts)",
+            "properties_fts.rowid DESC",
+        )
+    where = []
+    for i, term in enumerate(terms):
+        params[f"like{i}"] = f"%{term}%"
+        where.append("(" + " OR ".join(f"lower({c}) LIKE :like{i}" for c in SEARCH_COLUMNS) + ")")
+    return "properties", where, "0", "properties.id DESC"
+
+
+# sort param -> ORDER BY; NULL prices/sizes sort last, ties go to the newest row.
+# ("rank" is reserved in MySQL 8, so the relevance column is called score.)
+SORTS = {
+    "rank": "score DESC, properties.id DESC",
+    "price": "properties.price_amount IS NULL, properties.price_amount ASC, properties.id DESC",
+    "-price": "properties.price_amount IS NULL, properties.price_amount DESC, properties.id DESC",
+    "size": "properties.size_sqm IS NULL, properties.size_sqm ASC, properties.id DESC",
+    "-size": "properties.size_sqm IS NULL, properties.size_sqm DESC, properties.id DESC",
+}
+RANGE_COLUMNS = ("price_amount", "size_sqm")
+
+
+def search_properties(q=None, agency_name=None, filters=None, ranges=None, sort="rank", limit=20, offset=0):
+    """
+    Search properties. filters maps facet name (source/status/beds/property_type) to a value;
+    ranges maps price_amount/size_sqm to a (min, max) tuple, either end may be None.
+    Returns {"total", "total_exact", "items": [(id, rank)], "facets": {facet: [{"value", "count"}]}}.
+    """
+    dialect = db.engine.dialect.name
+    params = {}
+    source, where, score, newest = _match(dialect, _terms(q), params)
+    if agency_name:
+        where.append("properties.agency_name = :agency_name")
+        params["agency_name"] = agency_name
+    columns = dict(FACETS)
+    for name, value in (filters or {}).items():
+        if value in (None, "") or name not in columns:
+            continue
+        where.append(f"properties.{columns[name]} = :f_{name}")
+        params[f"f_{name}"] = value
+    for column, (low, high) in (ranges or {}).items():
+        if column not in RANGE_COLUMNS:
+            continue
+        if low is not None:
+            where.append(f"properties.{column} >= :{column}_min")
+            params[f"{column}_min"] = low
+        if high is not None:
+            where.append(f"properties.{column} <= :{column}_max")
+            params[f"{column}_max"] = high
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    hits = db.session.execute(
+        text(
+            f"SELECT properties.id AS id, {score} AS score FROM {source} {where_sql} "
+            f"ORDER BY {SORTS.get(sort, SORTS['rank'])} LIMIT :limit OFFSET :offset"
+        ),
+        {**params, "limit": limit, "offset": offset},
+    ).all()
+
+    # Total and facets come from the newest SEARCH_MATCH_LIMIT matches
+    facet_cols = ", ".join(f"properties.{column} AS {column}" for column in sorted({c for _, c in FACETS}))
+    rows = db.session.execute(
+        text(f"SELECT {facet_cols} FROM {source} {where_sql} ORDER BY {newest} LIMIT :match_limit"),
+        {**params, "match_limit": SEARCH_MATCH_LIMIT},
+    ).mappings().all()
+
+    facets = {}
+    for name, column in FACETS:
+        counts = Counter(row[column] for row in rows)
+        facets[name] = [
+            {"value": None if value is None else str(value), "count": count}
+            for value, count in counts.most_common()
+        ]
+
+    return {
+        "total": len(rows),
+        "total_exact": len(rows) < SEARCH_MATCH_LIMIT,
+        "items": [(row_id, float(row_score or 0)) for row_id, row_score in hits],
+        "facets": facets,
+    }
@@ -0,0 +1,149 @@
+"""
+Request coalescing (single-flight) for upstream fetches.
+- Concurrent calls with the same key (the upstream URL) share one in-flight call and
+  its result; errors are re-raised to every waiter.
+- If SINGLEFLIGHT_DIR is set (POSIX only), calls are also coalesced across worker
+  processes: the leader holds a file lock on the key and writes the JSON result next
+  to it, and processes that waited on the lock reuse that result instead of fetching.
+  Lock and result files unused for SINGLEFLIGHT_TTL_SEC are removed by a periodic sweep.
+- Counts leader calls and the duplicate fetches that were saved.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process coalescing is not available
+    fcntl = None
+
+SINGLEFLIGHT_TTL_SEC = int(os.getenv("SINGLEFLIGHT_TTL_SEC", "600"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, shared_dir=None):
+        self.shared_dir = shared_dir if (shared_dir and fcntl) else None
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._swept_at = time.time()
+        self.calls = 0
+        self.saved = 0
+        self.saved_shared = 0
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time and hand its result to every concurrent caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.saved += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "saved": self.saved,
+                "saved_shared": self.saved_shared,
+                "in_flight": len(self._calls),
+                "shared": bool(self.shared_dir),
+            }
+
+    def _run(self, key, fn):
+        if not self.shared_dir:
+            return fn()
+
+        base = os.path.join(self.shared_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+        result_path = base + ".json"
+        waited_since = time.time()
+        with open(base + ".lock", "a+") as lock_file:
+            os.utime(base + ".lock")  # last use, for the sweep
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is fetching the same key: wait for it, then reuse its result
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if os.path.getmtime(result_path) >= waited_since:
+                        with open(result_path, "r", encoding="utf-8") as f:
+                            result = json.load(f)
+                        with self._lock:
+                            self.saved_shared += 1
+                        return result
+                except (OSError, ValueError):
+                    pass  # leader failed or result unreadable; fetch ourselves
+            try:
+                result = fn()
+                tmp_path = f"{result_path}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(result, f)
+                    os.replace(tmp_path, result_path)
+                except (TypeError, ValueError, OSError):
+                    # result is not JSON-serializable; only in-process waiters share it
+                    _remove(tmp_path)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._sweep()
+
+    def _sweep(self):
+        """Remove files of keys nobody used for SINGLEFLIGHT_TTL_SEC (at most once per TTL/10)."""
+        now = time.time()
+        with self._lock:
+            if now - self._swept_at < SINGLEFLIGHT_TTL_SEC / 10:
+                return
+            self._swept_at = now
+        try:
+            entries = list(os.scandir(self.shared_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if now - entry.stat().st_mtime > SINGLEFLIGHT_TTL_SEC:
+                    # a lock removed under a late caller only costs a duplicate fetch
+                    _remove(entry.path)
+            except OSError:
+                pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+upstream_flight = SingleFlight(shared_dir=os.getenv("SINGLEFLIGHT_DIR"))
@@ -0,0 +1,40 @@
+"""
+Checks that keep server-side fetches of caller-supplied URLs (image proxy, page scraper)
+away from internal addresses: every address a host resolves to must be a public one, so
+loopback, RFC 1918, link-local (169.254.169.254 metadata) and similar hosts are refused.
+"""
+
+import asyncio
+import ipaddress
+import socket
+from urllib.parse import urlparse
+
+
+class BlockedHost(ValueError):
+    """The URL's host is not a public address."""
+
+
+def _check_addresses(infos):
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise BlockedHost("url host is not allowed")
+
+
+def _target(url):
+    parts = urlparse(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("url must be an http(s) URL")
+    return parts.hostname, parts.port
+
+
+def check_public_url(url):
+    """Raise ValueError (BlockedHost for internal hosts) unless url is http(s) on a public host; OSError if it does not resolve."""
+    host, port = _target(url)
+    _check_addresses(socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP))
+
+
+async def check_public_url_async(url):
+    """check_public_url() resolving on the running event loop."""
+    host, port = _target(url)
+    _check_addresses(await asyncio.get_running_loop().getaddrinfo(host, port, proto=socket.IPPROTO_TCP))
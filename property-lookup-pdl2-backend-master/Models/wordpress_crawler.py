@@ -0,0 +1,322 @@
+"""
+Concurrent crawler for the WordPress property endpoints (wordpress_endpoints.txt).
+- Every page of an endpoint is fetched: page 1 reports X-WP-TotalPages and the remaining
+  pages are requested in parallel. Endpoints are crawled in parallel too (WP_CRAWL_WORKERS),
+  with at most WP_CRAWL_PER_HOST requests in flight per host. At most WP_MAX_PAGES pages are
+  read per endpoint (more is reported as an error) and the crawl stops at the first empty page.
+- Incremental sync: each endpoint keeps a cursor (wordpress_cursors table), the newest
+  modified_gmt it has returned. Later crawls send modified_after=<cursor> so only changed
+  posts are transferred. A full crawl (needed to notice deleted posts) runs when the last
+  one is older than WP_FULL_CRAWL_SEC or when asked for.
+- Cursors only move through save_cursor(), which the caller runs once the posts are stored.
+- Only public http(s) hosts are fetched (url_guard), every page and redirect hop included,
+  unless WP_ALLOW_PRIVATE_HOSTS=1.
+
+Usage:
+  python wordpress_crawler.py            # dry run: crawl from the stored cursors, report per endpoint
+  python wordpress_crawler.py --full     # dry run of a full crawl
+"""
+
+import datetime
+import hashlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit, urlunsplit
+
+import requests
+
+import metrics
+import url_guard
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDPRESS_ENDPOINTS_FILE = os.getenv(
+    "WORDPRESS_ENDPOINTS_FILE",
+    os.path.join(BASE_DIR, "mobile", "assets", "wordpress_endpoints.txt")
+)
+WP_CRAWL_WORKERS = int(os.getenv("WP_CRAWL_WORKERS", "16"))
+WP_CRAWL_PER_HOST = int(os.getenv("WP_CRAWL_PER_HOST", "2"))
+WP_FULL_CRAWL_SEC = int(os.getenv("WP_FULL_CRAWL_SEC", str(24 * 3600)))
+WP_TIMEOUT = int(os.getenv("WP_TIMEOUT", "30"))
+WP_MAX_PAGES = int(os.getenv("WP_MAX_PAGES", "100"))  # X-WP-TotalPages comes from the site: never trust it
+WP_ALLOW_PRIVATE_HOSTS = os.getenv("WP_ALLOW_PRIVATE_HOSTS", "0") == "1"
+MAX_REDIRECTS = 3
+PER_PAGE = 100  # WP REST maximum
+# modified_after is exclusive and second-granular: step back a little, upserts are idempotent
+_CURSOR_OVERLAP = datetime.timedelta(seconds=1)
+
+
+def load_endpoints(path=None):
+    endpoints = []
+    try:
+        with open(path or WORDPRESS_ENDPOINTS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                url = line.strip()
+                if url:
+                    endpoints.append(url)
+    except Exception:
+        pass
+    return endpoints
+
+
+def _domain_from_url(url):
+    try:
+        return urlparse(url).hostname or ''
+    except Exception:
+        return ''
+
+
+def guess_endpoint(agency, endpoints):
+    """Match an agency's site/domain fields to a known WP endpoint from the list."""
+    candidates = [agency.site_name or "", agency.site_prefix or "", agency.logo or "", agency.address1 or "", agency.address2 or ""]
+    candidates = [c.lower() for c in candidates if c]
+    for ep in endpoints:
+        domain = _domain_from_url(ep).lower()
+        if not domain:
+            continue
+        for c in candidates:
+            if domain in c:
+                return ep
+    return None
+
+
+def endpoint_hash(endpoint):
+    return hashlib.sha1(endpoint.encode("utf-8")).hexdigest()
+
+
+def page_url(endpoint, page, modified_after=None):
+    """The endpoint URL with per_page/page (and modified_after) set, other params kept."""
+    parts = urlsplit(endpoint)
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    params["per_page"] = str(PER_PAGE)
+    params["page"] = str(page)
+    if modified_after:
+        params["modified_after"] = modified_after
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+def _items(data):
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("results") or data.get("properties") or data.get("value") or []
+    if not isinstance(data, list):
+        raise ValueError("Unexpected response shape")
+    return data
+
+
+class CrawlResult:
+    __slots__ = ("endpoint", "posts", "full", "modified_after", "pages", "error", "seconds")
+
+    def __init__(self, endpoint, full, modified_after):
+        self.endpoint = endpoint
+        self.posts = []
+        self.full = full
+        self.modified_after = modified_after
+        self.pages = 0
+        self.error = None
+        self.seconds = 0.0
+
+    @property
+    def cursor(self):
+        """Newest modified_gmt among the posts; None when no post carries one."""
+        stamps = [p.get("modified_gmt") for p in self.posts if isinstance(p, dict) and p.get("modified_gmt")]
+        return max(stamps) if stamps else None
+
+
+class CrawlTruncated(Exception):
+    """An endpoint reported more than WP_MAX_PAGES pages; `posts` holds the pages that were read."""
+
+    def __init__(self, posts, pages, total_pages):
+        super().__init__(f"Endpoint reports {total_pages} pages, only the first {pages} were read (WP_MAX_PAGES)")
+        self.posts = posts
+        self.pages = pages
+
+
+class Crawler:
+    def __init__(self, workers=WP_CRAWL_WORKERS, per_host=WP_CRAWL_PER_HOST, timeout=WP_TIMEOUT):
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host_slot(self, url):
+        host = urlparse(url).hostname or ""
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _session(self):
+        # one keep-alive session per thread; requests.Session is not thread-safe
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _get(self, url, page=1):
+        with self._host_slot(url), metrics.upstream("wordpress", url):
+            for _ in range(MAX_REDIRECTS + 1):
+                if not WP_ALLOW_PRIVATE_HOSTS:
+                    url_guard.check_public_url(url)
+                resp = self._session().get(url, timeout=self.timeout, allow_redirects=False)
+                if not resp.is_redirect:
+                    break
+                resp.close()
+                url = urljoin(url, resp.headers.get("Location", ""))
+            else:
+                raise requests.exceptions.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+            if resp.status_code == 400 and page > 1:
+                return [], 0  # page past the end (posts removed while crawling)
+            resp.raise_for_status()
+            data = resp.json()
+        try:
+            total_pages = int(resp.headers.get("X-WP-TotalPages") or 1)
+        except ValueError:
+            total_pages = 1
+        return _items(data), total_pages
+
+    def fetch_posts(self, endpoint, modified_after=None, page_pool=None):
+        """
+        Every post of an endpoint (changed since modified_after when given), in page order,
+        and the number of pages read. Raises CrawlTruncated past WP_MAX_PAGES pages.
+        """
+        first, total_pages = self._get(page_url(endpoint, 1, modified_after))
+        pages = {1: first}
+        last = min(total_pages, WP_MAX_PAGES) if first else 1
+        ended = not first
+        if last > 1:
+            own_pool = page_pool is None
+            pool = ThreadPoolExecutor(min(self.workers, last - 1)) if own_pool else page_pool
+            pending = {}
+            try:
+                next_page = 2
+                # a window of self.workers pages in flight, so an empty page stops the crawl early
+                while next_page <= last or pending:
+                    while next_page <= last and len(pending) < self.workers:
+                        pending[pool.submit(self._get, page_url(endpoint, next_page, modified_after), next_page)] = next_page
+                        next_page += 1
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        n = pending.pop(future)
+                        items = future.result()[0]
+                        if items:
+                            pages[n] = items
+                        elif n <= last:
+                            last, ended = n - 1, True  # past the end: nothing after it is requested
+            finally:
+                for future in pending:
+                    future.cancel()
+                if own_pool:
+                    pool.shutdown()
+        posts = [post for n in sorted(pages) if n <= last for post in pages[n]]
+        if total_pages > WP_MAX_PAGES and not ended:
+            raise CrawlTruncated(posts, last, total_pages)
+        return posts, last
+
+    def crawl(self, endpoints, cursors=None, full=False):
+        """
+        Crawl endpoints concurrently; yields a CrawlResult per endpoint as it completes.
+        cursors maps endpoint -> WordPressCursor (or None); an endpoint without a cursor,
+        or due for a full crawl, is fetched completely.
+        """
+        cursors = cursors or {}
+        # endpoint tasks wait on their page tasks, so the two run on separate pools
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="wp-endpoint") as endpoint_pool, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="wp-page") as page_pool:
+            futures = []
+            for endpoint in endpoints:
+                # cursors are read here: ORM rows must not be touched from the pool threads
+                cursor = cursors.get(endpoint)
+                modified_after = None if full or needs_full_crawl(cursor) else _modified_after(cursor.last_modified_gmt)
+                futures.append(endpoint_pool.submit(self._crawl_one, endpoint, modified_after, page_pool))
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _crawl_one(self, endpoint, modified_after, page_pool):
+        result = CrawlResult(endpoint, not modified_after, modified_after)
+        started = time.perf_counter()
+        try:
+            result.posts, result.pages = self.fetch_posts(endpoint, modified_after, page_pool)
+        except Exception as exc:
+            result.error = str(exc)
+        result.seconds = time.perf_counter() - started
+        return result
+
+
+def needs_full_crawl(cursor):
+    if cursor is None or not cursor.last_modified_gmt or cursor.last_full_sync_at is None:
+        return True
+    age = datetime.datetime.utcnow() - cursor.last_full_sync_at
+    return age.total_seconds() >= WP_FULL_CRAWL_SEC
+
+
+def _modified_after(last_modified_gmt):
+    if not last_modified_gmt:
+        return None
+    try:
+        stamp = datetime.datetime.fromisoformat(last_modified_gmt) - _CURSOR_OVERLAP
+    except ValueError:
+        return None
+    return stamp.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# ---------------- cursors ----------------
+
+def load_cursors(endpoints):
+    from models import WordPressCursor
+    hashes = {endpoint_hash(e): e for e in endpoints}
+    rows = WordPressCursor.query.filter(WordPressCursor.endpoint_hash.in_(list(hashes))).all() if hashes else []
+    return {hashes[row.endpoint_hash]: row for row in rows}
+
+
+def save_cursor(result, post_count=None):
+    """Record a crawl in the endpoint's cursor (db.session, not committed)."""
+    from models import db, WordPressCursor
+    now = datetime.datetime.utcnow()
+    row = db.session.get(WordPressCursor, endpoint_hash(result.endpoint))
+    if row is None:
+        row = WordPressCursor(endpoint_hash=endpoint_hash(result.endpoint), endpoint=result.endpoint)
+        db.session.add(row)
+    row.last_sync_at = now
+    if result.error:
+        row.status, row.message = "failed", result.error[:1000]
+        return row
+    row.status, row.message = "ok", None
+    cursor = result.cursor
+    if cursor and (not row.last_modified_gmt or cursor > row.last_modified_gmt):
+        row.last_modified_gmt = cursor
+    if result.full:
+        row.last_full_sync_at = now
+    if post_count is not None:
+        row.post_count = post_count
+    return row
+
+
+def main(argv):
+    from bootstrap import app
+
+    endpoints = load_endpoints()
+    full = "--full" in argv
+    started = time.perf_counter()
+    with app.app_context():
+        cursors = {} if full else load_cursors(endpoints)
+    totals = {"posts": 0, "pages": 0, "failed": 0}
+    for result in Crawler().crawl(endpoints, cursors, full=full):
+        totals["posts"] += len(result.posts)
+        totals["pages"] += result.pages
+        if result.error:
+            totals["failed"] += 1
+            print(f"[WP crawl] {result.endpoint}: failed: {result.error}")
+            continue
+        kind = "full" if result.full else f"since {result.modified_after}"
+        print(f"[WP crawl] {result.endpoint}: {len(result.posts)} posts, {result.pages} pages ({kind}) in {result.seconds:.1f}s")
+    print(f"[WP crawl] {len(endpoints)} endpoints, {totals['posts']} posts, {totals['pages']} pages, "
+          f"{totals['failed']} failed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,150 @@
+"""
+Import WordPress property posts (the WPPD plugin's REST `property` type) for agencies matched
+to an endpoint in wordpress_endpoints.txt. Stores records with source='wordpress'.
+- Endpoints are crawled concurrently from their cursors (wordpress_crawler.py): only posts
+  modified since the last sync are fetched, plus a periodic full crawl that removes deleted posts.
+- Posts are written incrementally by feed id through the push-ingestion write path
+  (ingest.apply_batch), one commit per agency together with its stats and cursor.
+- map_property_wordpress() accepts a raw REST post or the item shape /api/wordpress returns
+  (addressText, photoUrls, ...).
+
+Usage:
+  python wordpress_import.py           # changes since the last sync
+  python wordpress_import.py --full    # re-crawl every endpoint completely
+"""
+
+import datetime
+import sys
+from html import unescape
+
+from sqlalchemy import select
+
+from bootstrap import app
+from models import db, Agency, ImportActivity, Property
+from entity_resolution import resolve_after_import
+from agency_stats import refresh_agency_stats
+from query_stats import query_scope
+from profiling import run_cli
+from ingest import apply_batch, map_upserts
+from wordpress_crawler import Crawler, guess_endpoint, load_cursors, load_endpoints, save_cursor
+import metrics
+from myhome_import import map_property_common, sanitize_str
+
+
+def _text(value):
+    if isinstance(value, dict):
+        value = value.get("rendered")
+    return unescape(str(value)).strip() if value else None
+
+
+def map_property_wordpress(raw, agency_name):
+    address = _text(raw.get("addressText")) or _text(raw.get("title")) or "Unknown address"
+    price = raw.get("price") or raw.get("price_sold") or "N/A"
+    status = raw.get("property_status") or raw.get("status") or raw.get("property_market") or "For Sale"
+
+    photos = raw.get("photoUrls") or raw.get("wppd_pics") or []
+    if not isinstance(photos, list):
+        photos = []
+    if not photos and raw.get("wppd_primary_image"):
+        photos = [raw.get("wppd_primary_image")]
+    photos = [p.get("url") if isinstance(p, dict) else p for p in photos]
+    photos = [p for p in photos if isinstance(p, str) and p]
+
+    def count(*keys):
+        for key in keys:
+            value = raw.get(key)
+            if value not in (None, ""):
+                try:
+                    return int(str(value).split()[0])
+                except (TypeError, ValueError):
+                    continue
+        return 0
+
+    return map_property_common(
+        agency_name=agency_name,
+        agent_name=sanitize_str(raw.get("agent") or agency_name),
+        address=address,
+        price=price,
+        beds=count("bedrooms", "beds", "wppd_bedrooms"),
+        baths=count("bathrooms", "baths", "wppd_bathrooms"),
+        size=raw.get("floor_area") or raw.get("size") or "N/A",
+        extras=[raw.get("property_type"), status, "Live", raw.get("property_market") or status],
+        main_photo=photos[0] if photos else None,
+        photo_urls=photos,
+        source="wordpress",
+        latitude=raw.get("latitude"),
+        longitude=raw.get("longitude"),
+        eircode=raw.get("eircode"),
+        external_id=raw.get("id"),
+    )
+
+
+# ---------------------- Runner ----------------------
+
+def _store(agency_name, result):
+    """Apply one endpoint's crawl; a full crawl also deletes posts the site no longer lists."""
+    rows = map_upserts("wordpress", result.posts, agency_name, strict=False)
+    deletes = []
+    if result.full:
+        table = Property.__table__
+        stored = db.session.execute(
+            select(table.c.external_id).where(table.c.agency_name == agency_name, table.c.source == "wordpress")
+        ).scalars().all()
+        deletes = [ext_id for ext_id in stored if ext_id and ext_id not in rows]
+    return apply_batch(agency_name, "wordpress", rows, deletes)
+
+
+def import_wordpress(full=False):
+    with app.app_context(), query_scope("import:wordpress") as db_scope:
+        endpoints = load_endpoints()
+        targets = {}  # endpoint -> agency name
+        for agency in Agency.query.all():
+            endpoint = guess_endpoint(agency, endpoints)
+            if endpoint and endpoint not in targets:
+                targets[endpoint] = agency.name
+        cursors = load_cursors(list(targets))
+        print(f"[WordPress] Crawling {len(targets)} endpoints ({'full' if full else 'changes since last sync'})")
+
+        for result in Crawler().crawl(list(targets), cursors, full=full):
+            agency_name = targets[result.endpoint]
+            finished = datetime.datetime.utcnow()
+            started = finished - datetime.timedelta(seconds=result.seconds)
+            if result.error:
+                print(f"[WordPress] Failed fetching {agency_name}: {result.error}")
+                save_cursor(result)
+                db.session.add(ImportActivity(
+                    agency_name=agency_name, source="wordpress", added_count=0, status="failed",
+                    message=result.error[:1000], started_at=started, finished_at=finished,
+                ))
+                db.session.commit()
+                metrics.record_import("wordpress", 0, result.seconds, status="failed")
+                continue
+
+            try:
+                counts = _store(agency_name, result)
+                stats = refresh_agency_stats(agency_name, imported=["wordpress"])
+                total = next((s["total_count"] for s in stats if s["source"] == "wordpress"), 0)
+                save_cursor(result, post_count=total)
+                written = counts["inserted"] + counts["updated"]
+                db.session.add(ImportActivity(
+                    agency_name=agency_name, source="wordpress", added_count=written, status="ok",
+                    message=f"{'full' if result.full else 'incremental'}: {counts['inserted']} inserted, "
+                            f"{counts['updated']} updated, {counts['deleted']} deleted",
+                    started_at=started, finished_at=datetime.datetime.utcnow(), duration_sec=result.seconds,
+                ))
+                db.session.commit()
+                print(f"[WordPress] {agency_name}: {len(result.posts)} posts in {result.pages} pages, "
+                      f"{counts['inserted']} new, {counts['updated']} updated, {counts['deleted']} removed")
+                metrics.record_import("wordpress", written, result.seconds)
+            except Exception as exc:
+                db.session.rollback()
+                print(f"[WordPress] Commit failed for {agency_name}: {exc}")
+                metrics.record_import("wordpress", 0, result.seconds, status="failed")
+
+        resolve_after_import()
+        print(f"[WordPress] DB: {db_scope.summary()}")
+
+
+if __name__ == "__main__":
+    full_crawl = "--full" in sys.argv[1:]
+    run_cli(lambda: import_wordpress(full=full_crawl), "import:wordpress")  # --profile stores a cProfile of the run